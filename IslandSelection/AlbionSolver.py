@@ -1,111 +1,41 @@
 from AlbionIsland import *
-from SimulatedAnnealingSolver import *
+from RegionSolver import RegionSolver, InfeasibleCoverageError
+from SimulatedAnnealingSolver import stage_checkpoint
+from SolutionCache import solution_cache
 import sys
 
 ###########################################################################################
 #
 #
-class AlbionSolver(SimulatedAnnealingSolver):
+class AlbionSolver(RegionSolver):
     """
     Solver for Albion Islands.
     Find an optimum set of Albion Islands which provides all Albion fertilities
-    """
-    def __init__(self):
-        # call parent ctor
-        super().__init__()
-
-        # input file
-        self.filename = ''
-
-        # use this to target All, Celtic or Roman fertilities in the solution
-        self.starting_fertilities = AlbionFertility.all_fertilities()
-
-        # solution tuning factors
-        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
-        self.max_trials = 1000      # max trials per annealing temperature
-        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
-        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
-
-        self.extra_island_reduction_rate = 0.9
-        self.extra_island_penalty = 100
-
-    def set_filename(self, filename: str):
-        # set up a basic array of islands
-        self.filename = filename
-        self.load_islands()
-
-    def load_islands(self):
-        """
-        load island info from a CSV file
-        # todo - read this info from a savegame file rather than a CSV file
-        ideally this function should be replaced to read the island info
-        directly from a save file
-        """
-
-        # ensure list starts empty
-        self.the_list = []
-
-        # walk the input file list
-        with open(self.filename, 'r') as file:
-            for line in file:
-                # Process each line here
-                if line[0] != '#':
-                    island = AlbionIsland.from_string(line.strip())
-                    self.the_list.append(island)
-                    # island.dump()
-                    # print(f"Island: [{island.island_name}]")
-                    # print(f"    Celtic Score: [{island.calculate_score(AlbionFertility.celtic())}]")
-                    # print(f"    Roman Score:  [{island.calculate_score(AlbionFertility.roman())}]")
-
-    def set_coverage(self, starting_fertilities: AlbionFertility):
-        self.starting_fertilities = starting_fertilities
-
-    # define the virtual score() function
-    def score(self, candidate_list: list) -> float:
-
-        # determine a score for the first N islands, where N is the number of islands required
-        # to provide one of every fertility
-
-        # walk the list until we have gotten all the fertilities
-        # order matters, so reduce the score in subsequent islands by 'extra_island_reduction_rate'
-        # also, we only want the minimum number of islands to cover all fertilities, so
-        # add a penalty for every island beyond the first
-        rv = 0.0
-        covered_fertilities: AlbionFertility = self.starting_fertilities
-        island: AlbionIsland
-        for ndx, island in enumerate(candidate_list):
-            rv += (self.extra_island_reduction_rate ** ndx) * island.calculate_score(covered_fertilities)
-            rv -= ndx * self.extra_island_penalty
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-            if covered_fertilities == AlbionFertility.no_fertilities():
-                break
-        # print(f"highest index to cover all ferts = {ndx}")
-
-        return rv
-
-    def report(self) -> list:
-        rv = list()
-        covered_fertilities: AlbionFertility = self.starting_fertilities
-
-        print(f"Islands: [", end = '')
-        island: AlbionIsland
-        for ndx, island in enumerate(self.the_list):
-            rv.append(island)
-            print(f"{island.island_name}", end = '')
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-            if covered_fertilities == AlbionFertility.no_fertilities():
-                break
-            print(", ", end = '')
-
-        print(f"] (Score = {self.score(self.the_list):.0f})")
-
-        # return a list of the solution islands
-        return rv
 
+    Everything Albion specific lives in the ALBION region definition, in AlbionIsland.py
+    """
+    island_class = AlbionIsland
 
 
+def solve_and_report(alb_solver: AlbionSolver, label: str, stage: str, checkpoint: str = '', resume: bool = False) -> list:
+    """
+    solve for the current coverage and report it, e.g. the second population may have run out of islands
+    :param stage: name of this solve, each stage gets its own checkpoint file, since each is a different problem
+    :param checkpoint: checkpoint filename for the whole run, if any
+    :param resume: continue this stage from its checkpoint, if it has one
+    :return: list of the islands in the solution, empty if the coverage can't be done
+    """
+    alb_solver.checkpoint_filename = stage_checkpoint(checkpoint, stage) if checkpoint else ''
+    try:
+        if resume:
+            alb_solver.solve(resume=True)
+        else:
+            alb_solver.solve_cached(solution_cache)
+    except InfeasibleCoverageError as e:
+        print(f"{label}{e}")
+        return []
+    print(label, end = '')
+    return alb_solver.report()
 
 
 #
@@ -114,15 +44,24 @@ class AlbionSolver(SimulatedAnnealingSolver):
 def main():
 
     # command line
-    #       python AlbionSolver.py inputfile.csv
-    if len(sys.argv) != 2:
+    #       python AlbionSolver.py inputfile.csv [--seed=N] [--checkpoint=file [--resume]]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    if (len(args) != 1 or not set(options) <= {'seed', 'checkpoint', 'resume'}
+            or not options.get('seed', '0').isdigit() or ('resume' in options and not options.get('checkpoint'))):
         print("Usage:")
-        print("     python AlbionSolver.py inputfile.csv")
+        print("     python AlbionSolver.py inputfile.csv [--seed=N] [--checkpoint=file [--resume]]")
+        print("        a seeded solve repeats exactly, and is remembered in the solution cache")
+        print("        each of the four solves checkpoints to its own file, e.g. file_celtic-1, file_roman-2")
         exit(-1)
+    checkpoint = options.get('checkpoint', '')
+    resume = 'resume' in options
 
     # Albion solver
     alb_solver = AlbionSolver()
-    alb_solver.set_filename(sys.argv[1])
+    alb_solver.set_filename(args[0])
+    if 'seed' in options:
+        alb_solver.set_seed(int(options['seed']))
     print('')
     print(f"Region map: [{alb_solver.filename}]")
 
@@ -140,9 +79,7 @@ def main():
 
     print("Optimized Island Set, Albion Islands, Celtic then Roman:")
     alb_solver.set_coverage(AlbionFertility.celtic())
-    alb_solver.solve()
-    print("     Celtic ", end = '')
-    solution_islands = alb_solver.report()
+    solution_islands = solve_and_report(alb_solver, "     Celtic ", 'celtic-1', checkpoint, resume)
 
     # remove islands used in first population as not available for second population
     new_list = [island for island in alb_solver.the_list if island not in solution_islands]
@@ -151,9 +88,7 @@ def main():
 
     # solve for islands for second population
     alb_solver.set_coverage(AlbionFertility.roman())
-    alb_solver.solve()
-    print("      Roman ", end = '')
-    alb_solver.report()
+    solve_and_report(alb_solver, "      Roman ", 'roman-2', checkpoint, resume)
 
     # reload islands, and do it in the reverse order
     alb_solver.load_islands()
@@ -162,9 +97,7 @@ def main():
     # print(f"num islands = {len(alb_solver.the_list)}")
     print("Optimized Island Set, Albion Islands, Roman then Celtic:")
     alb_solver.set_coverage(AlbionFertility.roman())
-    alb_solver.solve()
-    print("      Roman ", end = '')
-    solution_islands = alb_solver.report()
+    solution_islands = solve_and_report(alb_solver, "      Roman ", 'roman-1', checkpoint, resume)
 
     # remove islands used in first population as not available for second population
     new_list = [island for island in alb_solver.the_list if island not in solution_islands]
@@ -173,9 +106,7 @@ def main():
 
     # solve for islands for second population
     alb_solver.set_coverage(AlbionFertility.celtic())
-    alb_solver.solve()
-    print("     Celtic ", end = '')
-    alb_solver.report()
+    solve_and_report(alb_solver, "     Celtic ", 'celtic-2', checkpoint, resume)
 
     print('')
     print("Done")
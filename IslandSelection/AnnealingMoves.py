@@ -0,0 +1,270 @@
+###########################################################################################
+#
+#   Moves for the Simulated Annealing solver
+#
+#   Every move has the same signature
+#       move(the_list, rng, prefix_length) -> list
+#   where
+#       the_list is a copy of the current list, which the move is free to modify
+#       rng is the solver's RandomStream
+#       prefix_length is the number of leading list members which currently affect the score
+#   and returns the perturbed list
+#
+
+
+def segment_move(the_list: list, rng, prefix_length: int) -> list:
+    """
+    Take an existing list, and perturb it by
+        - taking a segment of list members beginning at a random list position,
+        - of random length,
+        - and inserting the segment back into the list at a new random position
+    """
+    if len(the_list) < 2:
+        return the_list
+
+    # pick a random segment to remove from current list, in range [0, my_list_len)
+    segment_start = rng.integer(0, len(the_list))
+    segment_length = rng.integer(1, len(the_list) - segment_start + 1)
+
+    # get the segment using slice syntax, and then remove it from original list
+    segment = the_list[segment_start:segment_start+segment_length]
+    del the_list[segment_start:segment_start+segment_length]
+
+    # insert segment back into list in the new position
+    new_segment_start = rng.integer(0, len(the_list) + 1)
+    return the_list[:new_segment_start] + segment + the_list[new_segment_start:]
+
+
+def swap_two(the_list: list, rng, prefix_length: int) -> list:
+    """
+    swap one member of the scored prefix with any other list member
+    """
+    if len(the_list) < 2:
+        return the_list
+
+    first = rng.integer(0, min(prefix_length, len(the_list)))
+    second = rng.integer(0, len(the_list) - 1)
+    if second >= first:
+        second += 1
+    the_list[first], the_list[second] = the_list[second], the_list[first]
+    return the_list
+
+
+def swap_into_prefix(the_list: list, rng, prefix_length: int) -> list:
+    """
+    swap one member of the scored prefix with an unused member from beyond the prefix
+    """
+    if prefix_length >= len(the_list):
+        # nothing unused to swap in
+        return swap_two(the_list, rng, prefix_length)
+
+    inside = rng.integer(0, prefix_length)
+    outside = rng.integer(prefix_length, len(the_list))
+    the_list[inside], the_list[outside] = the_list[outside], the_list[inside]
+    return the_list
+
+
+def reverse_segment(the_list: list, rng, prefix_length: int) -> list:
+    """
+    reverse a segment which starts inside the scored prefix
+    """
+    if len(the_list) < 2:
+        return the_list
+
+    start = rng.integer(0, min(prefix_length, len(the_list) - 1))
+    end = rng.integer(start + 2, len(the_list) + 1)
+    the_list[start:end] = the_list[start:end][::-1]
+    return the_list
+
+
+###########################################################################################
+#
+#
+class MoveStatistics:
+    """
+    running counts for one move
+    """
+    def __init__(self):
+        self.attempts = 0
+        self.accepted = 0
+        self.improved = 0
+
+        # exponentially weighted recent acceptance rate, starts optimistic so every move gets tried
+        self.recent_rate = 1.0
+
+    def to_dict(self) -> dict:
+        return {
+            'attempts': self.attempts,
+            'accepted': self.accepted,
+            'improved': self.improved,
+            'acceptance_rate': self.accepted / self.attempts if self.attempts else 0.0,
+            'recent_rate': self.recent_rate,
+        }
+
+
+###########################################################################################
+#
+#
+class MoveRegistry:
+    """
+    The set of moves available to the solver.
+
+    Moves are picked at random, weighted by their recent acceptance rate plus a floor, so
+    moves which keep getting rejected are tried less often but never abandoned entirely.
+    """
+    def __init__(self, min_weight: float = 0.05, smoothing: float = 0.01):
+        # name -> move function
+        self.moves = {}
+
+        # name -> MoveStatistics
+        self.stats = {}
+
+        # every move keeps at least this selection weight
+        self.min_weight = min_weight
+
+        # weight of the newest result in the recent acceptance rate
+        self.smoothing = smoothing
+
+    def register(self, name: str, move):
+        self.moves[name] = move
+        self.stats[name] = MoveStatistics()
+
+    def unregister(self, name: str):
+        del self.moves[name]
+        del self.stats[name]
+
+    def select(self, rng) -> str:
+        """
+        :return: name of the move to try next
+        """
+        names = list(self.moves)
+        weights = [self.min_weight + self.stats[name].recent_rate for name in names]
+        target = rng.random() * sum(weights)
+        for name, weight in zip(names, weights):
+            target -= weight
+            if target < 0:
+                return name
+        return names[-1]
+
+    def record(self, name: str, accepted: bool, improved: bool):
+        stats = self.stats[name]
+        stats.attempts += 1
+        if accepted:
+            stats.accepted += 1
+        if improved:
+            stats.improved += 1
+        stats.recent_rate += self.smoothing * ((1.0 if accepted else 0.0) - stats.recent_rate)
+
+    def reset_statistics(self):
+        for name in self.stats:
+            self.stats[name] = MoveStatistics()
+
+    def get_state(self) -> dict:
+        """
+        the running statistics, which steer move selection, e.g. for a checkpoint
+        """
+        return {name: (stats.attempts, stats.accepted, stats.improved, stats.recent_rate)
+                for name, stats in self.stats.items()}
+
+    def set_state(self, state: dict):
+        for name, (attempts, accepted, improved, recent_rate) in state.items():
+            if name in self.stats:
+                stats = self.stats[name]
+                stats.attempts, stats.accepted, stats.improved, stats.recent_rate = attempts, accepted, improved, recent_rate
+
+    def statistics(self) -> dict:
+        """
+        :return: dictionary of move name -> dictionary of counts and rates
+        """
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+
+def default_moves() -> MoveRegistry:
+    """
+    :return: a MoveRegistry holding the standard set of moves
+    """
+    rv = MoveRegistry()
+    rv.register('segment_move', segment_move)
+    rv.register('swap_two', swap_two)
+    rv.register('swap_into_prefix', swap_into_prefix)
+    rv.register('reverse_segment', reverse_segment)
+    return rv
+
+
+###########################################################################################
+#
+#   Moves for the prefix search mode
+#
+#   In prefix mode the solver state is the scored prefix plus an unordered pool of the
+#   remaining list members, and every move has the signature
+#       move(prefix, pool, rng) -> (prefix, taken, given)
+#   where
+#       prefix is a copy of the current prefix, which the move is free to modify
+#       pool is the current pool, which the move must NOT modify
+#   and returns
+#       the new prefix
+#       taken, the pool index of the member moved into the prefix, or None
+#       given, the member moved out of the prefix into the pool, or None
+#   so the pool is only updated if the move is accepted, and each trial costs O(prefix)
+#
+
+
+def prefix_reorder(prefix: list, pool: list, rng) -> tuple:
+    """
+    move one prefix member to a new position within the prefix
+    """
+    if len(prefix) < 2:
+        return prefix, None, None
+
+    member = prefix.pop(rng.integer(0, len(prefix)))
+    prefix.insert(rng.integer(0, len(prefix) + 1), member)
+    return prefix, None, None
+
+
+def prefix_insert(prefix: list, pool: list, rng) -> tuple:
+    """
+    insert a pool member into the prefix at a random position
+    """
+    if not pool:
+        return prefix_reorder(prefix, pool, rng)
+
+    taken = rng.integer(0, len(pool))
+    prefix.insert(rng.integer(0, len(prefix) + 1), pool[taken])
+    return prefix, taken, None
+
+
+def prefix_remove(prefix: list, pool: list, rng) -> tuple:
+    """
+    move a prefix member back into the pool
+    """
+    if len(prefix) < 2:
+        return prefix_insert(prefix, pool, rng)
+
+    given = prefix.pop(rng.integer(0, len(prefix)))
+    return prefix, None, given
+
+
+def prefix_replace(prefix: list, pool: list, rng) -> tuple:
+    """
+    swap a prefix member with a pool member
+    """
+    if not pool or not prefix:
+        return prefix_insert(prefix, pool, rng)
+
+    position = rng.integer(0, len(prefix))
+    taken = rng.integer(0, len(pool))
+    given = prefix[position]
+    prefix[position] = pool[taken]
+    return prefix, taken, given
+
+
+def default_prefix_moves() -> MoveRegistry:
+    """
+    :return: a MoveRegistry holding the standard set of prefix mode moves
+    """
+    rv = MoveRegistry()
+    rv.register('prefix_insert', prefix_insert)
+    rv.register('prefix_remove', prefix_remove)
+    rv.register('prefix_replace', prefix_replace)
+    rv.register('prefix_reorder', prefix_reorder)
+    return rv
@@ -0,0 +1,335 @@
+from LatiumSolver import LatiumSolver
+from AlbionSolver import AlbionSolver
+from AlbionIsland import AlbionFertility
+from SimulatedAnnealingSolver import SimpleArraySolver
+from SolverInstrumentation import SolverInstrumentation
+from ExactSolver import ExactSolver
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# bump this whenever the benchmark cases or the measurements change, so old baselines are refused
+BENCHMARK_VERSION = 2
+
+# the bundled maps, next to this script
+MAP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAP_PATTERNS = ('corners_seed*.csv', 'archipelago_seed*.csv')
+
+# generated map sizes for the scale cases, and the generator seed, so every run gets the same maps
+SCALE_SIZES = (100, 1000, 10000)
+SCALE_SEED = 7
+
+# command lines whose start up time is measured, run from MAP_DIR, and how many runs to take the fastest of
+# test_startup.py also holds the usage message to a fixed limit
+STARTUP_COMMANDS = {
+    'usage': ['IslandSelect.py'],
+    'check_map': ['IslandSelect.py', 'check', 'latium', 'corners_seed7324_latium.csv'],
+    'import_solvers': ['-c', 'import LatiumSolver, AlbionSolver'],
+}
+STARTUP_RUNS = 5
+
+# relative slowdown / growth tolerated before compare() calls it a regression
+DEFAULT_TOLERANCE = 0.20
+
+
+###########################################################################################
+#
+#
+class BenchmarkCase:
+    """
+    One solver run: a name, and a function which returns a freshly loaded solver
+    exact is False for maps too big for ExactSolver
+    """
+    def __init__(self, name: str, make_solver, exact: bool = True):
+        self.name = name
+        self.make_solver = make_solver
+        self.exact = exact
+
+
+def benchmark_cases(map_dir: str = MAP_DIR, scale: bool = False) -> list:
+    """
+    every bundled map, plus the SimpleArraySolver proof of concept
+    Albion maps are solved once for each population, the same as AlbionSolver.main()
+    :param scale: also run generated maps of SCALE_SIZES islands
+    """
+    rv = list()
+    filenames = sorted(filename for pattern in MAP_PATTERNS for filename in glob.glob(os.path.join(map_dir, pattern)))
+    for filename in filenames:
+        basename = os.path.splitext(os.path.basename(filename))[0]
+        if basename.endswith('_latium'):
+            rv.append(BenchmarkCase(basename, lambda filename=filename: latium_solver(filename)))
+        elif basename.endswith('_albion'):
+            rv.append(BenchmarkCase(basename + '_celtic',
+                                    lambda filename=filename: albion_solver(filename, AlbionFertility.celtic())))
+            rv.append(BenchmarkCase(basename + '_roman',
+                                    lambda filename=filename: albion_solver(filename, AlbionFertility.roman())))
+
+    rv.append(BenchmarkCase('simple_array', SimpleArraySolver))
+
+    if scale:
+        for count in SCALE_SIZES:
+            rv.append(BenchmarkCase(f"generated_{count}_latium",
+                                    lambda count=count: generated_solver(LatiumSolver, count), exact=False))
+            rv.append(BenchmarkCase(f"generated_{count}_albion",
+                                    lambda count=count: generated_solver(AlbionSolver, count), exact=False))
+    return rv
+
+
+def latium_solver(filename: str) -> LatiumSolver:
+    rv = LatiumSolver()
+    rv.set_filename(filename)
+    return rv
+
+
+def generated_solver(solver_class, count: int):
+    # imported here, the generator is only needed for the scale cases
+    from MapGenerator import MapGenerator
+    return MapGenerator(solver_class.island_class.region, seed=SCALE_SEED).generate_solver(count, solver_class)
+
+
+def albion_solver(filename: str, coverage: AlbionFertility) -> AlbionSolver:
+    rv = AlbionSolver()
+    rv.set_filename(filename)
+    rv.set_coverage(coverage)
+    return rv
+
+
+###########################################################################################
+#
+#
+class Benchmark:
+    """
+    Run every benchmark case with a fixed seed, and record
+        wall_time           seconds for solve()
+        trials_per_second   annealing trial rate
+        peak_memory         peak bytes allocated during solve(), from tracemalloc
+        score               final score
+        optimum             exact optimum score, from ExactSolver, or None if out of node budget
+        gap                 optimum - score, or None
+
+    Timing and memory come from separate (identical, seeded) runs, since tracemalloc slows the
+    annealing loop down far too much to time it at the same time.  The timed run is repeated
+    and the fastest kept, to cut down on noise from whatever else the machine is doing.
+    """
+    def __init__(self, seed: int = 1, max_anneals: int = None, max_trials: int = None, node_budget: int = 2000000,
+                 repeat: int = 1, scale: bool = False, startup_runs: int = STARTUP_RUNS):
+        self.seed = seed
+        self.repeat = repeat
+        self.scale = scale
+
+        # runs of each STARTUP_COMMANDS entry, 0 to skip them
+        self.startup_runs = startup_runs
+
+        # override the solver defaults, e.g. for a quick run, or None to keep them
+        self.max_anneals = max_anneals
+        self.max_trials = max_trials
+
+        self.node_budget = node_budget
+
+    def settings(self) -> dict:
+        return {
+            'seed': self.seed,
+            'max_anneals': self.max_anneals,
+            'max_trials': self.max_trials,
+            'node_budget': self.node_budget,
+            'repeat': self.repeat,
+            'scale': self.scale,
+            'startup_runs': self.startup_runs,
+        }
+
+    def prepare(self, case: BenchmarkCase):
+        solver = case.make_solver()
+        solver.set_seed(self.seed)
+        solver.top_k = 0
+        if self.max_anneals is not None:
+            solver.max_anneals = self.max_anneals
+        if self.max_trials is not None:
+            solver.max_trials = self.max_trials
+        return solver
+
+    def run_case(self, case: BenchmarkCase) -> dict:
+        # timed runs, keep the fastest, without instrumentation, so this is what a real solve() costs
+        wall_time, trials_per_second = None, 0.0
+        for _ in range(max(1, self.repeat)):
+            solver = self.prepare(case)
+            start = time.perf_counter()
+            solver.solve()
+            elapsed = time.perf_counter() - start
+            if wall_time is None or elapsed < wall_time:
+                wall_time = elapsed
+                trials_per_second = solver.solve_trials / elapsed if elapsed > 0 else 0.0
+        score = solver.score(solver.the_list)
+
+        # instrumented run, for where the time goes, its timers slow the run down so it isn't the wall time
+        solver = self.prepare(case)
+        solver.instrumentation = SolverInstrumentation()
+        solver.solve()
+        summary = solver.instrumentation.summary()
+        breakdown = {name: summary[name] for name in ('score_time', 'perturb_time', 'elapsed',
+                                                       'accepted_better', 'accepted_worse', 'rejected')}
+
+        # memory run
+        solver = self.prepare(case)
+        tracemalloc.start()
+        solver.solve()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # exact optimum, seeded with the annealing result so it prunes from the start
+        optimum = None
+        if case.exact:
+            exact = ExactSolver(self.prepare(case), self.node_budget)
+            optimum = exact.solve(score)
+
+        return {
+            'wall_time': wall_time,
+            'trials_per_second': trials_per_second,
+            'peak_memory': peak_memory,
+            'breakdown': breakdown,
+            'score': score,
+            'optimum': optimum,
+            'gap': optimum - score if optimum is not None else None,
+        }
+
+    def measure_startup(self, args: list) -> float:
+        """
+        :return: fastest wall time of a fresh interpreter running args, in seconds
+        """
+        rv = None
+        for _ in range(self.startup_runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + args, cwd=MAP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed = time.perf_counter() - start
+            if rv is None or elapsed < rv:
+                rv = elapsed
+        return rv
+
+    def run(self, cases: list = None, verbose: bool = True) -> dict:
+        """
+        :return: dictionary of the settings, environment, and case name -> measurements
+        """
+        if cases is None:
+            cases = benchmark_cases(scale=self.scale)
+
+        results = dict()
+        for case in cases:
+            results[case.name] = self.run_case(case)
+            if verbose:
+                print_result(case.name, results[case.name])
+
+        # start up time of the command line tools, i.e. the imports, before any solving
+        startup = dict()
+        if self.startup_runs > 0:
+            for name, args in STARTUP_COMMANDS.items():
+                startup[name] = self.measure_startup(args)
+                if verbose:
+                    print(f"{'startup_' + name:36} Time [{startup[name]:7.3f}s]")
+
+        return {
+            'version': BENCHMARK_VERSION,
+            'settings': self.settings(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+            'startup': startup,
+        }
+
+
+def print_result(name: str, result: dict):
+    gap = f"{result['gap']:.0f}" if result['gap'] is not None else '?'
+    print(f"{name:36} Time [{result['wall_time']:7.2f}s] Trials/sec [{result['trials_per_second']:7.0f}] "
+          f"Peak [{result['peak_memory'] / 1024:8.0f}k] Score [{result['score']:6.0f}] Gap [{gap}]")
+
+
+def save_baseline(filename: str, baseline: dict):
+    # write to a temp file and rename, so a crash never leaves a half-written baseline
+    temp_filename = filename + f'.{os.getpid()}.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2)
+    os.replace(temp_filename, filename)
+
+
+def load_baseline(filename: str) -> dict:
+    with open(filename, 'r', encoding='utf-8') as file:
+        rv = json.load(file)
+    if rv.get('version') != BENCHMARK_VERSION:
+        raise ValueError(f"Baseline [{filename}] is from benchmark version [{rv.get('version')}], "
+                         f"expected [{BENCHMARK_VERSION}]")
+    return rv
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    :return: list of regression messages, empty if none
+    """
+    rv = list()
+    for name, old in baseline['results'].items():
+        new = current['results'].get(name)
+        if new is None:
+            rv.append(f"{name}: missing from current run")
+            continue
+
+        if new['wall_time'] > old['wall_time'] * (1.0 + tolerance):
+            rv.append(f"{name}: wall time {old['wall_time']:.2f}s -> {new['wall_time']:.2f}s")
+        if new['trials_per_second'] < old['trials_per_second'] * (1.0 - tolerance):
+            rv.append(f"{name}: trials/sec {old['trials_per_second']:.0f} -> {new['trials_per_second']:.0f}")
+        if new['peak_memory'] > old['peak_memory'] * (1.0 + tolerance):
+            rv.append(f"{name}: peak memory {old['peak_memory']} -> {new['peak_memory']}")
+
+        # scores come from seeded runs, so any drop at all is a quality regression
+        if new['score'] < old['score'] - 1e-6:
+            rv.append(f"{name}: score {old['score']:.0f} -> {new['score']:.0f}")
+        if old['optimum'] is not None and new['optimum'] is not None and abs(new['optimum'] - old['optimum']) > 1e-6:
+            rv.append(f"{name}: optimum changed {old['optimum']:.0f} -> {new['optimum']:.0f}, scoring is not identical")
+
+    # older baselines have no start up times
+    for name, old in baseline.get('startup', {}).items():
+        new = current.get('startup', {}).get(name)
+        if new is not None and new > old * (1.0 + tolerance):
+            rv.append(f"startup_{name}: {old:.3f}s -> {new:.3f}s")
+    return rv
+
+
+def main():
+
+    # command line
+    #       python Benchmark.py run baseline.json [--quick] [--repeat=N] [--scale]
+    #       python Benchmark.py compare baseline.json [--tolerance=0.2]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('run', 'compare'):
+        print("Usage:")
+        print("     python Benchmark.py run baseline.json [--quick] [--repeat=N] [--scale]")
+        print("     python Benchmark.py compare baseline.json [--tolerance=0.2]")
+        exit(-1)
+
+    command, filename = sys.argv[1], sys.argv[2]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[3:] if arg.startswith('--'))
+
+    if command == 'run':
+        # --quick trades solution quality for a short run, handy while iterating
+        benchmark = Benchmark(repeat=int(options.get('repeat', 1)), scale='scale' in options)
+        if 'quick' in options:
+            benchmark.max_anneals = 60
+            benchmark.max_trials = 300
+        save_baseline(filename, benchmark.run())
+
+    else:
+        # re-run with exactly the baseline settings
+        baseline = load_baseline(filename)
+        benchmark = Benchmark(**baseline['settings'])
+        regressions = compare(baseline, benchmark.run(), float(options.get('tolerance', DEFAULT_TOLERANCE)))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            exit(1)
+        print("No regressions")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+from Presolve import presolve
+import math
+import sys
+
+
+###########################################################################################
+#
+#
+class BudgetExceeded(Exception):
+    pass
+
+
+###########################################################################################
+#
+#
+class ExactSolver:
+    """
+    Exhaustive branch and bound search for the true optimum of a SimulatedAnnealingSolver.
+
+    The search builds every ordered prefix that covers all targets (solver.uncovered_count()
+    reaches 0), and prunes any prefix whose solver.completion_bound() can't beat the best
+    covering prefix found so far.  Only practical for the small island counts of a single
+    region map, so the search gives up after node_budget prefixes.
+    """
+    def __init__(self, solver, node_budget: int = 2000000):
+        self.solver = solver
+        self.node_budget = node_budget
+
+        # results of the last solve()
+        self.best_score = -math.inf
+        self.best_prefix = list()
+        self.nodes = 0
+
+        # True if the search finished inside the node budget, i.e. best_score is the proven optimum
+        self.complete = False
+
+    def solve(self, incumbent_score: float = -math.inf) -> float:
+        """
+        :param incumbent_score: score of a known solution (e.g. from annealing), used to prune from the start
+        :return: the optimum score, or None if the node budget ran out first
+        """
+        self.best_score = incumbent_score
+        self.best_prefix = list()
+        self.nodes = 0
+        self.complete = False
+
+        # dominated and duplicate islands which can't be filler either can't improve on the islands that dominate them
+        candidates = list(self.solver.the_list)
+        if getattr(self.solver, 'presolve_enabled', False):
+            candidates = presolve(self.solver, getattr(self.solver, 'presolve_pruning', False)).kept
+
+        try:
+            self.search(list(), candidates)
+        except BudgetExceeded:
+            return None
+
+        self.complete = True
+        return self.best_score
+
+    def search(self, prefix: list, remaining: list):
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise BudgetExceeded()
+
+        solver = self.solver
+        if prefix and solver.uncovered_count(prefix) == 0:
+            prefix_score = solver.score(prefix)
+            if prefix_score > self.best_score or not self.best_prefix and prefix_score == self.best_score:
+                self.best_score = prefix_score
+                self.best_prefix = prefix
+            return
+
+        if not remaining:
+            return
+        # until a prefix matching the incumbent turns up, keep anything which could equal it
+        bound = solver.completion_bound(prefix, remaining)
+        if bound < self.best_score or self.best_prefix and bound <= self.best_score:
+            return
+
+        # most promising extensions first, so good incumbents turn up early and prune the rest
+        scored = sorted(((solver.score(prefix + [item]), ndx) for ndx, item in enumerate(remaining)), reverse=True)
+        for _, ndx in scored:
+            self.search(prefix + [remaining[ndx]], remaining[:ndx] + remaining[ndx + 1:])
+
+
+def main():
+
+    # command line
+    #       python ExactSolver.py latium|albion inputfile.csv
+    if len(sys.argv) != 3 or sys.argv[1] not in ('latium', 'albion'):
+        print("Usage:")
+        print("     python ExactSolver.py latium|albion inputfile.csv")
+        exit(-1)
+
+    if sys.argv[1] == 'latium':
+        from LatiumSolver import LatiumSolver
+        solver = LatiumSolver()
+    else:
+        from AlbionSolver import AlbionSolver
+        solver = AlbionSolver()
+    solver.set_filename(sys.argv[2])
+
+    exact = ExactSolver(solver)
+    optimum = exact.solve()
+    if optimum is None:
+        print(f"Node budget [{exact.node_budget}] exceeded")
+    else:
+        names = ', '.join(island.island_name for island in exact.best_prefix)
+        print(f"Optimum: [{names}] (Score = {optimum:.0f}) Nodes: [{exact.nodes}]")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
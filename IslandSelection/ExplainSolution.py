@@ -0,0 +1,192 @@
+from Region import *
+import numpy
+import sys
+
+# swaps shown per solution island by the command line
+SHOWN_SWAPS = 3
+
+
+def explain(solver) -> list:
+    """
+    Break every solution island's part of the score down into its terms.  The island scores and
+    marginals are the ones solver.result() records, and the coverage is solver.covering_walk()'s,
+    so the explanation always adds up the same way the score does; only the split of each island
+    score into fertility, slot and size points is worked out here, from the region's island arrays.
+    :return: list with a dictionary per solution island
+        island          island name
+        fertilities     fertility label -> points, for the fertilities it newly covers, after any slot scaling
+        scaled          fertility label -> 'slots' or 'mountains', for the fertilities whose points were scaled
+        slots           river/marsh slot points
+        mountains       mountain slot points
+        size            island size points
+        island_score    the sum of the above
+        discount        extra_island_reduction_rate ** position
+        penalty         extra_island_penalty * position
+        marginal        island_score * discount - penalty, i.e. what it adds to the total
+        uncovered       the targeted fertility bits still uncovered before this island
+    """
+    region = solver.region
+    steps = solver.result().steps
+    islands = solver.the_list[:len(steps)]
+    masks, values, _ = region.island_arrays(islands)
+    scaled_by = {SLOT_SCALING: 'slots', MOUNTAIN_SCALING: 'mountains'}
+
+    rv = []
+    for ndx, (island, step) in enumerate(zip(islands, steps)):
+        uncovered = solver.covering_walk(islands[:ndx])[1]
+        fertilities = dict()
+        scaled = dict()
+        for column in numpy.flatnonzero((int(masks[ndx]) & uncovered & region.bits) != 0):
+            label = region.labels[column]
+            fertilities[label] = float(values[ndx, column])
+            if region.scaling[column] in scaled_by:
+                scaled[label] = scaled_by[region.scaling[column]]
+
+        discount = solver.extra_island_reduction_rate ** ndx
+        rv.append({
+            'island': island.island_name,
+            'fertilities': fertilities,
+            'scaled': scaled,
+            'slots': region.slot_weight * island.slots,
+            'mountains': region.mountain_weight * island.mountain_slots,
+            'size': region.size_weights[island.island_size],
+            'island_score': step['island_score'],
+            'discount': discount,
+            'penalty': step['island_score'] * discount - step['marginal'],
+            'marginal': step['marginal'],
+            'uncovered': uncovered,
+        })
+    return rv
+
+
+def swap_deltas(solver, steps: list = None) -> tuple:
+    """
+    What-if swaps: the score change from swapping each solution island with each island the
+    solution doesn't use, i.e. the unused island takes its place and it goes where the unused one was.
+
+    For every solution position, all the unused islands are scored at once with the region's
+    island arrays: the uncovered fertilities become one bitmask per candidate, and the rest of the
+    solution is re-walked for all of them together.  A swap which leaves fertilities uncovered at
+    the end of the solution walks on into the rest of the list, and those few are scored one by one.
+    :param steps: explain(solver), if already done
+    :return: (number of solution islands, indices of the unused islands in solver.the_list,
+        deltas array of [solution position, unused island])
+    """
+    if steps is None:
+        steps = explain(solver)
+
+    the_list = solver.the_list
+    region = solver.region
+    count = len(steps)
+    unused = numpy.arange(count, len(the_list))
+    deltas = numpy.zeros((count, len(unused)))
+    if len(unused) == 0:
+        return count, unused, deltas
+
+    masks, values, base = region.island_arrays(the_list)
+    bits = region.bits
+    reduction_rate = solver.extra_island_reduction_rate
+    penalty = solver.extra_island_penalty
+    current = sum(step['marginal'] for step in steps)
+
+    # the score of the solution islands before each position
+    before = numpy.concatenate([[0.0], numpy.cumsum([step['marginal'] for step in steps])])
+
+    for position in range(count):
+        uncovered = numpy.full(len(unused), steps[position]['uncovered'], dtype=numpy.int64)
+        total = numpy.zeros(len(unused))
+        done = numpy.zeros(len(unused), dtype=bool)
+        for ndx in range(position, count):
+            include = (uncovered[:, None] & bits[None, :]) != 0
+            if ndx == position:
+                # a different island for every candidate
+                island_masks = masks[unused]
+                island_scores = base[unused] + (values[unused] * include).sum(axis=1)
+            else:
+                island_masks = masks[ndx]
+                island_scores = base[ndx] + include @ values[ndx]
+
+            total += numpy.where(done, 0.0, island_scores * reduction_rate ** ndx - ndx * penalty)
+            uncovered &= ~island_masks
+            if ndx == 0:
+                uncovered |= region.readd_after_first
+            done |= uncovered == 0
+
+        # still uncovered after the last solution island, the walk carries on down the list,
+        # where the swapped out island now sits in the candidate's old place
+        for candidate in numpy.flatnonzero(~done):
+            remaining = int(uncovered[candidate])
+            swap_index = unused[candidate]
+            ndx = count
+            while remaining and ndx < len(the_list):
+                island = the_list[position] if ndx == swap_index else the_list[ndx]
+                total[candidate] += (reduction_rate ** ndx) * solver.island_score(island, remaining) - ndx * penalty
+                remaining &= ~int(island.fertilities)
+                ndx += 1
+
+        deltas[position] = before[position] + total - current
+
+    return count, unused, deltas
+
+
+def print_explanation(solver, shown_swaps: int = SHOWN_SWAPS):
+    steps = explain(solver)
+    count, unused, deltas = swap_deltas(solver, steps)
+    names = ', '.join(step['island'] for step in steps)
+    print(f"Islands: [{names}] (Score = {sum(step['marginal'] for step in steps):.0f})")
+
+    region = solver.region
+    for position, step in enumerate(steps):
+        print(f"  #{position + 1} [{step['island']}] island score [{step['island_score']:.1f}] "
+              f"x [{step['discount']:.3f}] - penalty [{step['penalty']:.0f}] = [{step['marginal']:.1f}]")
+        terms = [f"{label} {points:g}" + (f" ({step['scaled'][label]} scaled)" if label in step['scaled'] else '')
+                 for label, points in step['fertilities'].items()]
+        terms += [f"{region.slot_label} {step['slots']:g}", f"Mountains {step['mountains']:g}", f"Size {step['size']:g}"]
+        print(f"       {', '.join(terms)}")
+
+        # best swaps first, a negative delta means the solution island is the better choice
+        order = numpy.argsort(-deltas[position])[:shown_swaps]
+        swaps = ', '.join(f"{solver.the_list[unused[candidate]].island_name} ({deltas[position, candidate]:+.0f})"
+                          for candidate in order)
+        if swaps:
+            print(f"       best swaps: {swaps}")
+
+
+def main():
+
+    # command line
+    #       python ExplainSolution.py latium|albion inputfile.csv [coverage] [--seed=N]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) not in (2, 3) or args[0] not in ('latium', 'albion'):
+        print("Usage:")
+        print("     python ExplainSolution.py latium|albion inputfile.csv [coverage] [--seed=N]")
+        exit(-1)
+
+    if args[0] == 'latium':
+        from LatiumSolver import LatiumSolver as solver_class
+    else:
+        from AlbionSolver import AlbionSolver as solver_class
+    from SolutionCache import solution_cache
+
+    solver = solver_class()
+    solver.set_filename(args[1])
+    try:
+        solver.set_coverage(solver.region.coverage(args[2] if len(args) == 3 else 'all'))
+        if options.get('seed'):
+            solver.set_seed(int(options['seed']))
+        solver.solve_cached(solution_cache)
+    except KeyError as e:
+        print(f"Unknown coverage {e}")
+        exit(1)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    print(f"Region map: [{solver.filename}]")
+    print_explanation(solver)
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
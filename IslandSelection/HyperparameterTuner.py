@@ -0,0 +1,260 @@
+from Benchmark import MAP_DIR, latium_solver, albion_solver, save_baseline
+from AlbionIsland import AlbionFertility
+from ExactSolver import ExactSolver
+import glob
+import json
+import math
+import os
+import random
+import sys
+import time
+
+# bump this whenever the search space or the objective changes
+TUNER_VERSION = 2
+
+# default location of the recommendations, next to this script
+RECOMMENDED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tuned_parameters.json')
+
+# the search space, name -> (low, high, scale)
+#   'log'   log-uniform float
+#   'float' uniform float
+#   'int'   uniform integer
+# only the annealing parameters, the scoring parameters define what a good island set is, so a
+# recommendation must never change them
+SEARCH_SPACE = {
+    'temperature': (50.0, 5000.0, 'log'),
+    'cooling_rate': (0.80, 0.99, 'float'),
+    'max_anneals': (20, 200, 'int'),
+    'max_trials': (100, 1000, 'int'),
+}
+
+# these change the score function itself, so if a custom search space includes them, results are
+# still re-scored with the solver defaults, and they are never recommended
+SCORING_PARAMETERS = ('extra_island_reduction_rate', 'extra_island_penalty')
+
+# coverage groups for the Albion maps, the same two populations AlbionSolver.main() solves
+ALBION_COVERAGES = {
+    'celtic': AlbionFertility.celtic,
+    'roman': AlbionFertility.roman,
+}
+
+
+def region_tasks(region: str, map_dir: str = MAP_DIR) -> list:
+    """
+    :return: list of (region, filename, coverage name) for every bundled map of this region
+    """
+    rv = list()
+    for pattern in ('corners_seed*', 'archipelago_seed*'):
+        for filename in sorted(glob.glob(os.path.join(map_dir, f"{pattern}_{region}.csv"))):
+            if region == 'albion':
+                rv.extend((region, filename, coverage) for coverage in ALBION_COVERAGES)
+            else:
+                rv.append((region, filename, ''))
+    return rv
+
+
+def make_solver(task: tuple):
+    region, filename, coverage = task
+    if region == 'albion':
+        return albion_solver(filename, ALBION_COVERAGES[coverage]())
+    return latium_solver(filename)
+
+
+def task_optimum(task: tuple) -> float:
+    """
+    exact optimum of one map, the yardstick for solution quality
+    """
+    rv = ExactSolver(make_solver(task)).solve()
+    if rv is None:
+        raise ValueError(f"Map [{task[1]}] is too big for ExactSolver, can't measure solution quality")
+    return rv
+
+
+def solution_quality(score: float, optimum: float) -> float:
+    """
+    1.0 at the optimum, less the further below it the score is
+    the gap is measured relative to the optimum, i.e. score / optimum for the usual positive optimum,
+    but a map whose optimum is 0 or negative (a heavy extra_island_penalty) still gets a sensible quality
+    """
+    return 1.0 - (optimum - score) / max(abs(optimum), 1.0)
+
+
+def evaluate(job: tuple) -> tuple:
+    """
+    one annealing run, in a worker process
+    :param job: (task, parameters, seed, optimum)
+    :return: (quality, cpu seconds), where quality is solution_quality() under the default scoring
+    """
+    task, parameters, seed, optimum = job
+    solver = make_solver(task)
+    defaults = {name: getattr(solver, name) for name in SCORING_PARAMETERS}
+    solver.top_k = 0
+    solver.set_parameters(parameters)
+    solver.set_seed(seed)
+
+    start = time.process_time()
+    solver.solve()
+    cpu_seconds = time.process_time() - start
+
+    solver.set_parameters(defaults)
+    return solution_quality(solver.score(solver.the_list), optimum), cpu_seconds
+
+
+###########################################################################################
+#
+#
+class HyperparameterTuner:
+    """
+    Successive halving search over SEARCH_SPACE, for one region.
+
+    Round 0 runs every random candidate on a few (map, seed) jobs, then each following round
+    keeps the best 1/eta of the candidates and gives them eta times as many jobs.  Jobs run in
+    parallel across a process pool.
+
+    The objective is solution quality per CPU-second, where quality is the mean of
+    solution_quality(), i.e. score / exact optimum for a positive optimum.  Candidates whose mean quality falls below min_quality are ranked
+    behind every candidate which reaches it, however fast they are, since a quick wrong
+    answer is no use.
+    """
+    def __init__(self, region: str, candidates: int = 27, eta: int = 3, initial_jobs: int = 2,
+                 min_quality: float = 0.99, seed: int = 1, processes: int = None, search_space: dict = None):
+        self.region = region
+        self.candidates = candidates
+        self.eta = eta
+        self.initial_jobs = initial_jobs
+        self.min_quality = min_quality
+        self.seed = seed
+        self.processes = processes
+        self.search_space = search_space if search_space is not None else SEARCH_SPACE
+
+        self.rng = random.Random(seed)
+        self.tasks = region_tasks(region)
+
+        # survivors of the last tune() round, list of dictionaries, best first
+        self.ranking = []
+
+    def sample(self) -> dict:
+        rv = dict()
+        for name, (low, high, scale) in self.search_space.items():
+            if scale == 'log':
+                rv[name] = math.exp(self.rng.uniform(math.log(low), math.log(high)))
+            elif scale == 'int':
+                rv[name] = self.rng.randint(low, high)
+            else:
+                rv[name] = self.rng.uniform(low, high)
+        return rv
+
+    @staticmethod
+    def rank_key(entry: dict) -> tuple:
+        return entry['eligible'], entry['objective']
+
+    def tune(self, verbose: bool = True) -> dict:
+        """
+        :return: the best candidate, dictionary of parameters, quality, cpu_seconds, objective
+        """
+        if not self.tasks:
+            raise ValueError(f"No maps found for region [{self.region}]")
+
+        # imported here, only tuning needs the worker processes
+        import multiprocessing
+
+        with multiprocessing.Pool(self.processes) as pool:
+            optima = dict(zip(self.tasks, pool.map(task_optimum, self.tasks)))
+
+            # every (map, seed) job in a fixed shuffled order, so each round extends the last one's jobs
+            jobs = [(task, seed) for seed in range(1, 1 + self.eta ** 4) for task in self.tasks]
+            self.rng.shuffle(jobs)
+
+            survivors = [{'parameters': self.sample()} for _ in range(self.candidates)]
+            job_count = self.initial_jobs
+            round_number = 0
+            while True:
+                job_count = min(job_count, len(jobs))
+                work = [(task, survivor['parameters'], seed, optima[task])
+                        for survivor in survivors for task, seed in jobs[:job_count]]
+                results = pool.map(evaluate, work)
+
+                for ndx, survivor in enumerate(survivors):
+                    chunk = results[ndx * job_count:(ndx + 1) * job_count]
+                    quality = sum(result[0] for result in chunk) / job_count
+                    cpu_seconds = sum(result[1] for result in chunk) / job_count
+                    survivor['quality'] = quality
+                    survivor['cpu_seconds'] = cpu_seconds
+                    survivor['objective'] = quality / max(cpu_seconds, 1e-9)
+                    survivor['eligible'] = quality >= self.min_quality
+                    survivor['jobs'] = job_count
+
+                survivors.sort(key=self.rank_key, reverse=True)
+                if verbose:
+                    best = survivors[0]
+                    print(f"Region [{self.region}] Round [{round_number}] Candidates [{len(survivors)}] "
+                          f"Jobs [{job_count}] Best quality [{best['quality']:.4f}] "
+                          f"CPU [{best['cpu_seconds']:.2f}s] Eligible [{best['eligible']}]")
+
+                if len(survivors) <= 1 or job_count >= len(jobs):
+                    break
+                survivors = survivors[:max(1, len(survivors) // self.eta)]
+                job_count *= self.eta
+                round_number += 1
+
+        self.ranking = survivors
+        return survivors[0]
+
+
+def save_recommendations(filename: str, recommendations: dict, settings: dict):
+    """
+    write the recommendations, keeping any other regions already in the file
+    """
+    regions = dict()
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('version') == TUNER_VERSION:
+            regions = data['regions']
+    regions.update(recommendations)
+    save_baseline(filename, {'version': TUNER_VERSION, 'settings': settings, 'regions': regions})
+
+
+def load_recommended(region: str, filename: str = RECOMMENDED_FILE) -> dict:
+    """
+    :return: the recommended solver parameters for this region, or an empty dictionary if there are none
+    """
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('version') != TUNER_VERSION:
+        return {}
+    parameters = data['regions'].get(region, {}).get('parameters', {})
+    return {name: value for name, value in parameters.items() if name not in SCORING_PARAMETERS}
+
+
+def main():
+
+    # command line
+    #       python HyperparameterTuner.py [latium|albion ...] [--candidates=27] [--processes=N] [--output=file.json]
+    regions = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or ['latium', 'albion']
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    if any(region not in ('latium', 'albion') for region in regions):
+        print("Usage:")
+        print("     python HyperparameterTuner.py [latium|albion ...] [--candidates=27] [--processes=N] [--output=file.json]")
+        exit(-1)
+
+    candidates = int(options.get('candidates', 27))
+    processes = int(options['processes']) if 'processes' in options else None
+    filename = options.get('output', RECOMMENDED_FILE)
+
+    recommendations = dict()
+    for region in regions:
+        tuner = HyperparameterTuner(region, candidates=candidates, processes=processes)
+        best = tuner.tune()
+        recommendations[region] = best
+        print(f"Region [{region}] Recommended: {json.dumps(best['parameters'])}")
+
+    save_recommendations(filename, recommendations, {'candidates': candidates, 'search_space': SEARCH_SPACE})
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
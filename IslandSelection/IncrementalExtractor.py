@@ -0,0 +1,266 @@
+from SavegameReader import *
+import json
+import os
+import sys
+import tempfile
+
+# bump this whenever IslandRecord extraction or the fingerprints change, so stale cache files get ignored
+EXTRACTOR_VERSION = 2
+
+
+###########################################################################################
+#
+#
+class IslandRecord:
+    """
+    The per-island data pulled out of one AreaInfo entry and its AreaManager_{id} node
+    """
+    def __init__(self, area_id: int, owner: int = 0, fertilities: list = None, buildings: dict = None):
+        self.area_id = area_id
+        self.owner = owner
+
+        # list of fertility GUIDs
+        self.fertilities = fertilities if fertilities is not None else []
+
+        # dictionary of object ID -> building guid
+        self.buildings = buildings if buildings is not None else {}
+
+    @classmethod
+    def from_elements(cls, area_id: int, area_info, area_manager):
+        """
+        decode one island.  Handles both the Anno 117 flat OwnerProfile and the
+        Anno 1800 nested Owner/id
+        """
+        owner_text = child_text(area_info, 'OwnerProfile') or child_text(area_info, 'Owner/id')
+        owner = hex_to_int(owner_text)
+
+        fertilities = list()
+        if area_info is not None:
+            fertilities = [hex_to_int(node.text or '') for node in area_info.iterfind('Fertility/None')]
+
+        buildings = dict()
+        if area_manager is not None:
+            for game_object in area_manager.iterfind('AreaObjectManager/GameObject/objects/None'):
+                object_id = child_text(game_object, 'ID')
+                if object_id:
+                    buildings[hex_to_int(object_id)] = hex_to_int(child_text(game_object, 'guid'))
+
+        return cls(area_id, owner, fertilities, buildings)
+
+    def to_dict(self) -> dict:
+        # json keys must be strings
+        return {
+            'owner': self.owner,
+            'fertilities': self.fertilities,
+            'buildings': {str(key): value for key, value in self.buildings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, area_id: int, data: dict):
+        return cls(area_id, data['owner'], data['fertilities'],
+                   {int(key): value for key, value in data['buildings'].items()})
+
+
+###########################################################################################
+#
+#
+class IslandDiff:
+    """
+    What changed on one island between two savegames
+    """
+    def __init__(self, area_id: int):
+        self.area_id = area_id
+        self.new_island = False
+        self.removed_island = False
+
+        # lists of (object ID, building guid)
+        self.new_buildings = []
+        self.removed_buildings = []
+
+        # lists of fertility GUIDs
+        self.fertilities_added = []
+        self.fertilities_removed = []
+
+        # (old owner, new owner), or None if unchanged
+        self.owner_change = None
+
+    @classmethod
+    def compare(cls, area_id: int, old: IslandRecord, new: IslandRecord):
+        rv = cls(area_id)
+        if old is None:
+            rv.new_island = True
+            old = IslandRecord(area_id)
+        if new is None:
+            rv.removed_island = True
+            new = IslandRecord(area_id)
+
+        rv.new_buildings = [(key, new.buildings[key]) for key in sorted(new.buildings.keys() - old.buildings.keys())]
+        rv.removed_buildings = [(key, old.buildings[key]) for key in sorted(old.buildings.keys() - new.buildings.keys())]
+        rv.fertilities_added = sorted(set(new.fertilities) - set(old.fertilities))
+        rv.fertilities_removed = sorted(set(old.fertilities) - set(new.fertilities))
+        if old.owner != new.owner and not (rv.new_island or rv.removed_island):
+            rv.owner_change = (old.owner, new.owner)
+        return rv
+
+    def is_empty(self) -> bool:
+        return not (self.new_island or self.removed_island or self.new_buildings or self.removed_buildings
+                    or self.fertilities_added or self.fertilities_removed or self.owner_change)
+
+    def to_dict(self) -> dict:
+        return {
+            'area_id': self.area_id,
+            'new_island': self.new_island,
+            'removed_island': self.removed_island,
+            'new_buildings': self.new_buildings,
+            'removed_buildings': self.removed_buildings,
+            'fertilities_added': self.fertilities_added,
+            'fertilities_removed': self.fertilities_removed,
+            'owner_change': self.owner_change,
+        }
+
+
+###########################################################################################
+#
+#
+class IncrementalExtractor:
+    """
+    Extract island data from consecutive savegames of the same game, re-decoding only the
+    islands whose AreaInfo entry or AreaManager_{id} subtree has changed since the last run.
+
+    Each island is fingerprinted by hashing the raw XML text of its AreaInfo entry and its
+    AreaManager_{id} subtree, found by their text ranges without parsing the savegame, and only
+    the islands whose fingerprint changed are parsed and decoded.  The fingerprints plus the
+    decoded IslandRecords are kept in a json cache file between runs.
+    """
+    def __init__(self, cache_filename: str = ''):
+        self.cache_filename = cache_filename
+
+        # session GUID -> area_id -> {'fingerprint': str, 'record': IslandRecord}
+        self.islands: dict[int, dict] = {}
+
+        # statistics for the last update() call
+        self.decoded_count = 0
+        self.reused_count = 0
+
+        if cache_filename:
+            self.load_cache()
+
+    def load_cache(self):
+        if not os.path.exists(self.cache_filename):
+            return
+        with open(self.cache_filename, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('version') != EXTRACTOR_VERSION:
+            return
+        for session_guid, islands in data['sessions'].items():
+            session = self.islands.setdefault(int(session_guid), {})
+            for area_id, entry in islands.items():
+                session[int(area_id)] = {
+                    'fingerprint': entry['fingerprint'],
+                    'record': IslandRecord.from_dict(int(area_id), entry['record']),
+                }
+
+    def save_cache(self):
+        if not self.cache_filename:
+            return
+        data = {
+            'version': EXTRACTOR_VERSION,
+            'sessions': {
+                str(session_guid): {
+                    str(area_id): {'fingerprint': entry['fingerprint'], 'record': entry['record'].to_dict()}
+                    for area_id, entry in islands.items()
+                }
+                for session_guid, islands in self.islands.items()
+            },
+        }
+        # write to a uniquely named temp file and rename, so a crash never leaves a half-written cache,
+        # and two extractors sharing a cache never write into the same temp file
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(self.cache_filename) or '.',
+                                             prefix=os.path.basename(self.cache_filename) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(temp_filename, self.cache_filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+    def update(self, savegame: Savegame) -> list:
+        """
+        bring the cached island data up to date with this savegame
+        :return: list of IslandDiff for every island that changed
+        """
+        rv = list()
+        self.decoded_count = 0
+        self.reused_count = 0
+
+        # everything is found and fingerprinted in the raw text, only the changed islands get parsed
+        session_ranges = savegame.session_text_ranges()
+        for session_guid, (start, end) in session_ranges.items():
+            manager_ranges = savegame.area_manager_ranges(start, end)
+
+            old_islands = self.islands.get(session_guid, {})
+            new_islands = dict()
+            for area_id, info_range in savegame.area_info_ranges(start, end):
+                manager_range = manager_ranges.get(area_id)
+                fingerprint = savegame.fingerprint(*info_range)
+                if manager_range is not None:
+                    fingerprint += savegame.fingerprint(*manager_range)
+
+                old_entry = old_islands.get(area_id)
+                if old_entry is not None and old_entry['fingerprint'] == fingerprint:
+                    new_islands[area_id] = old_entry
+                    self.reused_count += 1
+                    continue
+
+                area_manager = savegame.element(*manager_range) if manager_range is not None else None
+                record = IslandRecord.from_elements(area_id, savegame.element(*info_range), area_manager)
+                new_islands[area_id] = {'fingerprint': fingerprint, 'record': record}
+                self.decoded_count += 1
+
+                diff = IslandDiff.compare(area_id, old_entry['record'] if old_entry else None, record)
+                if not diff.is_empty():
+                    rv.append(diff)
+
+            for area_id in sorted(old_islands.keys() - new_islands.keys()):
+                rv.append(IslandDiff.compare(area_id, old_islands[area_id]['record'], None))
+
+            self.islands[session_guid] = new_islands
+
+        # sessions which aren't in this savegame any more, every island in them is gone
+        for session_guid in sorted(self.islands.keys() - session_ranges.keys()):
+            old_islands = self.islands.pop(session_guid)
+            for area_id in sorted(old_islands):
+                rv.append(IslandDiff.compare(area_id, old_islands[area_id]['record'], None))
+
+        return rv
+
+    def records(self, session_guid: int) -> dict:
+        """
+        :return: dictionary of area_id -> IslandRecord for one session
+        """
+        return {area_id: entry['record'] for area_id, entry in self.islands.get(session_guid, {}).items()}
+
+
+def main():
+
+    # command line
+    #       python IncrementalExtractor.py cache.json savegame.xml [savegame2.xml ...]
+    if len(sys.argv) < 3:
+        print("Usage:")
+        print("     python IncrementalExtractor.py cache.json savegame.xml [savegame2.xml ...]")
+        exit(-1)
+
+    extractor = IncrementalExtractor(sys.argv[1])
+    for filename in sys.argv[2:]:
+        diffs = extractor.update(Savegame(filename))
+        print(f"Savegame: [{filename}] Decoded: [{extractor.decoded_count}] Reused: [{extractor.reused_count}]")
+        for diff in diffs:
+            print(f"    {json.dumps(diff.to_dict())}")
+    extractor.save_cache()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import sys
+import numpy
+
+# bump this whenever the island parsing changes, so cache entries written by older parsers
+# never match and get pruned
+PARSER_VERSION = 2
+
+# default location of the cache directory, next to the solver scripts
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.island_cache')
+
+
+###########################################################################################
+#
+#
+class IslandCache:
+    """
+    Content-addressed cache of parsed island sets.
+
+    Entries are keyed by the hash of the input file contents, the island class and the parser
+    version, so an edited input file or a parser change simply misses the cache.  Each entry
+    stores the parsed islands as compact numpy arrays (.npz):
+        names, fertility bitmasks, river/marsh slots, mountain slots, sizes, positions
+
+    Entries are also held in memory, so re-loading the same file in one run is free.
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR, max_entries: int = 256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+        # cache key -> dictionary of numpy arrays
+        self.memory = {}
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_hash(filename: str) -> str:
+        """
+        hash of the file contents, read in chunks so big savegames aren't loaded all at once
+        """
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, filename: str, island_class) -> str:
+        return f"{island_class.__name__}_v{PARSER_VERSION}_{self.file_hash(filename)}"
+
+    def entry_filename(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def load_islands(self, filename: str, island_class, parse_function) -> list:
+        """
+        return the islands for this file, from the cache if possible
+        :param filename: input file
+        :param island_class: LatiumIsland, AlbionIsland, ...
+        :param parse_function: called as parse_function(filename) on a cache miss, returns list of islands
+        :return: list of freshly constructed island objects
+        """
+        key = self.key(filename, island_class)
+
+        arrays = self.memory.get(key)
+        if arrays is None:
+            arrays = self.read_entry(key)
+            if arrays is not None:
+                self.memory[key] = arrays
+
+        if arrays is not None:
+            self.hits += 1
+            return self.from_arrays(arrays, island_class)
+
+        self.misses += 1
+        islands = parse_function(filename)
+        arrays = self.to_arrays(islands)
+        self.memory[key] = arrays
+        self.write_entry(key, arrays)
+        return islands
+
+    def read_entry(self, key: str):
+        entry_filename = self.entry_filename(key)
+        if not os.path.exists(entry_filename):
+            return None
+        try:
+            with numpy.load(entry_filename) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            # corrupt entry, drop it and re-parse
+            self.remove(entry_filename)
+            return None
+
+        # touch the entry, so pruning keeps recently used ones
+        try:
+            os.utime(entry_filename)
+        except OSError:
+            pass
+        return arrays
+
+    def write_entry(self, key: str, arrays: dict):
+        """
+        the cache is only a speed-up, so if it can't be written (e.g. a read-only checkout) the
+        islands just aren't cached, rather than failing the solve
+        """
+        entry_filename = self.entry_filename(key)
+        temp_filename = entry_filename + f'.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # write to a temp file and rename, so a crash never leaves a half-written entry
+            with open(temp_filename, 'wb') as file:
+                numpy.savez(file, **arrays)
+            os.replace(temp_filename, entry_filename)
+            self.prune()
+        except OSError:
+            self.remove(temp_filename)
+
+    @staticmethod
+    def remove(filename: str):
+        """
+        remove a file if it's there and can be removed
+        """
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def prune(self):
+        """
+        remove entries written by other parser versions, and the least recently used entries
+        beyond max_entries
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = list()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith('.npz'):
+                continue
+            if f"_v{PARSER_VERSION}_" not in name:
+                os.remove(path)
+                continue
+            entries.append((os.path.getmtime(path), path))
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            os.remove(path)
+
+    def clear(self):
+        self.memory.clear()
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def to_arrays(islands: list) -> dict:
+        """
+        pack a list of islands into numpy arrays
+        """
+        fields = [island.to_fields() for island in islands]
+        positions = [island.position if island.position is not None else (numpy.nan, numpy.nan)
+                     for island in islands]
+        return {
+            'names': numpy.array([field[0] for field in fields], dtype=str),
+            'fertilities': numpy.array([int(field[1]) for field in fields], dtype=numpy.uint32),
+            'slots': numpy.array([field[2] for field in fields], dtype=numpy.int16),
+            'mountains': numpy.array([field[3] for field in fields], dtype=numpy.int16),
+            'sizes': numpy.array([int(field[4]) for field in fields], dtype=numpy.int8),
+            'positions': numpy.array(positions, dtype=numpy.float64).reshape(len(islands), 2),
+        }
+
+    @staticmethod
+    def from_arrays(arrays: dict, island_class) -> list:
+        """
+        unpack numpy arrays back into island objects
+        """
+        # the fertility and size enums are whatever the island class ctor defaults use
+        fertility_class = type(island_class('').fertilities)
+        size_class = type(island_class('').island_size)
+
+        rv = list()
+        for ndx in range(len(arrays['names'])):
+            island = island_class(str(arrays['names'][ndx]),
+                                  fertility_class(int(arrays['fertilities'][ndx])),
+                                  int(arrays['slots'][ndx]),
+                                  int(arrays['mountains'][ndx]),
+                                  size_class(int(arrays['sizes'][ndx])))
+            x, y = arrays['positions'][ndx]
+            if not (numpy.isnan(x) or numpy.isnan(y)):
+                island.set_position((float(x), float(y)))
+            rv.append(island)
+        return rv
+
+
+# shared instance, so every solver in one process shares the in-memory entries
+island_cache = IslandCache()
+
+
+def main():
+
+    # command line
+    #       python IslandCache.py clear
+    if len(sys.argv) != 2 or sys.argv[1] not in ('clear', 'prune'):
+        print("Usage:")
+        print("     python IslandCache.py clear|prune")
+        exit(-1)
+
+    if sys.argv[1] == 'clear':
+        island_cache.clear()
+    else:
+        island_cache.prune()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
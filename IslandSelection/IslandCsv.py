@@ -0,0 +1,199 @@
+from Region import *
+import numpy
+import sys
+
+# fertility flags are blank or 0 for absent, and any other whole number (normally 1) for present,
+# anything else is reported as malformed
+
+# stop collecting errors after this many, a file that bad is probably the wrong region
+MAX_ERRORS = 50
+
+
+###########################################################################################
+#
+#
+class IslandCsvError(ValueError):
+    """
+    One or more malformed rows in an island CSV file.
+    errors is a list of (line number, message), line numbers counting from 1
+    """
+    def __init__(self, filename: str, errors: list):
+        self.filename = filename
+        self.errors = errors
+        lines = [f"    line {line_number}: {message}" for line_number, message in errors]
+        super().__init__(f"Malformed island file [{filename}]:\n" + '\n'.join(lines))
+
+    def __reduce__(self):
+        # pickle by the constructor arguments, e.g. to get back from a worker process
+        return type(self), (self.filename, self.errors)
+
+
+###########################################################################################
+#
+#
+class IslandTable:
+    """
+    A whole island file as flat arrays, one entry per island
+        names           island names
+        fertilities     fertility bitmasks
+        slots           river/marsh slots
+        mountains       mountain slots
+        sizes           IslandSize values
+        line_numbers    line each island came from
+    """
+    def __init__(self, region: Region, names: list, fertilities, slots, mountains, sizes, line_numbers):
+        self.region = region
+        self.names = names
+        self.fertilities = fertilities
+        self.slots = slots
+        self.mountains = mountains
+        self.sizes = sizes
+        self.line_numbers = line_numbers
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def to_islands(self, island_class) -> list:
+        """
+        :return: list of island_class objects
+        """
+        fertility_class = self.region.fertility_class
+        return [island_class(name, fertility_class(int(fertilities)), int(slots), int(mountains), IslandSize(int(size)))
+                for name, fertilities, slots, mountains, size
+                in zip(self.names, self.fertilities, self.slots, self.mountains, self.sizes)]
+
+
+def column_map(region: Region, header: list) -> dict:
+    """
+    :return: dictionary of column name -> column index, for every column the region needs
+    :raise KeyError: naming the missing columns
+    """
+    positions = {label.strip().lower(): ndx for ndx, label in enumerate(header)}
+    rv = dict()
+    missing = list()
+    for label in region.header():
+        ndx = positions.get(label.lower())
+        if ndx is None:
+            missing.append(label)
+        else:
+            rv[label] = ndx
+    if missing:
+        raise KeyError(', '.join(missing))
+    return rv
+
+
+def read_island_csv(filename: str, region: Region) -> IslandTable:
+    """
+    Read a whole island CSV file in one pass.
+
+    Columns are found by the names in the '#Name,...' header row, so column order doesn't
+    matter and extra columns are ignored.  Files without a header row use the region's
+    standard layout.  Any other line starting with '#' is a comment.  Every malformed row is
+    collected and reported together.
+    :raise IslandCsvError: if any row is malformed
+    """
+    with open(filename, 'r', encoding='utf-8-sig') as file:
+        text = file.read()
+
+    header = None
+    header_line = 1
+    rows = list()
+    line_numbers = list()
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == '#':
+            # a '#Name,...' line before the first row is the header, any other '#' line is a comment
+            fields = line[1:].split(',')
+            if header is None and not rows and fields[0].strip().lower() == 'name':
+                header = fields
+                header_line = line_number
+            continue
+        rows.append([field.strip() for field in line.split(',')])
+        line_numbers.append(line_number)
+
+    if header is None:
+        header = region.header()
+    try:
+        columns = column_map(region, header)
+    except KeyError as e:
+        raise IslandCsvError(filename, [(header_line, f"header is missing columns: {e.args[0]}")])
+
+    # pad short rows, so the arrays are rectangular; the padding shows up as errors below
+    errors = list()
+    width = len(header)
+    for ndx, row in enumerate(rows):
+        if len(row) < width:
+            errors.append((line_numbers[ndx], f"expected [{width}] fields, found [{len(row)}]"))
+            rows[ndx] = row + [''] * (width - len(row))
+    table = numpy.array([row[:width] for row in rows], dtype=str).reshape(len(rows), width)
+
+    names = table[:, columns['Name']]
+    for ndx in numpy.flatnonzero(names == ''):
+        errors.append((line_numbers[ndx], "missing island name"))
+
+    # fertility flags, all columns at once
+    fertility_columns = [columns[label] for label in region.labels]
+    flags = table[:, fertility_columns]
+    numeric = numpy.char.isdigit(flags)
+    present = numeric & (numpy.char.strip(flags, '0') != '')
+    bad = ~numeric & (flags != '')
+    for ndx, column in zip(*numpy.nonzero(bad)):
+        errors.append((line_numbers[ndx], f"fertility [{region.labels[column]}] should be blank or 1, found [{flags[ndx, column]}]"))
+    fertilities = present.astype(numpy.int64) @ region.bits
+
+    # slot counts
+    counts = dict()
+    for label in ('Mountains', region.slot_label):
+        column = table[:, columns[label]]
+        valid = numpy.char.isdigit(column)
+        for ndx in numpy.flatnonzero(~valid):
+            errors.append((line_numbers[ndx], f"[{label}] should be a whole number, found [{column[ndx]}]"))
+        counts[label] = numpy.where(valid, column, '0').astype(numpy.int64)
+
+    # sizes
+    size_column = numpy.char.upper(table[:, columns['Size']])
+    sizes = numpy.zeros(len(rows), dtype=numpy.int8)
+    known = numpy.zeros(len(rows), dtype=bool)
+    for label, size in ISLAND_SIZE_LABELS.items():
+        match = size_column == label
+        sizes[match] = size
+        known |= match
+    for ndx in numpy.flatnonzero(~known):
+        errors.append((line_numbers[ndx], f"[Size] should be one of {list(ISLAND_SIZE_LABELS)}, found [{size_column[ndx]}]"))
+
+    if errors:
+        errors.sort(key=lambda error: error[0])
+        raise IslandCsvError(filename, errors[:MAX_ERRORS])
+
+    return IslandTable(region, [str(name) for name in names], fertilities, counts[region.slot_label],
+                       counts['Mountains'], sizes, numpy.array(line_numbers, dtype=numpy.int64))
+
+
+def main():
+
+    # command line
+    #       python IslandCsv.py latium|albion inputfile.csv
+    if len(sys.argv) != 3 or sys.argv[1] not in ('latium', 'albion'):
+        print("Usage:")
+        print("     python IslandCsv.py latium|albion inputfile.csv")
+        exit(-1)
+
+    if sys.argv[1] == 'latium':
+        from LatiumIsland import LATIUM as region
+    else:
+        from AlbionIsland import ALBION as region
+
+    try:
+        table = read_island_csv(sys.argv[2], region)
+    except IslandCsvError as e:
+        print(e)
+        exit(1)
+
+    print(f"Islands: [{len(table)}] OK")
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
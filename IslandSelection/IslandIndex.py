@@ -0,0 +1,308 @@
+from IslandSelect import REGION_SOLVERS, solver_class
+from Region import ISLAND_SIZE_LABELS, IslandSize
+from IslandCsv import read_island_csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# bump this whenever the schema changes, older databases are refused rather than misread
+INDEX_VERSION = 1
+
+# bundled map names, e.g. corners_seed4428_latium.csv
+MAP_NAME_PATTERN = re.compile(r'(?P<map_type>[a-z]+)_seed(?P<seed>\d+)_(?P<region>[a-z]+)$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS maps (
+    id INTEGER PRIMARY KEY,
+    filename TEXT UNIQUE NOT NULL,
+    region TEXT NOT NULL,
+    map_type TEXT,
+    seed INTEGER,
+    file_hash TEXT,
+    island_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS islands (
+    id INTEGER PRIMARY KEY,
+    map_id INTEGER NOT NULL REFERENCES maps(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    fertilities INTEGER NOT NULL,
+    slots INTEGER NOT NULL,
+    mountains INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    x REAL,
+    y REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    map_id INTEGER NOT NULL REFERENCES maps(id) ON DELETE CASCADE,
+    coverage TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    score REAL NOT NULL,
+    islands TEXT NOT NULL,
+    parameters TEXT,
+    created REAL
+);
+CREATE INDEX IF NOT EXISTS maps_region ON maps(region, map_type, seed);
+CREATE INDEX IF NOT EXISTS islands_size ON islands(size, fertilities, map_id);
+CREATE INDEX IF NOT EXISTS islands_map ON islands(map_id);
+CREATE INDEX IF NOT EXISTS results_map ON results(map_id, coverage, score);
+"""
+
+
+def map_details(filename: str) -> dict:
+    """
+    :return: region, map type and seed from a map file name, just the region for other names ending
+        in _latium / _albion, otherwise empty
+    """
+    basename = os.path.splitext(os.path.basename(filename))[0]
+    match = MAP_NAME_PATTERN.match(basename)
+    if match is not None and match['region'] in REGION_SOLVERS:
+        return {'region': match['region'], 'map_type': match['map_type'], 'seed': int(match['seed'])}
+    region = basename.rpartition('_')[2]
+    return {'region': region} if region in REGION_SOLVERS else {}
+
+
+def fertility_mask(region, names: list) -> int:
+    """
+    :param names: fertility CSV labels ('Gold Ore') or enum names ('GOLD_ORE'), any case
+    :raise ValueError: naming the fertilities the region doesn't have
+    """
+    lookup = dict()
+    for label, fertility in zip(region.labels, region.fertility_class):
+        lookup[label.lower()] = fertility
+        lookup[fertility.name.lower()] = fertility
+    unknown = [name for name in names if name.lower() not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown [{region.name}] fertilities {unknown}")
+    rv = 0
+    for name in names:
+        rv |= int(lookup[name.lower()])
+    return rv
+
+
+###########################################################################################
+#
+#
+class IslandIndex:
+    """
+    SQLite index of the islands of many maps, and the solver results for them, so questions like
+    "which seeds have an XL island with Gold Ore and Sturgeon" or "best Latium score by map type"
+    are one indexed query instead of re-reading and re-solving every file.
+
+        maps        one row per map file, with region, map type and seed taken from the file name
+        islands     one row per island, fertilities as the region's bitmask, size as an IslandSize value,
+                    and the map position when known (e.g. from a savegame)
+        results     one row per recorded solve, the solution islands as a json list of names
+
+    Each map is written in a single transaction, with executemany() for the islands.
+    Re-indexing an unchanged file does nothing, a changed file replaces its old rows.
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.create()
+
+    def create(self):
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            row = self.connection.execute("SELECT value FROM info WHERE name = 'version'").fetchone()
+            if row is None:
+                self.connection.execute("INSERT INTO info VALUES ('version', ?)", (str(INDEX_VERSION),))
+            elif int(row[0]) != INDEX_VERSION:
+                raise ValueError(f"Index [{self.filename}] is version [{row[0]}], expected [{INDEX_VERSION}]")
+
+    def close(self):
+        self.connection.close()
+
+    def map_id(self, filename: str):
+        row = self.connection.execute("SELECT id FROM maps WHERE filename = ?",
+                                      (os.path.abspath(filename),)).fetchone()
+        return row[0] if row is not None else None
+
+    def add_islands(self, filename: str, region: str, islands: list, map_type: str = None, seed: int = None,
+                    file_hash: str = None) -> int:
+        """
+        index a list of RegionIsland objects, replacing anything already indexed for this file
+        :return: the map id
+        """
+        rows = [(island.island_name, int(island.fertilities), island.slots, island.mountain_slots,
+                 int(island.island_size), *(island.position if island.position is not None else (None, None)))
+                for island in islands]
+        return self.add_rows(filename, region, rows, map_type, seed, file_hash)
+
+    def add_rows(self, filename: str, region: str, rows: list, map_type: str = None, seed: int = None,
+                 file_hash: str = None) -> int:
+        """
+        :param rows: list of (name, fertility bits, slots, mountains, size, x, y)
+        :return: the map id
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM maps WHERE filename = ?", (os.path.abspath(filename),))
+            cursor = self.connection.execute(
+                "INSERT INTO maps (filename, region, map_type, seed, file_hash, island_count) VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(filename), region, map_type, seed, file_hash, len(rows)))
+            map_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO islands (map_id, name, fertilities, slots, mountains, size, x, y) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(map_id, *row) for row in rows])
+        return map_id
+
+    def ingest_csv(self, filename: str, region: str = None) -> bool:
+        """
+        index an island CSV file, the region comes from the file name if not given
+        :return: False if the file is already indexed and unchanged
+        :raise IslandCsvError: if the file is malformed
+        """
+        details = map_details(filename)
+        region = region or details.get('region')
+        if region not in REGION_SOLVERS:
+            raise ValueError(f"Can't tell the region of [{filename}], expected one of {list(REGION_SOLVERS)}")
+
+        with open(filename, 'rb') as file:
+            file_hash = hashlib.sha256(file.read()).hexdigest()
+        row = self.connection.execute("SELECT file_hash FROM maps WHERE filename = ?",
+                                      (os.path.abspath(filename),)).fetchone()
+        if row is not None and row[0] == file_hash:
+            return False
+
+        # straight from the parsed arrays, no island objects needed
+        table = read_island_csv(filename, solver_class(region).island_class.region)
+        rows = zip(table.names, table.fertilities.tolist(), table.slots.tolist(), table.mountains.tolist(),
+                   table.sizes.tolist(), [None] * len(table), [None] * len(table))
+        self.add_rows(filename, region, list(rows), details.get('map_type'), details.get('seed'), file_hash)
+        return True
+
+    def add_result(self, filename: str, coverage: str, engine: str, islands: list, score: float,
+                   parameters: dict = None) -> int:
+        """
+        record a solve of an indexed map
+        :param islands: names of the solution islands, in settling order
+        :return: the result id
+        """
+        map_id = self.map_id(filename)
+        if map_id is None:
+            raise ValueError(f"Map [{filename}] isn't indexed")
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO results (map_id, coverage, engine, score, islands, parameters, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (map_id, coverage, engine, score, json.dumps(islands),
+                 json.dumps(parameters) if parameters is not None else None, time.time()))
+        return cursor.lastrowid
+
+    def solve(self, filename: str, coverage: str = 'all', seed: int = None) -> float:
+        """
+        anneal an indexed map, and record the result
+        :return: the score
+        """
+        row = self.connection.execute("SELECT region FROM maps WHERE filename = ?",
+                                      (os.path.abspath(filename),)).fetchone()
+        if row is None:
+            raise ValueError(f"Map [{filename}] isn't indexed")
+
+        solver = solver_class(row[0])()
+        solver.set_filename(filename)
+        solver.set_coverage(solver.region.coverage(coverage))
+        if seed is not None:
+            solver.set_seed(seed)
+        solver.solve()
+
+        result = solver.result()
+        self.add_result(filename, coverage, result.engine, result.islands, result.score, solver.solver_parameters())
+        return result.score
+
+    def seeds_with_island(self, region: str, size: IslandSize, fertilities: int) -> list:
+        """
+        maps with at least one island of this size which has every one of these fertilities
+        :return: list of (map type, seed, filename, island name)
+        """
+        return self.connection.execute(
+            "SELECT maps.map_type, maps.seed, maps.filename, islands.name FROM islands "
+            "JOIN maps ON maps.id = islands.map_id "
+            "WHERE islands.size = ? AND (islands.fertilities & ?) = ? AND maps.region = ? "
+            "ORDER BY maps.map_type, maps.seed, islands.name",
+            (int(size), fertilities, fertilities, region)).fetchall()
+
+    def best_scores(self, region: str, coverage: str = 'all') -> list:
+        """
+        best recorded score for each map type
+        :return: list of (map type, best score, seed, filename, solution island names), best first
+        """
+        rows = self.connection.execute(
+            "SELECT maps.map_type, MAX(results.score), maps.seed, maps.filename, results.islands FROM results "
+            "JOIN maps ON maps.id = results.map_id "
+            "WHERE maps.region = ? AND results.coverage = ? "
+            "GROUP BY maps.map_type ORDER BY MAX(results.score) DESC",
+            (region, coverage)).fetchall()
+        return [(map_type, score, seed, filename, json.loads(islands))
+                for map_type, score, seed, filename, islands in rows]
+
+
+def main():
+
+    # command line
+    #       python IslandIndex.py index.db ingest inputfile.csv ...
+    #       python IslandIndex.py index.db solve inputfile.csv ... [--coverage=name] [--seed=N]
+    #       python IslandIndex.py index.db seeds latium|albion XL|L|M|S fertility ...
+    #       python IslandIndex.py index.db best latium|albion [coverage]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    commands = {'ingest': 3, 'solve': 3, 'seeds': 5, 'best': 3}
+    if len(args) < 3 or args[1] not in commands or len(args) < commands[args[1]] \
+            or (args[1] in ('seeds', 'best') and args[2] not in REGION_SOLVERS) \
+            or (args[1] == 'seeds' and args[3].upper() not in ISLAND_SIZE_LABELS) or (args[1] == 'best' and len(args) > 4):
+        print("Usage:")
+        print("     python IslandIndex.py index.db ingest inputfile.csv ...")
+        print("     python IslandIndex.py index.db solve inputfile.csv ... [--coverage=name] [--seed=N]")
+        print("     python IslandIndex.py index.db seeds latium|albion XL|L|M|S fertility ...")
+        print("     python IslandIndex.py index.db best latium|albion [coverage]")
+        exit(-1)
+
+    index = IslandIndex(args[0])
+    command = args[1]
+    try:
+        if command == 'ingest':
+            start = time.perf_counter()
+            added = sum(index.ingest_csv(filename) for filename in args[2:])
+            print(f"Indexed [{added}] new or changed maps of [{len(args) - 2}] in {time.perf_counter() - start:.2f}s")
+
+        elif command == 'solve':
+            seed = int(options['seed']) if options.get('seed') else None
+            for filename in args[2:]:
+                index.ingest_csv(filename)
+                score = index.solve(filename, options.get('coverage') or 'all', seed)
+                print(f"{os.path.basename(filename):36} Score [{score:.0f}]")
+
+        elif command == 'seeds':
+            region = solver_class(args[2]).island_class.region
+            mask = fertility_mask(region, args[4:])
+            for map_type, seed, filename, name in index.seeds_with_island(args[2], ISLAND_SIZE_LABELS[args[3].upper()], mask):
+                print(f"{map_type or '?':12} Seed [{seed if seed is not None else '?'}] Island [{name}] [{filename}]")
+
+        else:
+            coverage = args[3] if len(args) == 4 else 'all'
+            for map_type, score, seed, filename, islands in index.best_scores(args[2], coverage):
+                print(f"{map_type or '?':12} Score [{score:.0f}] Seed [{seed if seed is not None else '?'}] "
+                      f"Islands [{', '.join(islands)}]")
+
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        exit(1)
+    finally:
+        index.close()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
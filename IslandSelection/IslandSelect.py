@@ -0,0 +1,253 @@
+from SolverResult import SolverResult, RESULT_WRITERS
+import os
+import sys
+import time
+
+# One command line for all the island selection tools.
+#
+# Nothing heavy is imported up here: numpy, the solvers, the savegame parser, asyncio and
+# multiprocessing are only imported by the code path that needs them, so printing the usage,
+# or handing a solve to a running SolverService, doesn't pay for any of them.
+
+# region -> (module, solver class)
+REGION_SOLVERS = {
+    'latium': ('LatiumSolver', 'LatiumSolver'),
+    'albion': ('AlbionSolver', 'AlbionSolver'),
+}
+
+ENGINES = ('anneal', 'exact', 'service')
+
+# the other tools, command -> module, run with the rest of the command line as their own
+TOOLS = {
+    'check': 'IslandCsv',
+    'explain': 'ExplainSolution',
+    'sweep': 'WeightSweep',
+    'generate': 'MapGenerator',
+    'benchmark': 'Benchmark',
+    'tune': 'HyperparameterTuner',
+    'service': 'SolverService',
+    'index': 'IslandIndex',
+    'routes': 'TradeRouteAnalyzer',
+    'extract': 'IncrementalExtractor',
+}
+
+# solve options, name -> True if the option takes a value
+SOLVE_OPTIONS = {
+    'coverage': True,
+    'engine': True,
+    'format': True,
+    'seed': True,
+    'mode': True,
+    'checkpoint': True,
+    'resume': False,
+    'no-cache': False,
+    'tuned': False,
+    'port': True,
+    'socket': True,
+}
+
+
+def solver_class(region: str):
+    """
+    :return: the solver class for a region, importing it on first use
+    """
+    module_name, class_name = REGION_SOLVERS[region]
+    module = __import__(module_name)
+    return getattr(module, class_name)
+
+
+def parse_options(args: list) -> tuple:
+    """
+    :return: (positional arguments, dictionary of --name[=value] options)
+    :raise ValueError: for unknown options, or values given to / missing from the wrong options
+    """
+    positional = list()
+    options = dict()
+    for arg in args:
+        if not arg.startswith('--'):
+            positional.append(arg)
+            continue
+        name, equals, value = arg[2:].partition('=')
+        if name not in SOLVE_OPTIONS:
+            raise ValueError(f"Unknown option [--{name}]")
+        if SOLVE_OPTIONS[name] != bool(equals):
+            raise ValueError(f"Option [--{name}] {'needs' if SOLVE_OPTIONS[name] else 'takes no'} value")
+        options[name] = value
+    return positional, options
+
+
+def tuned_parameters(region: str) -> dict:
+    """
+    :return: the HyperparameterTuner recommendations for a region
+    :raise ValueError: if the tuner hasn't been run for it
+    """
+    from HyperparameterTuner import RECOMMENDED_FILE, load_recommended
+    rv = load_recommended(region)
+    if not rv:
+        raise ValueError(f"No tuned parameters for [{region}] in [{RECOMMENDED_FILE}], run HyperparameterTuner.py first")
+    return rv
+
+
+def file_options(options: dict, filename: str, count: int) -> dict:
+    """
+    a checkpoint only holds one problem, so with several input files each gets its own checkpoint file,
+    named after the input file
+    """
+    if count == 1 or 'checkpoint' not in options:
+        return options
+    from SimulatedAnnealingSolver import stage_checkpoint
+    stage = os.path.splitext(os.path.basename(filename))[0]
+    return {**options, 'checkpoint': stage_checkpoint(options['checkpoint'], stage)}
+
+
+def solve_local(region: str, filename: str, options: dict):
+    """
+    solve in this process, with the annealing or the exact engine
+    :return: SolverResult
+    """
+    solver = solver_class(region)()
+    solver.set_filename(filename)
+    solver.set_coverage(solver.region.coverage(options.get('coverage', 'all')))
+    if 'tuned' in options:
+        solver.set_parameters(tuned_parameters(region))
+    if 'seed' in options:
+        solver.set_seed(int(options['seed']))
+    if 'mode' in options:
+        solver.search_mode = options['mode']
+    if 'checkpoint' in options:
+        solver.checkpoint_filename = options['checkpoint']
+
+    engine = options.get('engine', 'anneal')
+    if engine == 'exact':
+        from ExactSolver import ExactSolver
+        exact = ExactSolver(solver)
+        start = time.perf_counter()
+        if exact.solve() is None:
+            raise ValueError(f"Node budget [{exact.node_budget}] exceeded, the map is too big for the exact engine")
+
+        # put the optimum first, so the result walks it
+        solver.the_list = exact.best_prefix + [island for island in solver.the_list if island not in exact.best_prefix]
+        solver.solve_time = time.perf_counter() - start
+
+    elif 'resume' in options or 'no-cache' in options:
+        solver.solve(resume='resume' in options)
+    else:
+        from SolutionCache import solution_cache
+        solver.solve_cached(solution_cache)
+
+    return solver.result(engine)
+
+
+def solve_service(region: str, filenames: list, options: dict, writer) -> int:
+    """
+    hand the solves to a running SolverService as one batch, and write the results as they come back
+    :return: number of failed solves
+    """
+    from SolverClient import DEFAULT_PORT, request
+
+    unsupported = {'mode', 'checkpoint', 'resume', 'no-cache'} & set(options)
+    if unsupported:
+        raise ValueError(f"The service engine doesn't support {['--' + name for name in sorted(unsupported)]}")
+
+    job = {'region': region, 'coverage': options.get('coverage', 'all')}
+    if 'seed' in options:
+        job['seed'] = int(options['seed'])
+    if 'tuned' in options:
+        job['parameters'] = tuned_parameters(region)
+    message = {'op': 'batch', 'jobs': [{**job, 'filename': os.path.abspath(filename)} for filename in filenames]}
+
+    address = {'port': int(options.get('port', DEFAULT_PORT)), 'socket_path': options.get('socket', '')}
+    rv = 0
+    try:
+        for event in request(message, **address):
+            if event['event'] == 'result':
+                writer.write(SolverResult.from_dict({**event, 'filename': filenames[event['job']]}))
+            elif event['event'] == 'error' and 'job' in event:
+                print(f"Error: [{filenames[event['job']]}] {event['message']}", file=sys.stderr)
+                rv += 1
+            elif event['event'] == 'error':
+                raise ValueError(event['message'])
+            elif event['event'] == 'done':
+                return rv
+    except OSError as e:
+        raise ValueError(f"Can't reach the solver service: {e}")
+    raise ValueError("The solver service closed the connection")
+
+
+def solve(args: list):
+    try:
+        positional, options = parse_options(args)
+        if len(positional) < 2 or positional[0] not in REGION_SOLVERS:
+            raise ValueError("Expected a region and one or more input files")
+        engine = options.get('engine', 'anneal')
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine [{engine}], expected one of {list(ENGINES)}")
+        output_format = options.get('format', 'text')
+        if output_format not in RESULT_WRITERS:
+            raise ValueError(f"Unknown format [{output_format}], expected one of {list(RESULT_WRITERS)}")
+        if options.get('mode', 'list') not in ('list', 'prefix'):
+            raise ValueError(f"Unknown mode [{options['mode']}], expected one of ['list', 'prefix']")
+        if 'resume' in options and 'checkpoint' not in options:
+            raise ValueError("--resume needs a --checkpoint file")
+    except ValueError as e:
+        print(f"Error: {e}")
+        usage()
+
+    region, filenames = positional[0], positional[1:]
+    writer = RESULT_WRITERS[output_format](sys.stdout)
+
+    # every result is written as soon as it's ready, errors go to stderr so they don't end up in the json / csv
+    failed = 0
+    try:
+        if engine == 'service':
+            failed = solve_service(region, filenames, options, writer)
+        else:
+            for filename in filenames:
+                try:
+                    writer.write(solve_local(region, filename, file_options(options, filename, len(filenames))))
+                except KeyError as e:
+                    print(f"Error: [{filename}] unknown coverage {e}", file=sys.stderr)
+                    failed += 1
+                except (OSError, ValueError) as e:
+                    # includes malformed input files and maps which can't cover every fertility
+                    print(f"Error: [{filename}] {e}", file=sys.stderr)
+                    failed += 1
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        exit(1)
+
+    if failed:
+        exit(1)
+
+
+def usage():
+    print("Usage:")
+    print("     python IslandSelect.py solve latium|albion inputfile.csv ... [--coverage=all|celtic|roman]")
+    print("                [--engine=anneal|exact|service] [--format=text|json|csv] [--seed=N] [--mode=list|prefix]")
+    print("                [--checkpoint=file [--resume]] [--no-cache] [--tuned] [--port=N | --socket=path]")
+    print(f"     python IslandSelect.py {'|'.join(TOOLS)} ...")
+    print("                runs that tool, with the rest of the command line as its own, e.g.")
+    print("     python IslandSelect.py check latium inputfile.csv")
+    exit(-1)
+
+
+def main():
+
+    # command line, see usage()
+    if len(sys.argv) < 2:
+        usage()
+
+    command = sys.argv[1]
+    if command == 'solve':
+        solve(sys.argv[2:])
+    elif command in TOOLS:
+        # the tool sees the command line it would have seen if it was run directly
+        module = __import__(TOOLS[command])
+        sys.argv = [module.__file__] + sys.argv[2:]
+        module.main()
+    else:
+        usage()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,9 @@
-from enum import IntFlag, IntEnum, auto
-from typing import Self
+from Region import *
 
 ###########################################################################################
 #
 #
-class IslandSize(IntEnum):
-    """
-    enum for island sizes
-    """
-    EXTRALARGE = auto()
-    LARGE = auto()
-    MEDIUM = auto()
-    SMALL = auto()
-
-
-###########################################################################################
-#
-#
-class LatiumFertility(IntFlag):
+class LatiumFertility(RegionFertility):
     """
     bitmapped enum for latium island fertilities
     """
@@ -37,35 +23,94 @@ class LatiumFertility(IntFlag):
     MINERAL = auto()
     GOLD_ORE = auto()
 
-    @staticmethod
-    def no_fertilities():
-        return LatiumFertility.NONE
 
-    @staticmethod
-    def all_fertilities():
-        rv = LatiumFertility.NONE
-        for f in LatiumFertility:
-            rv |= f.value
-        return rv
+def latium_weights() -> dict:
+    """
+    Weighting Scheme
+    Tier2 - 70 points per production chain
+    Tier3 - 50 points per production chain
+    Tier4 - 30 points per production chain
+    Construction material - use tier scores, but divide by 2
+    River slots - 5 point per slot, adjusted by gold ore and/or sturgeon presence
+    Mountain slots - 5 point per slot, adjusted by mineral score?
+    """
+    fertility_weight = {}
+
+    # tier2 chains - garum, soap
+    fertility_weight[LatiumFertility.MACKEREL] = 70
+    fertility_weight[LatiumFertility.LAVENDAR] = 70
+
+    # tier3 chains - amphorae, olives
+    fertility_weight[LatiumFertility.RESIN] = 50
+    fertility_weight[LatiumFertility.OLIVE] = 50
+
+    # tier4 chains - wine, togas, loungers, writing tablets, lyres, oysters w caviar, necklaces
+    fertility_weight[LatiumFertility.GRAPES] = 30           # wine
+    fertility_weight[LatiumFertility.FLAX] = 60             # togas, loungers
+    fertility_weight[LatiumFertility.MUREX_SNAILS] = 30     # togas, loungers
+    fertility_weight[LatiumFertility.SANDARAC] = 90         # writing tablets, loungers, lyres
+    fertility_weight[LatiumFertility.OYSTER] = 30           # oysters with caviar
+    fertility_weight[LatiumFertility.STURGEON] = 30         # oysters with caviar
 
-    def dump(self):
-        print(f"Name:   [{self.name}]")
-        print(f"Value:  [{self.value}]")
+    # construction material for tier3 and tier4 buildings
+    # tier3 buildings - forum, baths
+    # tier4 buildings - temple, libarary, amphitheatre
+    # (50 + 50 + 30 + 30 + 30)/2
+    fertility_weight[LatiumFertility.MARBLE] = 80
 
-    def add(self, bits: int) -> Self:
-        return LatiumFertility(self.value | bits)
+    # construction material for tier2 weapons and armor
+    # (50 + 50)/2
+    fertility_weight[LatiumFertility.IRON] = 50
 
-    def remove(self, bits: int) -> Self:
-        return LatiumFertility(self.value & ~bits)
+    # tier4 production chains - fine glass, necklaces
+    # tier4 mosaics used in buildings temple, library, amphitheatre
+    # (30 + 30 + (30+30+30)/2)
+    fertility_weight[LatiumFertility.MINERAL] = 105
 
-    def has(self, bits: int) -> bool:
-        return self.value & bits == bits
+    # tier4 - necklaces, lyres
+    fertility_weight[LatiumFertility.GOLD_ORE] = 60
+
+    return fertility_weight
+
+
+###########################################################################################
+#
+#   the Latium region definition
+#
+LATIUM = Region(
+    'latium',
+    LatiumFertility,
+    latium_weights(),
+    slot_kind='river',
+    slot_label='Rivers',
+    slot_weight=5,                  # river slot weight
+    mountain_weight=5,              # mountain slot weight
+    size_weights={
+        IslandSize.EXTRALARGE: 300,
+        IslandSize.LARGE: 150,
+        IslandSize.MEDIUM: 75,
+        IslandSize.SMALL: 30,
+    },
+    # sturgeon and gold scale with the river slots, mineral with the mountain slots
+    slot_scaled=(LatiumFertility.STURGEON, LatiumFertility.GOLD_ORE),
+    mountain_scaled=(LatiumFertility.MINERAL,),
+    # ensure we still want a gold fertility, even if the main island had it - want a non-main island with gold
+    readd_after_first=LatiumFertility.GOLD_ORE,
+    reduction_rate=0.9,
+    penalty=200.0,
+    labels=['Mackerel', 'Lavender', 'Resin', 'Olive', 'Grapes', 'Flax', 'Murex Snail', 'Sandarac', 'Oyster',
+            'Sturgeon', 'Marble', 'Iron', 'Mineral', 'Gold Ore'],
+)
 
 
 ###########################################################################################
 #
 #
-class LatiumIsland:
+class LatiumIsland(RegionIsland):
+    """
+    #Name,Mackerel,Lavender,Resin,Olive,Grapes,Flax,Murex Snail,Sandarac,Oyster,Sturgeon,Marble,Iron,Mineral,Gold Ore,Mountains,Rivers,Size
+    """
+    region = LATIUM
 
     def __init__(self,
                  island_name: str,
@@ -74,208 +119,18 @@ class LatiumIsland:
                  mountain_slots: int = 0,
                  island_size: IslandSize = IslandSize.LARGE
                  ):
-        self.island_name = island_name
-        self.fertilities: LatiumFertility = fert_values
-        self.river_slots = river_slots
-        self.mountain_slots = mountain_slots
-        self.island_size = island_size
-
-        # dictionary of fertility types and their weights
-        self.fertility_weight = {}
-        self.island_size_weight = {}
-
-        # mountain and river slot weights
-        self.mountain_weight = 0
-        self.river_weight = 0
-
-        # call function to set all tuning values
-        self.define_weights()
-
-
-    # Returns an instance of LatiumIsland
-    @classmethod
-    def from_string(cls, island_string):
-        """
-        provides functionality similar to C++ overloaded ctor
-        allows contruction of a LatiumIsland from a string value taken from a .csv island file
-
-        #Name,Mackerel,Lavender,Resin,Olive,Grapes,Flax,Murex Snail,Sandarac,Oyster,Sturgeon,Marble,Iron,Mineral,Gold Ore,Mountains,Rivers,Size
-            0       Name
-            1-14    Fertilities, boolean [''|'1']
-            15      number mountain slots
-            16      number river slots
-            17      Island size, ['XL'|'L'|'M'|'S']
-        """
-        fields = island_string.strip().split(',')
-        # print(fields)
-        island_name = fields[0]
-
-        fertilities = LatiumFertility.NONE
-        for ndx, fert_value in enumerate(LatiumFertility):
-            if fields[ndx+1] != '':
-                fertilities |= fert_value
-
-        mountains = int(fields[15])
-        rivers = int(fields[16])
-
-        if fields[17] == 'XL':
-            size = IslandSize.EXTRALARGE
-        elif fields[17] == 'L':
-            size = IslandSize.LARGE
-        elif fields[17] == 'M':
-            size = IslandSize.MEDIUM
-        else:
-            size = IslandSize.SMALL
-
-        # finally construct the LatiumIsland object
-        return cls(island_name, fertilities, rivers, mountains, size)
-
-    def define_weights(self):
-        """
-        Weighting Scheme
-        Tier2 - 70 points per production chain
-        Tier3 - 50 points per production chain
-        Tier4 - 30 points per production chain
-        Construction material - use tier scores, but divide by 2
-        River slots - 5 point per slot, adjusted by gold ore and/or sturgeon presence
-        Mountain slots - 5 point per slot, adjusted by mineral score?
-        """
-        # tier2 chains - garum, soap
-        self.fertility_weight[LatiumFertility.MACKEREL] = 70
-        self.fertility_weight[LatiumFertility.LAVENDAR] = 70
-
-        # tier3 chains - amphorae, olives
-        self.fertility_weight[LatiumFertility.RESIN] = 50
-        self.fertility_weight[LatiumFertility.OLIVE] = 50
-
-        # tier4 chains - wine, togas, loungers, writing tablets, lyres, oysters w caviar, necklaces
-        self.fertility_weight[LatiumFertility.GRAPES] = 30           # wine
-        self.fertility_weight[LatiumFertility.FLAX] = 60             # togas, loungers
-        self.fertility_weight[LatiumFertility.MUREX_SNAILS] = 30     # togas, loungers
-        self.fertility_weight[LatiumFertility.SANDARAC] = 90         # writing tablets, loungers, lyres
-        self.fertility_weight[LatiumFertility.OYSTER] = 30           # oysters with caviar
-        self.fertility_weight[LatiumFertility.STURGEON] = 30         # oysters with caviar
-
-        # construction material for tier3 and tier4 buildings
-        # tier3 buildings - forum, baths
-        # tier4 buildings - temple, libarary, amphitheatre
-        # (50 + 50 + 30 + 30 + 30)/2
-        self.fertility_weight[LatiumFertility.MARBLE] = 80
-
-        # construction material for tier2 weapons and armor
-        # (50 + 50)/2
-        self.fertility_weight[LatiumFertility.IRON] = 50
-
-        # tier4 production chains - fine glass, necklaces
-        # tier4 mosaics used in buildings temple, library, amphitheatre
-        # (30 + 30 + (30+30+30)/2)
-        self.fertility_weight[LatiumFertility.MINERAL] = 105
-
-        # tier4 - necklaces, lyres
-        self.fertility_weight[LatiumFertility.GOLD_ORE] = 60
-
-        # mountain slot weight
-        self.mountain_weight = 5
-
-        # river slot weight
-        self.river_weight = 5
-
-        # island size
-        self.island_size_weight[IslandSize.EXTRALARGE] = 300
-        self.island_size_weight[IslandSize.LARGE] = 150
-        self.island_size_weight[IslandSize.MEDIUM] = 75
-        self.island_size_weight[IslandSize.SMALL] = 30
-
-
-    def calculate_score(self, include_fertilities: LatiumFertility) -> float:
-        """
-        determine score based purely on this island's fertilities
-        and the associated weighting values for each fertility
-        :return:
-        score
-        """
-        rv = 0.0
-
-        # start with basic fertilities
-        # note we only count basic fertilities which have NOT been counted already on a previous island
-        f: LatiumFertility
-        for f in LatiumFertility:
-            if self.has_fertility(f) and include_fertilities.has(f):
-
-                # sturgeon: base weighting assumes 10 river slots, adjust up or down if not 10
-                if f == LatiumFertility.STURGEON:
-                    rv += self.fertility_weight[f.value] * self.river_slots / 10.0
-
-                # gold: base weighting assumes 10 river slots, adjust up or down if not 10
-                elif f == LatiumFertility.GOLD_ORE:
-                    rv += self.fertility_weight[f.value] * self.river_slots / 10.0
-
-                # mineral: base weighting assumes 10 mountainn slots, adjust up or down if not 10
-                elif f == LatiumFertility.MINERAL:
-                    rv += self.fertility_weight[f.value] * self.mountain_slots / 10.0
-
-                # all other fertilities
-                else:
-                    rv += self.fertility_weight[f.value]
-
-        # river slots.
-        rv += self.river_weight * self.river_slots
-
-        # mountain slots.
-        rv += self.mountain_weight * self.mountain_slots
-
-        # island size
-        rv += self.island_size_weight[self.island_size]
-
-        # todo - need some way to assess total travel distance.  Get (x,y) info from savegame?
-
-        return rv
-
-    def add_fertility(self, fert_value: LatiumFertility):
-        """
-        Add a fertility to this island
-        :param fert_value:
-        LatiumFertility value to be added
-        :return:
-        None
-        """
-        self.fertilities |= fert_value
-
-    def remove_fertility(self, fert_value: LatiumFertility):
-        """
-        Remove a fertility to this island
-        :param fert_value:
-        LatiumFertility value to be removed
-        :return:
-        None
-        """
-        self.fertilities &= ~fert_value
-
-    def has_fertility(self, fert_value: LatiumFertility) -> bool:
-        """
-        Does this island have this fertility?
-        :param fert_value: LatiumFertility to be checked
-        :return:
-        True | False
-        """
-        return self.fertilities & fert_value == fert_value
-
-    def set_river_slots(self, slots: int):
-        self.river_slots = slots
-
-    def set_mountain_slots(self, slots: int):
-        self.mountain_slots = slots
+        super().__init__(island_name, fert_values, river_slots, mountain_slots, island_size)
 
-    def set_island_size(self, island_size: IslandSize):
-        self.island_size = island_size
+    @property
+    def river_slots(self) -> int:
+        return self.slots
 
-    def dump(self):
-        """
-        utility function to dump all class data to stdout
-        :return:
-        """
-        print(f"{vars(self)}")
+    @river_slots.setter
+    def river_slots(self, slots: int):
+        self.slots = slots
 
+    def set_river_slots(self, slots: int):
+        self.slots = slots
 
 
 def main():
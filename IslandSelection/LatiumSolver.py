@@ -1,120 +1,19 @@
 from LatiumIsland import *
-from SimulatedAnnealingSolver import *
+from RegionSolver import RegionSolver, InfeasibleCoverageError
+from SolutionCache import solution_cache
 import sys
 
 ###########################################################################################
 #
 #
-class LatiumSolver(SimulatedAnnealingSolver):
+class LatiumSolver(RegionSolver):
     """
     Solver for Latium Islands.
     Find an optimum set of Latium Islands which provides all Latium fertilities
-    """
-    def __init__(self):
-        # call parent ctor
-        super().__init__()
-
-        # input file
-        self.filename = ''
-
-        # solution tuning factors
-        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
-        self.max_trials = 1000      # max trials per annealing temperature
-        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
-        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
-
-        self.extra_island_reduction_rate = 0.9
-        self.extra_island_penalty = 200
-
-    def set_filename(self, filename: str):
-        # set up a basic array of islands
-        self.filename = filename
-        self.load_islands()
-
-    def load_islands(self):
-        """
-        load island info from a CSV file
-        # todo - read this info from a savegame file rather than a CSV file
-        ideally this function should be replaced to read the island info
-        directly from a save file
-        """
-
-        # ensure list starts empty
-        self.the_list = []
-
-        # walk the input file list
-        with open(self.filename, 'r') as file:
-            for line in file:
-                # Process each line here
-                if line[0] != '#':
-                    island = LatiumIsland.from_string(line.strip())
-                    self.the_list.append(island)
-                    # island.dump()
-
-    # define the virtual score() function
-    def score(self, candidate_list: list) -> float:
-
-        # determine a score for the first N islands, where N is the number of islands required
-        # to provide one of every fertility
-
-        # walk the list until we have gotten all the fertilities
-        # order matters, so reduce the score in subsequent islands by 'extra_island_reduction_rate'
-        # also, we only want the minimum number of islands to cover all fertilities, so
-        # add a penalty for every island beyond the first
-        rv = 0.0
-
-        # set the initial set of covered fertilities
-        covered_fertilities: LatiumFertility = LatiumFertility.all_fertilities()
-
-        island: LatiumIsland
-        for ndx, island in enumerate(candidate_list):
 
-            # get island score
-            rv += (self.extra_island_reduction_rate ** ndx) * island.calculate_score(covered_fertilities)
-            rv -= ndx * self.extra_island_penalty
-
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-
-            # ensure we still want a gold fertility, even if the main island had it - want a non-main island with gold
-            if ndx == 0:
-                covered_fertilities = covered_fertilities.add(LatiumFertility.GOLD_ORE)
-
-            if covered_fertilities == LatiumFertility.no_fertilities():
-                break
-        # print(f"highest index to cover all ferts = {ndx}")
-
-        return rv
-
-    def report(self) -> list:
-        """
-        write results of the solve action to stdout
-
-        :return: list of the islands in the solution
-        """
-        rv = list()
-        covered_fertilities = LatiumFertility.all_fertilities()
-
-        print(f"Islands: [", end = '')
-        island: LatiumIsland
-        for ndx, island in enumerate(self.the_list):
-            rv.append(island)
-            print(f"{island.island_name}", end = '')
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-
-            # ensure we still want a gold fertility, even if the main island had it - want a non-main island with gold
-            if ndx == 0:
-                covered_fertilities = covered_fertilities.add(LatiumFertility.GOLD_ORE)
-
-            if covered_fertilities == LatiumFertility.no_fertilities():
-                break
-            print(", ", end = '')
-
-        print(f"] (Score = {self.score(self.the_list):.0f})")
-
-        # return a list of the solution islands
-        return rv
+    Everything Latium specific lives in the LATIUM region definition, in LatiumIsland.py
+    """
+    island_class = LatiumIsland
 
 
 #
@@ -123,15 +22,20 @@ class LatiumSolver(SimulatedAnnealingSolver):
 def main():
 
     # command line
-    #       python LatiumSolver.py inputfile.csv
-    if len(sys.argv) != 2:
+    #       python LatiumSolver.py inputfile.csv [--seed=N]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    if len(args) != 1 or not set(options) <= {'seed'} or not options.get('seed', '0').isdigit():
         print("Usage:")
-        print("     python LatiumSolver.py inputfile.csv")
+        print("     python LatiumSolver.py inputfile.csv [--seed=N]")
+        print("        a seeded solve repeats exactly, and is remembered in the solution cache")
         exit(-1)
 
     # latium solver
     lat_solver = LatiumSolver()
-    lat_solver.set_filename(sys.argv[1])
+    lat_solver.set_filename(args[0])
+    if 'seed' in options:
+        lat_solver.set_seed(int(options['seed']))
     print('')
     print(f"Region map: [{lat_solver.filename}]")
     # score = lat_solver.score(lat_solver.the_list)
@@ -145,7 +49,11 @@ def main():
     lat_solver.report()
 
     # solve for an optimized set
-    lat_solver.solve()
+    try:
+        lat_solver.solve_cached(solution_cache)
+    except InfeasibleCoverageError as e:
+        print(f"Can't cover every Latium fertility: {e}")
+        exit(1)
     print("Optimized Island Set, Latium Islands:")
     print("            ", end = '')
     lat_solver.report()
@@ -0,0 +1,172 @@
+from Region import *
+from IslandCsv import IslandTable, read_island_csv
+import glob
+import os
+import sys
+import numpy
+
+# the bundled maps the island statistics are drawn from
+MAP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAP_PATTERNS = ('corners_seed*', 'archipelago_seed*')
+
+
+###########################################################################################
+#
+#
+class MapModel:
+    """
+    Island statistics of one region, fitted from existing maps
+        size_values, size_probabilities             island size mix
+        count_values, count_probabilities           how many fertilities an island has
+        fertility_frequencies                       how often each fertility turns up, in bit order
+        slot_pairs                                  size -> array of (mountains, slots) seen for that size
+    """
+    def __init__(self, region: Region):
+        self.region = region
+        self.size_values = numpy.array([int(IslandSize.LARGE)])
+        self.size_probabilities = numpy.array([1.0])
+        self.count_values = numpy.array([1])
+        self.count_probabilities = numpy.array([1.0])
+        self.fertility_frequencies = numpy.ones(len(region.bits))
+        self.slot_pairs = {int(IslandSize.LARGE): numpy.zeros((1, 2), dtype=numpy.int64)}
+
+    @classmethod
+    def fit(cls, region: Region, filenames: list = None):
+        """
+        :param filenames: island CSV files, default every bundled map of this region
+        """
+        if filenames is None:
+            filenames = sorted(filename for pattern in MAP_PATTERNS
+                               for filename in glob.glob(os.path.join(MAP_DIR, f"{pattern}_{region.name}.csv")))
+        if not filenames:
+            raise ValueError(f"No maps to fit the [{region.name}] island statistics from")
+
+        tables = [read_island_csv(filename, region) for filename in filenames]
+        masks = numpy.concatenate([table.fertilities for table in tables])
+        sizes = numpy.concatenate([table.sizes for table in tables]).astype(numpy.int64)
+        mountains = numpy.concatenate([table.mountains for table in tables])
+        slots = numpy.concatenate([table.slots for table in tables])
+
+        rv = cls(region)
+        rv.size_values, size_counts = numpy.unique(sizes, return_counts=True)
+        rv.size_probabilities = size_counts / size_counts.sum()
+
+        present = (masks[:, None] & region.bits[None, :]) != 0
+        rv.count_values, count_counts = numpy.unique(present.sum(axis=1), return_counts=True)
+        rv.count_probabilities = count_counts / count_counts.sum()
+
+        # +1 so a fertility the sample maps happen to lack can still turn up
+        rv.fertility_frequencies = present.sum(axis=0) + 1.0
+
+        rv.slot_pairs = {int(size): numpy.stack([mountains[sizes == size], slots[sizes == size]], axis=1)
+                         for size in rv.size_values}
+        return rv
+
+
+###########################################################################################
+#
+#
+class MapGenerator:
+    """
+    Random but realistic island sets of any size, for scale testing the solvers.
+
+    Each island draws its size from the size mix, its number of fertilities from the count
+    distribution, which fertilities from the per-fertility frequencies (without replacement),
+    and its mountain and river/marsh slots from a real island of the same size.
+    Everything is drawn for the whole map at once, so 10,000 islands take milliseconds.
+    """
+    def __init__(self, region: Region, model: MapModel = None, seed=None):
+        self.region = region
+        self.model = model if model is not None else MapModel.fit(region)
+        self.rng = numpy.random.default_rng(seed)
+
+        # make sure every fertility is on at least one island, so the map can be solved
+        self.ensure_coverage = True
+
+    def generate_table(self, count: int) -> IslandTable:
+        model = self.model
+        rng = self.rng
+        fertility_count = len(self.region.bits)
+
+        sizes = rng.choice(model.size_values, size=count, p=model.size_probabilities)
+        counts = rng.choice(model.count_values, size=count, p=model.count_probabilities)
+
+        # weighted sampling without replacement for every island at once: perturb the log
+        # frequencies with Gumbel noise and keep each island's top 'counts' fertilities
+        keys = numpy.log(model.fertility_frequencies)[None, :] + rng.gumbel(size=(count, fertility_count))
+        ranks = numpy.argsort(numpy.argsort(-keys, axis=1), axis=1)
+        present = ranks < counts[:, None]
+
+        if self.ensure_coverage and count > 0:
+            for column in numpy.flatnonzero(~present.any(axis=0)):
+                present[rng.integers(count), column] = True
+
+        fertilities = present.astype(numpy.int64) @ self.region.bits
+
+        mountains = numpy.zeros(count, dtype=numpy.int64)
+        slots = numpy.zeros(count, dtype=numpy.int64)
+        for size, pairs in model.slot_pairs.items():
+            where = numpy.flatnonzero(sizes == size)
+            picks = pairs[rng.integers(len(pairs), size=len(where))]
+            mountains[where] = picks[:, 0]
+            slots[where] = picks[:, 1]
+
+        names = [f"G{ndx:05d}" for ndx in range(count)]
+        return IslandTable(self.region, names, fertilities, slots, mountains, sizes.astype(numpy.int8),
+                           numpy.arange(2, count + 2, dtype=numpy.int64))
+
+    def generate_islands(self, count: int, island_class) -> list:
+        return self.generate_table(count).to_islands(island_class)
+
+    def generate_solver(self, count: int, solver_class):
+        """
+        :return: a solver_class object loaded with count generated islands, no file involved
+        """
+        rv = solver_class()
+        rv.the_list = self.generate_islands(count, solver_class.island_class)
+        return rv
+
+    def write_csv(self, filename: str, count: int, chunk_size: int = 10000):
+        """
+        write a generated map in the standard island CSV format, a chunk of rows at a time
+        """
+        labels = {size: label for label, size in ISLAND_SIZE_LABELS.items()}
+        with open(filename, 'w', encoding='utf-8') as file:
+            file.write('#' + ','.join(self.region.header()) + '\n')
+            written = 0
+            while written < count:
+                table = self.generate_table(min(chunk_size, count - written))
+                present = (table.fertilities[:, None] & self.region.bits[None, :]) != 0
+                lines = list()
+                for ndx in range(len(table)):
+                    flags = ','.join('1' if flag else '' for flag in present[ndx])
+                    lines.append(f"G{written + ndx:05d},{flags},{table.mountains[ndx]},{table.slots[ndx]},"
+                                 f"{labels[IslandSize(int(table.sizes[ndx]))]}\n")
+                file.write(''.join(lines))
+                written += len(table)
+
+
+def main():
+
+    # command line
+    #       python MapGenerator.py latium|albion count outputfile.csv [seed]
+    if len(sys.argv) not in (4, 5) or sys.argv[1] not in ('latium', 'albion'):
+        print("Usage:")
+        print("     python MapGenerator.py latium|albion count outputfile.csv [seed]")
+        exit(-1)
+
+    if sys.argv[1] == 'latium':
+        from LatiumIsland import LATIUM as region
+    else:
+        from AlbionIsland import ALBION as region
+
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    generator = MapGenerator(region, seed=seed)
+    generator.write_csv(sys.argv[3], int(sys.argv[2]))
+
+    print(f"Wrote [{sys.argv[2]}] {region.name} islands to [{sys.argv[3]}]")
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
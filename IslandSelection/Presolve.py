@@ -0,0 +1,120 @@
+import numpy
+
+# rows of the pairwise dominance test done at once, keeps the n x n comparison out of memory for big maps
+DOMINANCE_CHUNK = 1024
+
+
+###########################################################################################
+#
+#
+class InfeasibleCoverageError(ValueError):
+    """
+    The islands can't cover every targeted fertility, whatever order they're in.
+    missing holds the fertilities no island has
+    """
+    def __init__(self, missing):
+        self.missing = missing
+        names = ', '.join(f.name for f in type(missing) if missing & f)
+        super().__init__(f"No island has these fertilities: [{names}]")
+
+    def __reduce__(self):
+        # pickle by the constructor arguments, e.g. to get back from a worker process
+        return type(self), (self.missing,)
+
+
+###########################################################################################
+#
+#
+class PresolveResult:
+    """
+        kept            islands left for the search, in their original order
+        pruned          islands left out, in their original order
+        dominated       how many were dropped as dominated by another island
+        duplicates      how many were dropped as exact duplicates of a kept island
+    """
+    def __init__(self, kept: list, pruned: list, dominated: int, duplicates: int):
+        self.kept = kept
+        self.pruned = pruned
+        self.dominated = dominated
+        self.duplicates = duplicates
+
+
+def check_coverage(solver):
+    """
+    :raise InfeasibleCoverageError: if no ordering of the solver's islands covers the targeted fertilities
+    """
+    available = 0
+    for island in solver.the_list:
+        available |= int(island.fertilities)
+
+    # fertilities wanted again after the first island (Latium gold ore) just need to be somewhere too
+    wanted = int(solver.starting_fertilities) | (solver.region.readd_after_first & solver.region.all_bits)
+    missing = wanted & ~available
+    if missing:
+        raise InfeasibleCoverageError(solver.region.fertility_class(missing))
+
+
+def presolve(solver, prune: bool = False) -> PresolveResult:
+    """
+    Check the coverage, then, if asked, shrink the search space of a RegionSolver.
+
+    Island A is dominated by island B if, counting only the targeted fertilities, A's
+    fertilities are a subset of B's, and A has no more mountain or river/marsh slots, and
+    its size is worth no more than B's.  Whatever is still uncovered, B then scores at least
+    as much as A and covers at least as much.  Islands with identical profiles are collapsed
+    the same way, keeping the first.
+
+    That alone doesn't make A safe to drop: an island which covers nothing new still scores its
+    slots and size when it sits in front of the last covering island, so a big dominated island
+    can be worth having as filler.  So a dominated or duplicate island is only dropped if it
+    can't be worth anything after the first position either, i.e. if even with every fertility
+    it has still uncovered,
+        extra_island_reduction_rate * island score - extra_island_penalty <= 0
+    (later positions are discounted more and penalized more, so position 1 is its best).
+    :param prune: drop the dominated / duplicate islands, otherwise only check the coverage
+    :raise InfeasibleCoverageError: if the coverage can't be done at all
+    """
+    check_coverage(solver)
+
+    islands = solver.the_list
+    count = len(islands)
+    if count < 2 or not prune:
+        return PresolveResult(list(islands), [], 0, 0)
+
+    region = solver.region
+    wanted = int(solver.starting_fertilities) | (region.readd_after_first & region.all_bits)
+    masks = numpy.array([int(island.fertilities) & wanted for island in islands], dtype=numpy.int64)
+    slots = numpy.array([island.slots for island in islands], dtype=numpy.int64)
+    mountains = numpy.array([island.mountain_slots for island in islands], dtype=numpy.int64)
+    size_weights = numpy.array([region.size_weights[island.island_size] for island in islands], dtype=numpy.float64)
+
+    order = numpy.arange(count)
+    dominated = numpy.zeros(count, dtype=bool)
+    duplicate = numpy.zeros(count, dtype=bool)
+    for start in range(0, count, DOMINANCE_CHUNK):
+        rows = slice(start, min(start + DOMINANCE_CHUNK, count))
+
+        # [a, b] is True when island b is at least as good as island a in every respect
+        at_least = ((masks[rows, None] & ~masks[None, :]) == 0) \
+            & (slots[rows, None] <= slots[None, :]) \
+            & (mountains[rows, None] <= mountains[None, :]) \
+            & (size_weights[rows, None] <= size_weights[None, :])
+        same = (masks[rows, None] == masks[None, :]) & (slots[rows, None] == slots[None, :]) \
+            & (mountains[rows, None] == mountains[None, :]) & (size_weights[rows, None] == size_weights[None, :])
+
+        # strictly better somewhere, or an identical island which comes first
+        duplicate[rows] = (same & (order[None, :] < order[rows, None])).any(axis=1)
+        dominated[rows] = (at_least & ~same).any(axis=1)
+
+    # the best an island can add anywhere after the first position, see above
+    island_masks, values, base = region.island_arrays(islands)
+    best_score = base + (values * ((region.bits & wanted) != 0)[None, :]).sum(axis=1)
+    no_filler = solver.extra_island_reduction_rate * best_score - solver.extra_island_penalty <= 0
+    dominated &= no_filler
+    duplicate &= no_filler
+
+    # an identical island which is itself dominated doesn't matter, whichever one is dropped the other covers it
+    dropped = dominated | duplicate
+    kept = [island for island, drop in zip(islands, dropped) if not drop]
+    pruned = [island for island, drop in zip(islands, dropped) if drop]
+    return PresolveResult(kept, pruned, int(dominated.sum()), int((duplicate & ~dominated).sum()))
@@ -0,0 +1,295 @@
+from enum import IntFlag, IntEnum, auto
+from typing import Self
+import numpy
+
+###########################################################################################
+#
+#
+class IslandSize(IntEnum):
+    """
+    enum for island sizes
+    """
+    EXTRALARGE = auto()
+    LARGE = auto()
+    MEDIUM = auto()
+    SMALL = auto()
+
+
+# CSV size column values
+ISLAND_SIZE_LABELS = {
+    'XL': IslandSize.EXTRALARGE,
+    'L': IslandSize.LARGE,
+    'M': IslandSize.MEDIUM,
+    'S': IslandSize.SMALL,
+}
+
+
+###########################################################################################
+#
+#
+class RegionFertility(IntFlag):
+    """
+    base class for the bitmapped fertility enums of each region
+    """
+    @classmethod
+    def no_fertilities(cls):
+        return cls(0)
+
+    @classmethod
+    def all_fertilities(cls):
+        rv = cls(0)
+        for f in cls:
+            rv |= f.value
+        return rv
+
+    def dump(self):
+        print(f"Name:   [{self.name}]")
+        print(f"Value:  [{self.value}]")
+
+    def add(self, bits: int) -> Self:
+        return type(self)(self.value | bits)
+
+    def remove(self, bits: int) -> Self:
+        return type(self)(self.value & ~bits)
+
+    def has(self, bits: int) -> bool:
+        return self.value & bits == bits
+
+
+# fertility weight scaling rules
+#   NO_SCALING      the weight as is
+#   SLOT_SCALING    base weighting assumes 10 river/marsh slots, adjust up or down if not 10
+#   MOUNTAIN_SCALING base weighting assumes 10 mountain slots, adjust up or down if not 10
+NO_SCALING = 0
+SLOT_SCALING = 1
+MOUNTAIN_SCALING = 2
+
+
+###########################################################################################
+#
+#
+class Region:
+    """
+    Data driven definition of one region, i.e. everything that differs between Latium and Albion:
+        fertility_class     the RegionFertility enum, in CSV column order
+        fertility_weights   fertility -> weight
+        slot_kind           name of the second kind of building slot, 'river' or 'marsh'
+        slot_label          CSV column header for those slots
+        slot_weight         weight per river/marsh slot
+        mountain_weight     weight per mountain slot
+        size_weights        IslandSize -> weight
+        slot_scaled         fertilities whose weight scales with the river/marsh slots
+        mountain_scaled     fertilities whose weight scales with the mountain slots
+        coverage_groups     name -> fertility mask, for regions which solve one population at a time
+        readd_after_first   fertilities which are wanted again after the first (main) island,
+                            e.g. a non-main island with gold ore in Latium
+        reduction_rate      default extra_island_reduction_rate
+        penalty             default extra_island_penalty
+        labels              CSV column headers for the fertilities
+
+    The definition is compiled once into flat bitmask / weight arrays, which is all the scoring
+    ever looks at.
+    """
+    def __init__(self, name: str, fertility_class, fertility_weights: dict,
+                 slot_kind: str, slot_label: str, slot_weight: float, mountain_weight: float, size_weights: dict,
+                 slot_scaled: tuple = (), mountain_scaled: tuple = (), coverage_groups: dict = None,
+                 readd_after_first: int = 0, reduction_rate: float = 0.9, penalty: float = 100.0, labels: list = None):
+        self.name = name
+        self.fertility_class = fertility_class
+        self.fertility_weights = fertility_weights
+        self.slot_kind = slot_kind
+        self.slot_label = slot_label
+        self.slot_weight = slot_weight
+        self.mountain_weight = mountain_weight
+        self.size_weights = size_weights
+        self.slot_scaled = slot_scaled
+        self.mountain_scaled = mountain_scaled
+        self.coverage_groups = coverage_groups if coverage_groups is not None else {}
+        self.readd_after_first = int(readd_after_first)
+        self.reduction_rate = reduction_rate
+        self.penalty = penalty
+        self.labels = labels if labels is not None else [f.name.replace('_', ' ').title() for f in fertility_class]
+
+        self.compile()
+
+    def compile(self):
+        """
+        flatten the definition into arrays, in fertility (i.e. bit) order
+        """
+        fertilities = list(self.fertility_class)
+        scaling = [SLOT_SCALING if f in self.slot_scaled else MOUNTAIN_SCALING if f in self.mountain_scaled
+                   else NO_SCALING for f in fertilities]
+
+        self.bits = numpy.array([int(f) for f in fertilities], dtype=numpy.int64)
+        self.weights = numpy.array([self.fertility_weights.get(f, 0) for f in fertilities], dtype=numpy.float64)
+        self.scaling = numpy.array(scaling, dtype=numpy.int8)
+        self.size_weight_array = numpy.zeros(max(IslandSize) + 1, dtype=numpy.float64)
+        for size, weight in self.size_weights.items():
+            self.size_weight_array[size] = weight
+
+        # the same, as plain python tuples for the scalar scoring, which is faster than numpy for one island
+        self.terms = tuple((int(f), self.fertility_weights.get(f, 0), kind) for f, kind in zip(fertilities, scaling))
+        self.all_bits = int(self.fertility_class.all_fertilities())
+
+    def all_fertilities(self):
+        return self.fertility_class.all_fertilities()
+
+    def coverage(self, name: str):
+        """
+        :return: fertility mask for a coverage group, 'all' for every fertility
+        """
+        if name == 'all':
+            return self.all_fertilities()
+        return self.fertility_class(self.coverage_groups[name])
+
+    def island_score(self, fertilities: int, slots: int, mountains: int, island_size: IslandSize, include: int) -> float:
+        """
+        score of one island, counting only the fertilities in include
+        """
+        rv = 0.0
+
+        # only count fertilities which have NOT been counted already on a previous island
+        present = fertilities & include
+        for bit, weight, kind in self.terms:
+            if present & bit:
+                if kind == SLOT_SCALING:
+                    rv += weight * slots / 10.0
+                elif kind == MOUNTAIN_SCALING:
+                    rv += weight * mountains / 10.0
+                else:
+                    rv += weight
+
+        rv += self.slot_weight * slots
+        rv += self.mountain_weight * mountains
+        rv += self.size_weights[island_size]
+
+        # todo - need some way to assess total travel distance.  Get (x,y) info from savegame?
+
+        return rv
+
+    def island_arrays(self, islands: list) -> tuple:
+        """
+        compile a list of islands into arrays for vectorized scoring
+        :return: (masks, values, base) where
+            masks   (islands,) fertility bitmasks
+            values  (islands, fertilities) the scaled weight each island gets for each fertility it has
+            base    (islands,) the slot and size part of the score, which doesn't depend on coverage
+        so the score of island i, counting the fertilities in include, is
+            base[i] + values[i] @ ((bits & include) != 0)
+        """
+        masks = numpy.array([int(island.fertilities) for island in islands], dtype=numpy.int64)
+        slots = numpy.array([island.slots for island in islands], dtype=numpy.float64)
+        mountains = numpy.array([island.mountain_slots for island in islands], dtype=numpy.float64)
+        sizes = numpy.array([int(island.island_size) for island in islands], dtype=numpy.int64)
+
+        present = (masks[:, None] & self.bits[None, :]) != 0
+        scale = numpy.where(self.scaling == SLOT_SCALING, slots[:, None] / 10.0,
+                            numpy.where(self.scaling == MOUNTAIN_SCALING, mountains[:, None] / 10.0, 1.0))
+        values = numpy.where(present, self.weights[None, :] * scale, 0.0)
+        base = self.slot_weight * slots + self.mountain_weight * mountains + self.size_weight_array[sizes]
+        return masks, values, base
+
+    def parse_fields(self, fields: list) -> tuple:
+        """
+        decode one CSV row
+            0               Name
+            1..N            Fertilities, boolean [''|'1']
+            N+1             number mountain slots
+            N+2             number river/marsh slots
+            N+3             Island size, ['XL'|'L'|'M'|'S']
+        :return: (name, fertilities, slots, mountains, size)
+        """
+        count = len(self.bits)
+        fertilities = self.fertility_class(0)
+        for ndx, fert_value in enumerate(self.fertility_class):
+            if fields[ndx+1] != '':
+                fertilities |= fert_value
+
+        mountains = int(fields[count+1])
+        slots = int(fields[count+2])
+        size = ISLAND_SIZE_LABELS.get(fields[count+3], IslandSize.SMALL)
+        return fields[0], fertilities, slots, mountains, size
+
+    def header(self) -> list:
+        """
+        CSV column headers
+        """
+        return ['Name'] + self.labels + ['Mountains', self.slot_label, 'Size']
+
+
+###########################################################################################
+#
+#
+class RegionIsland:
+    """
+    Base class for the islands of one region.  Child classes set the region class attribute,
+    and name their river/marsh slots
+    """
+    region: Region = None
+
+    def __init__(self,
+                 island_name: str,
+                 fert_values: RegionFertility = None,
+                 slots: int = 0,
+                 mountain_slots: int = 0,
+                 island_size: IslandSize = IslandSize.LARGE
+                 ):
+        self.island_name = island_name
+        self.fertilities = fert_values if fert_values is not None else self.region.fertility_class(0)
+        self.slots = slots
+        self.mountain_slots = mountain_slots
+        self.island_size = island_size
+
+        # (x, y) map position, when known (e.g. read from a savegame)
+        self.position = None
+
+    @classmethod
+    def from_string(cls, island_string):
+        """
+        provides functionality similar to C++ overloaded ctor
+        allows contruction of an island from a string value taken from a .csv island file
+        """
+        fields = island_string.strip().split(',')
+        return cls(*cls.region.parse_fields(fields))
+
+    def calculate_score(self, include_fertilities: RegionFertility) -> float:
+        """
+        determine score based purely on this island's fertilities
+        and the associated weighting values for each fertility
+        :return:
+        score
+        """
+        return self.region.island_score(int(self.fertilities), self.slots, self.mountain_slots,
+                                        self.island_size, int(include_fertilities))
+
+    def add_fertility(self, fert_value: RegionFertility):
+        self.fertilities |= fert_value
+
+    def remove_fertility(self, fert_value: RegionFertility):
+        self.fertilities &= ~fert_value
+
+    def has_fertility(self, fert_value: RegionFertility) -> bool:
+        return self.fertilities & fert_value == fert_value
+
+    def set_mountain_slots(self, slots: int):
+        self.mountain_slots = slots
+
+    def set_island_size(self, island_size: IslandSize):
+        self.island_size = island_size
+
+    def set_position(self, position: tuple):
+        self.position = position
+
+    def to_fields(self) -> tuple:
+        """
+        the ctor arguments for this island, i.e. the inverse of the ctor
+        used when caching parsed islands
+        """
+        return self.island_name, self.fertilities, self.slots, self.mountain_slots, self.island_size
+
+    def dump(self):
+        """
+        utility function to dump all class data to stdout
+        :return:
+        """
+        print(f"{vars(self)}")
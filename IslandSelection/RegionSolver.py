@@ -0,0 +1,317 @@
+from Region import *
+from SimulatedAnnealingSolver import *
+from IslandCache import island_cache
+from IslandCsv import read_island_csv
+from Presolve import presolve, InfeasibleCoverageError
+from SolverResult import SolverResult
+import time
+
+###########################################################################################
+#
+#
+class RegionSolver(SimulatedAnnealingSolver):
+    """
+    Solver engine for the islands of any region.
+    Find an optimum set of islands which provides all the targeted fertilities.
+
+    Child classes only set island_class, everything region specific comes from island_class.region
+    """
+    island_class = RegionIsland
+
+    def __init__(self):
+        # call parent ctor
+        super().__init__()
+
+        self.region: Region = self.island_class.region
+
+        # input file
+        self.filename = ''
+
+        # use this to target all fertilities, or one of the region's coverage groups (e.g. Celtic or Roman)
+        self.starting_fertilities = self.region.all_fertilities()
+
+        # solution tuning factors
+        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
+        self.max_trials = 1000      # max trials per annealing temperature
+        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
+        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
+
+        self.extra_island_reduction_rate = self.region.reduction_rate
+        self.extra_island_penalty = self.region.penalty
+
+        # id(island) -> (island, fertility bits, {uncovered fertility bits on the island -> island score})
+        # an island only has a few fertilities, so each island gets scored a handful of times per solve at most.
+        # The island is kept in the entry so its id can't be reused while the entry exists
+        self.score_tables = {}
+
+        # check coverage before every solve, and optionally drop dominated / duplicate islands, see solve()
+        self.presolve_enabled = True
+        self.presolve_pruning = False
+        self.presolve_result = None
+
+    def set_filename(self, filename: str):
+        # set up a basic array of islands
+        self.filename = filename
+        self.load_islands()
+
+    def load_islands(self):
+        """
+        load island info from a CSV file
+        # todo - read this info from a savegame file rather than a CSV file
+        ideally this function should be replaced to read the island info
+        directly from a save file
+
+        parsed islands are cached by file contents, so re-loading an unchanged file is cheap
+        """
+        self.the_list = island_cache.load_islands(self.filename, self.island_class, self.parse_islands)
+        self.score_tables = {}
+
+    @classmethod
+    def parse_islands(cls, filename: str) -> list:
+        """
+        parse the islands out of a CSV file, in one pass, with the columns found by the header row
+        :raise IslandCsvError: listing every malformed row
+        """
+        return read_island_csv(filename, cls.island_class.region).to_islands(cls.island_class)
+
+    def set_coverage(self, starting_fertilities: RegionFertility):
+        self.starting_fertilities = starting_fertilities
+
+    def solver_parameters(self) -> dict:
+        rv = super().solver_parameters()
+        rv['extra_island_reduction_rate'] = self.extra_island_reduction_rate
+        rv['extra_island_penalty'] = self.extra_island_penalty
+
+        rv['presolve_enabled'] = self.presolve_enabled
+        rv['presolve_pruning'] = self.presolve_pruning
+
+        # regions with coverage groups solve one group at a time
+        if self.region.coverage_groups:
+            rv['starting_fertilities'] = int(self.starting_fertilities)
+        return rv
+
+    def weight_profile(self) -> dict:
+        region = self.region
+        return {
+            'fertility': {f.name: region.fertility_weights.get(f, 0) for f in region.fertility_class},
+            'size': {s.name: weight for s, weight in region.size_weights.items()},
+            'mountain': region.mountain_weight,
+            region.slot_kind: region.slot_weight,
+        }
+
+    def item_signature(self, island: RegionIsland) -> list:
+        name, fertilities, slots, mountains, size = island.to_fields()
+        return [name, int(fertilities), slots, mountains, int(size)]
+
+    def solve(self, resume: bool = False) -> list:
+        """
+        check the coverage first, and with presolve_pruning, anneal only the islands which can matter,
+        see Presolve.presolve(), and then put the pruned islands back on the end of the solution, so
+        the_list still holds every island
+        :raise InfeasibleCoverageError: straight away, if the islands can't cover the targeted fertilities
+        """
+        if not self.presolve_enabled:
+            return super().solve(resume)
+
+        start_time = time.perf_counter()
+        self.presolve_result = presolve(self, self.presolve_pruning)
+        self.the_list = self.presolve_result.kept
+        super().solve(resume)
+        self.the_list = self.the_list + self.presolve_result.pruned
+        self.solve_time = time.perf_counter() - start_time
+        return self.the_list
+
+    def score_entry(self, island: RegionIsland) -> tuple:
+        entry = (island, int(island.fertilities), {})
+        self.score_tables[id(island)] = entry
+        return entry
+
+    def island_score(self, island: RegionIsland, uncovered: int) -> float:
+        """
+        island.calculate_score(uncovered), memoized
+        """
+        entry = self.score_tables.get(id(island)) or self.score_entry(island)
+        key = uncovered & entry[1]
+        rv = entry[2].get(key)
+        if rv is None:
+            rv = entry[2][key] = island.calculate_score(key)
+        return rv
+
+    # define the virtual score() function
+    def score(self, candidate_list: list) -> float:
+
+        # determine a score for the first N islands, where N is the number of islands required
+        # to provide one of every fertility
+
+        # walk the list until we have gotten all the fertilities
+        # order matters, so reduce the score in subsequent islands by 'extra_island_reduction_rate'
+        # also, we only want the minimum number of islands to cover all fertilities, so
+        # add a penalty for every island beyond the first
+        rv = 0.0
+
+        # plain ints rather than the fertility enum, which is much slower to do bit operations on
+        uncovered = int(self.starting_fertilities)
+        readd_after_first = self.region.readd_after_first
+        reduction_rate = self.extra_island_reduction_rate
+        penalty = self.extra_island_penalty
+        score_tables = self.score_tables
+
+        island: RegionIsland
+        for ndx, island in enumerate(candidate_list):
+            entry = score_tables.get(id(island)) or self.score_entry(island)
+            key = uncovered & entry[1]
+            island_score = entry[2].get(key)
+            if island_score is None:
+                island_score = entry[2][key] = island.calculate_score(key)
+
+            # get island score
+            rv += (reduction_rate ** ndx) * island_score
+            rv -= ndx * penalty
+
+            # removed this island's fertilities from the overall list
+            uncovered &= ~entry[1]
+
+            # e.g. Latium still wants gold ore from a non-main island, even if the main island had it
+            if ndx == 0:
+                uncovered |= readd_after_first
+
+            if uncovered == 0:
+                break
+
+        return rv
+
+    def covering_walk(self, candidate_list: list) -> tuple:
+        """
+        walk the list the same way score() does
+        :return: (number of islands walked, fertility bits still uncovered)
+        """
+        uncovered = int(self.starting_fertilities)
+        readd_after_first = self.region.readd_after_first
+
+        island: RegionIsland
+        for ndx, island in enumerate(candidate_list):
+            uncovered &= ~int(island.fertilities)
+            if ndx == 0:
+                uncovered |= readd_after_first
+            if uncovered == 0:
+                return ndx + 1, 0
+        return len(candidate_list), uncovered
+
+    def prefix_length(self, candidate_list: list) -> int:
+        """
+        number of islands needed to cover every targeted fertility, i.e. how far score() walks the list
+        """
+        return self.covering_walk(candidate_list)[0]
+
+    def uncovered_count(self, candidate_list: list) -> int:
+        """
+        number of targeted fertilities still missing after walking the whole list
+        """
+        return bin(self.covering_walk(candidate_list)[1]).count('1')
+
+    def remaining_fertilities(self, candidate_list: list) -> RegionFertility:
+        """
+        fertilities still not covered after walking the whole list
+        """
+        uncovered = int(self.starting_fertilities)
+        readd_after_first = self.region.readd_after_first
+        for ndx, island in enumerate(candidate_list):
+            uncovered &= ~int(island.fertilities)
+            if ndx == 0:
+                uncovered |= readd_after_first
+        return self.region.fertility_class(uncovered)
+
+    def completion_bound(self, prefix: list, remaining: list) -> float:
+        """
+        upper bound on the score of prefix followed by any of the remaining islands.
+        An island never scores more than it would against the fertilities still uncovered
+        after the prefix, and later positions only get reduced and penalized more
+        """
+        uncovered = int(self.remaining_fertilities(prefix))
+        best_island_score = max(self.island_score(island, uncovered) for island in remaining)
+        return self.score(prefix) + geometric_tail_bound(len(prefix), len(remaining), best_island_score,
+                                                         self.extra_island_reduction_rate,
+                                                         self.extra_island_penalty)
+
+    def coverage_name(self) -> str:
+        """
+        name of the current coverage, 'all', a coverage group, or the fertility names if it's neither
+        """
+        starting = int(self.starting_fertilities)
+        if starting == self.region.all_bits:
+            return 'all'
+        for name, mask in self.region.coverage_groups.items():
+            if int(mask) == starting:
+                return name
+        return '|'.join(f.name for f in self.region.fertility_class if starting & f)
+
+    def result(self, engine: str = 'anneal') -> SolverResult:
+        """
+        walk the list once, the same way score() does, and record what every island adds on the way
+        :return: SolverResult for the current list, and the last solve()
+        """
+        fertility_class = self.region.fertility_class
+
+        def names(bits: int) -> list:
+            return [f.name for f in fertility_class if bits & f]
+
+        uncovered = int(self.starting_fertilities)
+        readd_after_first = self.region.readd_after_first
+        reduction_rate = self.extra_island_reduction_rate
+        penalty = self.extra_island_penalty
+
+        score = 0.0
+        steps = []
+        island: RegionIsland
+        for ndx, island in enumerate(self.the_list):
+            island_score = self.island_score(island, uncovered)
+            discounted = (reduction_rate ** ndx) * island_score
+
+            # added up exactly as score() does, so the total matches it to the last bit
+            score += discounted
+            score -= ndx * penalty
+
+            covered = uncovered & int(island.fertilities)
+            uncovered &= ~int(island.fertilities)
+            if ndx == 0:
+                uncovered |= readd_after_first
+            steps.append({
+                'island': island.island_name,
+                'island_score': island_score,
+                'marginal': discounted - ndx * penalty,
+                'covered': names(covered),
+                'remaining': names(uncovered),
+            })
+            if uncovered == 0:
+                break
+
+        stats = {
+            'trials': self.solve_trials,
+            'moves': self.move_statistics(),
+        }
+        if self.presolve_result is not None:
+            stats['presolve'] = {
+                'kept': len(self.presolve_result.kept),
+                'pruned': len(self.presolve_result.pruned),
+                'dominated': self.presolve_result.dominated,
+                'duplicates': self.presolve_result.duplicates,
+            }
+        if self.instrumentation is not None:
+            stats['instrumentation'] = self.instrumentation.summary()
+
+        return SolverResult(self.region.name, self.filename, self.coverage_name(), engine,
+                            [step['island'] for step in steps], steps, score,
+                            [(score, [island.island_name for island in prefix]) for score, prefix in self.best_solutions()],
+                            stats, self.solve_time)
+
+    def report(self) -> list:
+        """
+        write results of the solve action to stdout
+
+        :return: list of the islands in the solution
+        """
+        result = self.result()
+        print(result.text())
+
+        # return a list of the solution islands
+        return self.the_list[:len(result.islands)]
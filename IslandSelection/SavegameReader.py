@@ -0,0 +1,402 @@
+import hashlib
+import re
+import struct
+import sys
+import xml.etree.ElementTree as ElementTree
+
+
+###########################################################################################
+#
+#   Hex decoding helpers
+#
+#   All leaf values in the extracted savegame XML are hex strings of little-endian binary
+#   data (see savegame_structure.md, "Hex Encoding").  Whether a value is an int or a float
+#   depends on context, so the caller picks the decoder.
+#
+def hex_to_int(hex_string: str, signed: bool = True) -> int:
+    """
+    decode a little-endian hex string (2, 4, 8 or 16 chars) into an integer
+    """
+    if not hex_string:
+        return 0
+    return int.from_bytes(bytes.fromhex(hex_string.strip()), byteorder='little', signed=signed)
+
+
+def hex_to_float(hex_string: str) -> float:
+    """
+    decode an 8 character little-endian hex string into a float32
+    """
+    return struct.unpack('<f', bytes.fromhex(hex_string.strip()))[0]
+
+
+def hex_to_int_array(hex_string: str, width: int = 4, signed: bool = True) -> list:
+    """
+    decode a packed array of little-endian integers, e.g. the packed int64 trade route
+    Ships array (width = 8) or a packed int32 Position pair (width = 4)
+    """
+    if not hex_string:
+        return []
+    raw = bytes.fromhex(hex_string.strip())
+    return [int.from_bytes(raw[ndx:ndx+width], byteorder='little', signed=signed)
+            for ndx in range(0, len(raw) - width + 1, width)]
+
+
+def hex_to_utf16(hex_string: str) -> str:
+    """
+    decode a utf-16-le hex string, e.g. trade route names and MapFilePath
+    """
+    if not hex_string:
+        return ''
+    return bytes.fromhex(hex_string.strip()).decode('utf-16-le', errors='replace').rstrip('\x00')
+
+
+def hex_to_utf8(hex_string: str) -> str:
+    """
+    decode a utf-8 hex string
+    """
+    if not hex_string:
+        return ''
+    return bytes.fromhex(hex_string.strip()).decode('utf-8', errors='replace').rstrip('\x00')
+
+
+def child_text(element, path: str) -> str:
+    """
+    text of a child node, or '' if the node is missing or empty
+    """
+    if element is None:
+        return ''
+    child = element.find(path)
+    if child is None or child.text is None:
+        return ''
+    return child.text.strip()
+
+
+def interleaved_pairs(element) -> list:
+    """
+    Sessions, AreaInfo, RouteMap and friends are stored as interleaved <None> elements,
+    i.e. <None>ID</None><None>data</None><None>ID</None><None>data</None>...
+    :return: list of (id, data element) tuples
+    """
+    rv = list()
+    if element is None:
+        return rv
+    children = list(element)
+    for ndx in range(0, len(children) - 1, 2):
+        rv.append((hex_to_int(children[ndx].text or ''), children[ndx + 1]))
+    return rv
+
+
+def patch_tags(text: str) -> str:
+    """
+    patch up the Anno 117 tags that are not valid XML
+    (digit-prefixed tags like <2ndPriority>, tags with spaces like <AI Time>)
+    """
+    text = re.sub(r'<(/?)(\d)', r'<\1_\2', text)
+    return re.sub(r'<(/?)([A-Za-z_][\w.-]*) ([A-Za-z][\w.-]*)>', r'<\1\2_\3>', text)
+
+
+# raw text patterns, see Savegame.session_text_ranges() and friends
+SESSION_GUID = re.compile(r'<SessionGUID>\s*([0-9A-Fa-f]*)\s*</SessionGUID>')
+AREA_MANAGER_TAG = re.compile(r'<AreaManager_(\d+)>')
+NONE_TAG = re.compile(r'</?None\s*/?>')
+
+
+###########################################################################################
+#
+#
+class GameSession:
+    """
+    One session from MetaGameManager/GameSessions, i.e. one region map (Latium, Albion, ...)
+    """
+    def __init__(self, session_id: int, session_element):
+        self.session_id = session_id
+        self.session_guid = hex_to_int(child_text(session_element, 'SessionDesc/SessionGUID'))
+        self.manager = session_element.find('SessionData/BinaryData/Content/GameSessionManager')
+
+    def area_infos(self) -> list:
+        """
+        :return: list of (area_id, AreaInfo data element) tuples
+        """
+        if self.manager is None:
+            return []
+        return interleaved_pairs(self.manager.find('AreaInfo'))
+
+    def area_manager(self, area_id: int):
+        """
+        :return: the AreaManager_{id} element for this island, or None
+        """
+        if self.manager is None:
+            return None
+        return self.manager.find(f'AreaManagers/AreaManager_{area_id}')
+
+    def area_managers(self) -> dict:
+        """
+        :return: dictionary of area_id -> AreaManager_{id} element
+        """
+        rv = dict()
+        if self.manager is None:
+            return rv
+        managers = self.manager.find('AreaManagers')
+        if managers is None:
+            return rv
+        for element in managers:
+            if element.tag.startswith('AreaManager_'):
+                rv[int(element.tag[len('AreaManager_'):])] = element
+        return rv
+
+    def template_elements(self) -> list:
+        """
+        MapTemplate/TemplateElement/Element entries, in file order
+        :return: list of (template name, (x, y)) tuples
+        """
+        rv = list()
+        if self.manager is None:
+            return rv
+        for element in self.manager.iterfind('MapTemplate/TemplateElement/Element'):
+            name = hex_to_utf16(child_text(element, 'MapFilePath'))
+            # keep only the stem, e.g. "moderate_l_01"
+            name = re.split(r'[\\/]', name)[-1].split('.')[0]
+            position = hex_to_int_array(child_text(element, 'Position'), 4)
+            if len(position) >= 2:
+                rv.append((name, (position[0], position[1])))
+            else:
+                rv.append((name, None))
+        return rv
+
+    def island_positions(self) -> dict:
+        """
+        Pair up AreaInfo island ids with MapTemplate element positions.
+        The savegame doesn't store the AreaID on the template element, so this assumes the
+        template elements are stored in the same order as the AreaInfo entries
+        :return: dictionary of area_id -> (x, y)
+        """
+        rv = dict()
+        templates = self.template_elements()
+        for ndx, (area_id, _) in enumerate(self.area_infos()):
+            if ndx < len(templates) and templates[ndx][1] is not None:
+                rv[area_id] = templates[ndx][1]
+        return rv
+
+    def ship_names(self) -> dict:
+        """
+        walk every island's objects and collect ships which can be assigned to trade routes
+        :return: dictionary of MetaPersistent/MetaID -> ship name
+        """
+        rv = dict()
+        for area_manager in self.area_managers().values():
+            for game_object in area_manager.iterfind('AreaObjectManager/GameObject/objects/None'):
+                meta_id = child_text(game_object, 'MetaPersistent/MetaID')
+                if meta_id:
+                    rv[hex_to_int(meta_id)] = hex_to_utf16(child_text(game_object, 'Nameable/VehicleName'))
+        return rv
+
+
+###########################################################################################
+#
+#
+class Savegame:
+    """
+    Reader for the merged, human-readable XML produced by the RDAConsole + FileDB extraction
+    pipeline described in savegame_structure.md.  The decompression itself is done by those
+    external tools, this class only walks the resulting XML tree.
+
+    The whole tree is only parsed the first time root is used.  Tools which just want a few
+    subtrees (see IncrementalExtractor) can find them by their raw text ranges instead, and
+    decode them one at a time with element()
+    """
+    def __init__(self, filename: str = ''):
+        self.filename = filename
+        self._root = None
+
+        # the raw XML text, kept so subtrees can be found and fingerprinted without parsing anything
+        self.text = ''
+        if filename:
+            self.load(filename)
+
+    def load(self, filename: str):
+        """
+        read the XML file
+        """
+        self.filename = filename
+        with open(filename, 'r', encoding='utf-8') as file:
+            self.loads(file.read())
+
+    def loads(self, text: str):
+        self.text = text
+        self._root = None
+
+    @property
+    def root(self):
+        """
+        the whole parsed tree, parsed on first use
+        """
+        if self._root is None and self.text:
+            self._root = ElementTree.fromstring(patch_tags(self.text))
+        return self._root
+
+    def element(self, start: int, end: int):
+        """
+        parse just the subtree in the text range [start, end), e.g. from area_manager_ranges()
+        """
+        return ElementTree.fromstring(patch_tags(self.text[start:end]))
+
+    def fingerprint(self, start: int, end: int) -> str:
+        """
+        hash of the raw text in [start, end)
+        """
+        return hashlib.blake2b(self.text[start:end].encode('utf-8'), digest_size=16).hexdigest()
+
+    def session_text_ranges(self) -> dict:
+        """
+        find each session's GameSessionManager in the raw text, without parsing it.  Every session
+        has a SessionDesc/SessionGUID, followed in the same session by its GameSessionManager, if it has one
+        :return: dictionary of session GUID -> (start, end) character range of its GameSessionManager
+        """
+        rv = dict()
+        text = self.text
+        position = 0
+        while True:
+            desc = text.find('<SessionDesc>', position)
+            if desc < 0:
+                break
+            desc_end = text.find('</SessionDesc>', desc)
+            if desc_end < 0:
+                break
+            guid = SESSION_GUID.search(text, desc, desc_end)
+            position = desc_end
+
+            # the manager belongs to this session only if it comes before the next session's SessionDesc
+            manager = text.find('<GameSessionManager>', desc_end)
+            next_desc = text.find('<SessionDesc>', desc_end)
+            if guid is None or manager < 0 or 0 <= next_desc < manager:
+                continue
+            end = text.find('</GameSessionManager>', manager)
+            if end < 0:
+                break
+            end += len('</GameSessionManager>')
+            rv[hex_to_int(guid.group(1))] = (manager, end)
+            position = end
+        return rv
+
+    def area_manager_ranges(self, start: int = 0, end: int = None) -> dict:
+        """
+        :return: dictionary of area_id -> (start, end) text range of every AreaManager_{id} subtree within [start, end)
+        """
+        rv = dict()
+        if end is None:
+            end = len(self.text)
+        for match in AREA_MANAGER_TAG.finditer(self.text, start, end):
+            close_tag = f'</AreaManager_{match.group(1)}>'
+            close = self.text.find(close_tag, match.end(), end)
+            if close < 0:
+                continue
+            rv[int(match.group(1))] = (match.start(), close + len(close_tag))
+        return rv
+
+    def area_manager_fingerprints(self, start: int = 0, end: int = None) -> dict:
+        """
+        hash the raw text of every AreaManager_{id} subtree within [start, end),
+        without decoding any of it
+        :return: dictionary of area_id -> hex digest
+        """
+        return {area_id: self.fingerprint(*text_range)
+                for area_id, text_range in self.area_manager_ranges(start, end).items()}
+
+    def area_info_ranges(self, start: int = 0, end: int = None) -> list:
+        """
+        the interleaved AreaInfo pairs of the GameSessionManager in [start, end), found in the raw text.
+        Only the <None> tags need counting, everything else in between is balanced
+        :return: list of (area_id, (start, end) text range of its AreaInfo data element)
+        """
+        rv = list()
+        if end is None:
+            end = len(self.text)
+        info_start = self.text.find('<AreaInfo>', start, end)
+        if info_start < 0:
+            return rv
+        info_end = self.text.find('</AreaInfo>', info_start, end)
+        if info_end < 0:
+            return rv
+
+        text = self.text
+        depth = 0
+        element_start = content_start = 0
+        area_id = None
+        for match in NONE_TAG.finditer(text, info_start, info_end):
+            tag = match.group(0)
+            if tag.endswith('/>'):
+                if depth > 0:
+                    continue
+                element_start = content_start = match.start()
+            elif not tag.startswith('</'):
+                if depth == 0:
+                    element_start, content_start = match.start(), match.end()
+                depth += 1
+                continue
+            else:
+                depth -= 1
+                if depth > 0:
+                    continue
+
+            # a whole top level <None> element, alternately an island id and its data
+            if area_id is None:
+                area_id = hex_to_int(text[content_start:match.start()])
+            else:
+                rv.append((area_id, (element_start, match.end())))
+                area_id = None
+        return rv
+
+    def meta_game_manager(self):
+        if self.root is None:
+            return None
+        if self.root.tag == 'MetaGameManager':
+            return self.root
+        return self.root.find('MetaGameManager')
+
+    def sessions(self) -> list:
+        """
+        :return: list of GameSession objects
+        """
+        meta = self.meta_game_manager()
+        if meta is None:
+            return []
+        return [GameSession(session_id, element)
+                for session_id, element in interleaved_pairs(meta.find('GameSessions'))]
+
+    def session(self, session_guid: int):
+        """
+        :return: the GameSession with this SessionGUID, or None
+        """
+        for game_session in self.sessions():
+            if game_session.session_guid == session_guid:
+                return game_session
+        return None
+
+    def trade_route_map(self):
+        meta = self.meta_game_manager()
+        if meta is None:
+            return None
+        return meta.find('SessionTradeRouteManager/RouteMap')
+
+
+def main():
+
+    # command line
+    #       python SavegameReader.py savegame.xml
+    if len(sys.argv) != 2:
+        print("Usage:")
+        print("     python SavegameReader.py savegame.xml")
+        exit(-1)
+
+    savegame = Savegame(sys.argv[1])
+    for game_session in savegame.sessions():
+        print(f"Session [{game_session.session_id}] GUID [{game_session.session_guid}]")
+        positions = game_session.island_positions()
+        for area_id, _ in game_session.area_infos():
+            print(f"    Island [{area_id}] Position [{positions.get(area_id)}]")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
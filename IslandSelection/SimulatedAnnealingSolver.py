@@ -1,5 +1,279 @@
+from AnnealingMoves import default_moves, default_prefix_moves
+from SolverInstrumentation import SolverInstrumentation, print_step
+import hashlib
+import heapq
+import json
 import math
 import numpy
+import os
+import pickle
+import time
+
+# bump this whenever the checkpoint contents change
+CHECKPOINT_VERSION = 1
+
+
+###########################################################################################
+#
+#   Random number stream for the solver
+#
+class RandomStream:
+    """
+    Seedable source of uniform [0, 1) random numbers, owned by one solver.
+
+    Calling numpy.random one scalar at a time costs far more than the number itself, so the
+    numbers are drawn from a numpy Generator in large blocks and handed out one by one.
+    Each stream is independent of the global numpy random state, so seeded runs repeat exactly,
+    and spawn() gives independent, repeatable child streams for parallel chains.
+    """
+    def __init__(self, seed=None, block_size: int = 4096):
+        # seed may be an int, None, or a numpy SeedSequence (e.g. from spawn())
+        if isinstance(seed, numpy.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = numpy.random.SeedSequence(seed)
+        self.generator = numpy.random.Generator(numpy.random.PCG64(self.seed_sequence))
+        self.block_size = block_size
+
+        # current block of pre-drawn numbers, as a plain list since indexing that is cheapest
+        self.block = []
+        self.position = 0
+
+    def random(self) -> float:
+        """
+        :return: uniform random number in [0, 1)
+        """
+        if self.position >= len(self.block):
+            self.block = self.generator.random(self.block_size).tolist()
+            self.position = 0
+        rv = self.block[self.position]
+        self.position += 1
+        return rv
+
+    def integer(self, low: int, high: int) -> int:
+        """
+        :return: uniform random integer in [low, high)
+        """
+        return low + int(self.random() * (high - low))
+
+    def get_state(self) -> dict:
+        """
+        everything needed to carry on the stream exactly where it is, e.g. for a checkpoint
+        """
+        return {
+            'bit_generator': self.generator.bit_generator.state,
+            'block': numpy.array(self.block, dtype=numpy.float64),
+            'position': self.position,
+        }
+
+    def set_state(self, state: dict):
+        self.generator.bit_generator.state = state['bit_generator']
+        self.block = state['block'].tolist()
+        self.position = state['position']
+
+    def spawn(self, count: int) -> list:
+        """
+        :return: list of independent child streams, e.g. one per parallel annealing chain
+        """
+        return [RandomStream(child, self.block_size) for child in self.seed_sequence.spawn(count)]
+
+
+###########################################################################################
+#
+#   The K best distinct solutions seen during a solve
+#
+class TopSolutions:
+    """
+    Bounded min-heap of the K best distinct covering prefixes seen during a run.
+
+    Prefixes are de-duplicated on their member set, since a different ordering of the same
+    islands isn't a real alternative, and only the best scoring ordering of each set is kept.
+    Adding costs O(log K); replaced entries are left in the heap and skipped lazily.
+    """
+    def __init__(self, k: int = 5):
+        self.k = k
+
+        # heap of (score, sequence number, key, prefix)
+        self.heap = []
+
+        # key -> best score, for the live entries
+        self.best_scores = {}
+
+        # tie breaker, so prefixes themselves are never compared
+        self.sequence = 0
+
+    @staticmethod
+    def key(prefix: list) -> frozenset:
+        return frozenset(id(member) for member in prefix)
+
+    def threshold(self) -> float:
+        """
+        a score must beat this to get in
+        """
+        if self.k <= 0:
+            return math.inf
+        if len(self.best_scores) < self.k:
+            return -math.inf
+        self.discard_stale()
+        return self.heap[0][0]
+
+    def discard_stale(self):
+        while self.heap and self.best_scores.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def add(self, score: float, prefix: list) -> bool:
+        """
+        offer a covering prefix
+        :return: True if it made the list
+        """
+        if self.k <= 0:
+            return False
+        key = self.key(prefix)
+        best = self.best_scores.get(key)
+        if best is not None and score <= best:
+            return False
+        if best is None and score <= self.threshold():
+            return False
+
+        self.best_scores[key] = score
+        self.sequence += 1
+        heapq.heappush(self.heap, (score, self.sequence, key, list(prefix)))
+
+        # evict the lowest live entry if over size
+        if len(self.best_scores) > self.k:
+            self.discard_stale()
+            _, _, evicted_key, _ = heapq.heappop(self.heap)
+            del self.best_scores[evicted_key]
+
+        # compact if replaced entries have built up
+        if len(self.heap) > 2 * self.k + 16:
+            self.heap = [entry for entry in self.heap if self.best_scores.get(entry[2]) == entry[0]]
+            heapq.heapify(self.heap)
+        return True
+
+    def solutions(self) -> list:
+        """
+        :return: list of (score, prefix) tuples, best first
+        """
+        live = [entry for entry in self.heap if self.best_scores.get(entry[2]) == entry[0]]
+        live.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [(entry[0], entry[3]) for entry in live]
+
+
+###########################################################################################
+#
+#   Search state for the two solver modes
+#
+#   Both classes offer the same small interface to the annealing loop in solve():
+#       propose()           -> a perturbed candidate of the current state
+#       evaluate(candidate) -> score of the candidate
+#       current_score()     -> score of the current state
+#       accept(candidate)   -> make the candidate the current state
+#       current_list()      -> the current state, as a full list
+#       candidate_prefix(candidate) -> the scored prefix of a candidate
+#       current_prefix()    -> the scored prefix of the current state
+#
+class ListSearch:
+    """
+    'list' mode: the state is the whole list, perturbed by the solver's list moves
+    """
+    def __init__(self, solver):
+        self.solver = solver
+        self.moves = solver.moves
+        self.the_list = solver.the_list
+        self.current_prefix_length = solver.prefix_length(self.the_list)
+
+    def propose(self) -> list:
+        return self.solver.perturb_list(self.the_list.copy(), self.current_prefix_length)
+
+    def evaluate(self, candidate: list) -> float:
+        return self.solver.score(candidate)
+
+    def current_score(self) -> float:
+        return self.solver.score(self.the_list)
+
+    def accept(self, candidate: list):
+        self.the_list = candidate
+        self.current_prefix_length = self.solver.prefix_length(candidate)
+
+    def current_list(self) -> list:
+        return self.the_list
+
+    def candidate_prefix(self, candidate: list) -> list:
+        return candidate[:self.solver.prefix_length(candidate)]
+
+    def current_prefix(self) -> list:
+        return self.candidate_prefix(self.the_list)
+
+
+class PrefixSearch:
+    """
+    'prefix' mode: the state is the scored prefix plus an unordered pool of the remaining
+    list members.  Moves only touch the prefix, and the pool is only updated when a move is
+    accepted, so the cost of a trial depends on the prefix length rather than the list length
+    """
+    def __init__(self, solver, prefix_length: int = None):
+        self.solver = solver
+        self.moves = solver.prefix_moves
+        if prefix_length is None:
+            prefix_length = solver.prefix_length(solver.the_list)
+        self.prefix = solver.the_list[:prefix_length]
+        self.pool = solver.the_list[prefix_length:]
+
+    def propose(self) -> tuple:
+        self.solver.last_move = self.moves.select(self.solver.rng)
+        return self.moves.moves[self.solver.last_move](self.prefix.copy(), self.pool, self.solver.rng)
+
+    def evaluate(self, candidate: tuple) -> float:
+        return self.solver.prefix_score(candidate[0])
+
+    def current_score(self) -> float:
+        return self.solver.prefix_score(self.prefix)
+
+    def accept(self, candidate: tuple):
+        prefix, taken, given = candidate
+        self.prefix = prefix
+        if taken is not None:
+            if given is not None:
+                self.pool[taken] = given
+            else:
+                # O(1) removal, since the pool order doesn't matter
+                self.pool[taken] = self.pool[-1]
+                self.pool.pop()
+        elif given is not None:
+            self.pool.append(given)
+
+    def current_list(self) -> list:
+        return self.prefix + self.pool
+
+    def candidate_prefix(self, candidate: tuple) -> list:
+        # drop any members beyond the point where everything is covered
+        return candidate[0][:self.solver.prefix_length(candidate[0])]
+
+    def current_prefix(self) -> list:
+        return self.prefix[:self.solver.prefix_length(self.prefix)]
+
+
+def geometric_tail_bound(depth: int, count: int, best_item_score: float, reduction_rate: float, penalty: float) -> float:
+    """
+    upper bound on what appending 1..count more items at position depth onwards can add to a
+    score of the form sum(reduction_rate ** ndx * item_score - ndx * penalty)
+    """
+    rv = -math.inf
+    running = 0.0
+    for ndx in range(depth, depth + count):
+        running += (reduction_rate ** ndx) * best_item_score - ndx * penalty
+        rv = max(rv, running)
+    return rv
+
+
+def stage_checkpoint(checkpoint_filename: str, stage: str) -> str:
+    """
+    a checkpoint file per stage of a run which solves several problems one after the other, since a
+    checkpoint only holds one problem, e.g. 'run.ckpt' -> 'run_celtic-1.ckpt'
+    """
+    root, ext = os.path.splitext(checkpoint_filename)
+    return f"{root}_{stage}{ext}"
 
 
 ###########################################################################################
@@ -25,13 +299,84 @@ class SimulatedAnnealingSolver:
         self.temperature = 500.0    # black art = pick this to be ~150% of a typical score change
         self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
 
+        # random number seed, None for an unseeded (non-repeatable) run
+        self.seed = None
+        self.rng = RandomStream(self.seed)
+
+        # search mode
+        #   'list'      anneal the whole list
+        #   'prefix'    anneal only the scored prefix, drawing from an unordered pool of the rest
+        self.search_mode = 'list'
+
+        # prefix mode score penalty for every target (e.g. fertility) the prefix leaves uncovered
+        self.uncovered_penalty = 1000.0
+
+        # the moves perturb_list() picks from, the prefix mode moves, and the name of the move used last
+        self.moves = default_moves()
+        self.prefix_moves = default_prefix_moves()
+        self.last_move = ''
+
+        # keep this many of the best distinct covering solutions seen during solve(), 0 to disable
+        self.top_k = 5
+        self.top_solutions = TopSolutions(self.top_k)
+
+        # best state seen during the last solve()
+        self.best_score = -math.inf
+        self.best_list = list()
+
+        # periodic checkpoints, see solve()
+        self.checkpoint_filename = ''
+        self.checkpoint_interval = 10      # anneals between checkpoints
+
+        # optional SolverInstrumentation, for per-temperature statistics and timings, see solve()
+        self.instrumentation = None
+
+        # seconds spent in, and trials run by, the last solve(), both 0 if it came from the solution cache
+        self.solve_time = 0.0
+        self.solve_trials = 0
+
+    def set_seed(self, seed):
+        """
+        set the random number seed, and restart the random number stream from it
+        """
+        self.seed = seed
+        self.rng = RandomStream(seed)
+
     def score(self, candidate_list: list) -> float:
         """
         function to define the value or score of this particular list arrangement
         """
         raise NotImplementedError()
 
-    def solve(self) -> list:
+    def prefix_length(self, candidate_list: list) -> int:
+        """
+        number of leading list members which actually affect the score
+        child classes whose score() only looks at the head of the list should override this,
+        so the moves can concentrate on the part of the list that matters
+        """
+        return len(candidate_list)
+
+    def uncovered_count(self, candidate_list: list) -> int:
+        """
+        number of targets (e.g. fertilities) still not covered after walking the whole list
+        child classes which support prefix mode should override this
+        """
+        return 0
+
+    def completion_bound(self, prefix: list, remaining: list) -> float:
+        """
+        upper bound on the score of prefix followed by any ordering of any of the remaining items,
+        used by ExactSolver to prune its search.  The default never prunes
+        """
+        return math.inf
+
+    def prefix_score(self, prefix: list) -> float:
+        """
+        prefix mode score, penalized for any targets the prefix doesn't cover
+        """
+        return self.score(prefix) - self.uncovered_penalty * self.uncovered_count(prefix)
+
+    def solve(self, resume: bool = False) -> list:
         """
         Simulated Annealing basic algorithm
             - start with initial random solution, and a high initial temperature T
@@ -42,88 +387,312 @@ class SimulatedAnnealingSolver:
             -           if new solution is better, accept it
             -           if new solution is worse, accept it based on probability P = exp(-DeltaE/T)
             -       cool the temperature according to a schedule, T_new = cooling_rate * T_old
+        see search_mode for the list vs prefix search
+
+        The best state seen is tracked as well as the current one, and is what gets returned.
+        If checkpoint_filename is set, the full solver state is saved every checkpoint_interval
+        anneals, and resume=True carries on exactly from the last checkpoint.
+        If instrumentation is set, it gets the trial counts, scores and timings for every
+        temperature step; otherwise nothing in the loop is timed.
+        :param resume: continue from the checkpoint file, if there is one
         :return: optimized list
         """
-        current_score = self.score(self.the_list)
-
-        for anneal_counter in range(self.max_anneals):
-
-            # print(f"Outer loop: [{anneal_counter}] Temperature: [{self.temperature}]------------------------------------")
-            # print(f"{anneal_counter} ", end = '')
-            for trial_counter in range(self.max_trials):
-                perturbed_list = self.perturb_list(self.the_list.copy())
-                perturbed_score = self.score(perturbed_list)
-
-                accept = False
-                # if perturbed_score is better, accept the change
-                if perturbed_score > current_score:
-                    accept = True
-
-                # if perturbed_score is worse, maybe accept the change
-                elif perturbed_score < current_score:
-                    # this delta will be a negative value, which is needed
-                    delta_score = perturbed_score - current_score
-                    prob_acceptance = math.exp(delta_score / self.temperature)
-                    # print(f"prob: [{prob_acceptance}]")
-                    if numpy.random.rand() < prob_acceptance:
+        start_time = time.perf_counter()
+
+        # every solve starts its own stream, so a seeded solve always repeats exactly
+        self.rng = RandomStream(self.seed)
+        self.moves.reset_statistics()
+        self.prefix_moves.reset_statistics()
+        self.top_solutions = TopSolutions(self.top_k)
+
+        # checkpoints identify list members by their position in the canonical ordering,
+        # so a fresh process which loaded the same islands can pick the run back up
+        checkpoint_key, canonical_list = '', []
+        if self.checkpoint_filename:
+            checkpoint_key, canonical_list = self.solution_key()
+
+        # self.temperature is the configured starting temperature, the cooling only touches this copy
+        temperature = self.temperature
+        start_anneal = 0
+        prefix_length = None
+        if resume and self.checkpoint_filename:
+            checkpoint = self.read_checkpoint(checkpoint_key)
+            if checkpoint is not None:
+                start_anneal = checkpoint['anneal_counter']
+                temperature = checkpoint['temperature']
+                self.the_list = [canonical_list[ndx] for ndx in checkpoint['current']]
+                prefix_length = checkpoint['prefix_length']
+                self.rng.set_state(checkpoint['rng'])
+                self.moves.set_state(checkpoint['moves'])
+                self.prefix_moves.set_state(checkpoint['prefix_moves'])
+                for score, indices in checkpoint['top_solutions']:
+                    self.top_solutions.add(score, [canonical_list[ndx] for ndx in indices])
+
+        if self.search_mode == 'prefix':
+            search = PrefixSearch(self, prefix_length)
+        else:
+            search = ListSearch(self)
+
+        current_score = search.current_score()
+        self.offer_solution(current_score, search.current_prefix())
+        top_threshold = self.top_solutions.threshold()
+
+        self.best_score = current_score
+        self.best_list = search.current_list()
+        if start_anneal > 0:
+            self.best_score = checkpoint['best_score']
+            self.best_list = [canonical_list[ndx] for ndx in checkpoint['best']]
+
+        # only pay for the timers when someone asked for them
+        propose = search.propose
+        evaluate = search.evaluate
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            propose = instrumentation.timed_perturb(propose)
+            evaluate = instrumentation.timed_score(evaluate)
+            instrumentation.start()
+
+        # the trace file is closed however the loop ends, e.g. a KeyboardInterrupt on a long run
+        try:
+            for anneal_counter in range(start_anneal, self.max_anneals):
+                accepted_better = 0
+                accepted_worse = 0
+                rejected = 0
+
+                # print(f"Outer loop: [{anneal_counter}] Temperature: [{temperature}]--------------------------------")
+                # print(f"{anneal_counter} ", end = '')
+                for trial_counter in range(self.max_trials):
+                    perturbed_list = propose()
+                    perturbed_score = evaluate(perturbed_list)
+
+                    # cheap threshold test first, most candidates never get near the top K
+                    if perturbed_score > top_threshold:
+                        self.offer_solution(perturbed_score, search.candidate_prefix(perturbed_list))
+                        top_threshold = self.top_solutions.threshold()
+
+                    accept = False
+                    # if perturbed_score is better, accept the change
+                    if perturbed_score > current_score:
                         accept = True
 
-                # if perturbed_score is unchanged, do not accept the change
-
-                # if accepted...
-                if accept:
-                    self.the_list = perturbed_list
-                    current_score = perturbed_score
-                    # print(f"New score: [{current_score}]")
-
-            # cool off the annealing process
-            self.temperature *= self.cooling_rate
-
+                    # if perturbed_score is worse, maybe accept the change
+                    elif perturbed_score < current_score:
+                        # this delta will be a negative value, which is needed
+                        delta_score = perturbed_score - current_score
+                        prob_acceptance = math.exp(delta_score / temperature)
+                        # print(f"prob: [{prob_acceptance}]")
+                        if self.rng.random() < prob_acceptance:
+                            accept = True
+
+                    # if perturbed_score is unchanged, do not accept the change
+
+                    search.moves.record(self.last_move, accept, perturbed_score > current_score)
+
+                    # if accepted...
+                    if accept:
+                        if perturbed_score > current_score:
+                            accepted_better += 1
+                        else:
+                            accepted_worse += 1
+                        search.accept(perturbed_list)
+                        current_score = perturbed_score
+                        # print(f"New score: [{current_score}]")
+
+                        # keep track of the best state ever seen
+                        if current_score > self.best_score:
+                            self.best_score = current_score
+                            self.best_list = search.current_list()
+                    else:
+                        rejected += 1
+
+                if instrumentation is not None:
+                    instrumentation.step(anneal_counter, temperature, accepted_better, accepted_worse, rejected,
+                                         current_score, self.best_score)
+
+                # cool off the annealing process
+                temperature *= self.cooling_rate
+
+                if self.checkpoint_filename and (anneal_counter + 1) % self.checkpoint_interval == 0:
+                    self.write_checkpoint(checkpoint_key, canonical_list, anneal_counter + 1, temperature, search)
+        finally:
+            if instrumentation is not None:
+                instrumentation.finish()
+
+        self.the_list = self.best_list
+        self.solve_trials = max(0, self.max_anneals - start_anneal) * self.max_trials
+        self.solve_time = time.perf_counter() - start_time
         return self.the_list
 
-    @staticmethod
-    def perturb_list(the_list: list) -> list:
+    def write_checkpoint(self, checkpoint_key: str, canonical_list: list, anneal_counter: int, temperature: float,
+                         search):
         """
-        Take an existing list, and perturb it by
-            - taking a segment of list members beginning at a random list position,
-            - of random length,
-            - and inserting the segment back into the list at a new random position
-        :param the_list: the original list
-        :return: the perturbed list
+        save the full solver state to checkpoint_filename
+        written to a temp file and renamed, so a kill mid-write never leaves a broken checkpoint
         """
+        position = {id(item): ndx for ndx, item in enumerate(canonical_list)}
+
+        def indices(items: list):
+            return numpy.array([position[id(item)] for item in items], dtype=numpy.int32)
+
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'key': checkpoint_key,
+            'anneal_counter': anneal_counter,
+            'temperature': temperature,
+            'current': indices(search.current_list()),
+            'prefix_length': len(search.prefix) if isinstance(search, PrefixSearch) else None,
+            'best': indices(self.best_list),
+            'best_score': self.best_score,
+            'rng': self.rng.get_state(),
+            'moves': self.moves.get_state(),
+            'prefix_moves': self.prefix_moves.get_state(),
+            'top_solutions': [(score, indices(prefix)) for score, prefix in self.top_solutions.solutions()],
+        }
+
+        temp_filename = self.checkpoint_filename + f'.{os.getpid()}.tmp'
+        with open(temp_filename, 'wb') as file:
+            pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, self.checkpoint_filename)
+
+    def read_checkpoint(self, checkpoint_key: str):
+        """
+        :return: the checkpoint dictionary, or None if there is no checkpoint file
+        """
+        if not os.path.exists(self.checkpoint_filename):
+            return None
+        with open(self.checkpoint_filename, 'rb') as file:
+            checkpoint = pickle.load(file)
+        if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('key') != checkpoint_key:
+            raise ValueError(f"Checkpoint [{self.checkpoint_filename}] is for a different problem or solver settings")
+        return checkpoint
+
+    def offer_solution(self, score: float, prefix: list):
+        """
+        add a prefix to the top K solutions, if it covers every target
+        """
+        if self.uncovered_count(prefix) == 0:
+            self.top_solutions.add(score, prefix)
 
-        # print("---")
-        # print(f"Initial List    : {the_list}")
-        # print(f"Length          : {len(the_list)}")
-
-        # pick a random segment to remove from current list, in range [0, my_list_len)
-        segment_start = numpy.random.randint(0, len(the_list))
-        segment_length = numpy.random.randint(1, len(the_list) - segment_start + 1)
+    def best_solutions(self) -> list:
+        """
+        the best distinct covering solutions seen during the last solve()
+        :return: list of (score, prefix) tuples, best first
+        """
+        return self.top_solutions.solutions()
 
-        # get the segment using slice syntax, and then remove it from original list
-        segment = the_list[segment_start:segment_start+segment_length]
-        del the_list[segment_start:segment_start+segment_length]
+    def solver_parameters(self) -> dict:
+        """
+        the tuning parameters which affect the solution, used to key the solution cache
+        child classes should add any parameters of their own
+        """
+        return {
+            'max_anneals': self.max_anneals,
+            'max_trials': self.max_trials,
+            'temperature': self.temperature,
+            'cooling_rate': self.cooling_rate,
+            'seed': self.seed,
+        }
+
+    def set_parameters(self, parameters: dict):
+        """
+        set tuning parameters by name, e.g. the recommendations from HyperparameterTuner
+        only the names solver_parameters() knows about are accepted
+        :raise ValueError: for unknown names, or a fractional value for an int parameter
+        """
+        known = self.solver_parameters()
+        for name, value in parameters.items():
+            if name not in known:
+                raise ValueError(f"Unknown solver parameter [{name}] for [{type(self).__name__}]")
+            if name == 'seed':
+                self.set_seed(value)
+            else:
+                # keep the attribute's own type, e.g. int vs float, or a fertility flag,
+                # but never silently truncate a float into an int parameter
+                current = getattr(self, name)
+                if type(current) is int and isinstance(value, float) and not value.is_integer():
+                    raise ValueError(f"Solver parameter [{name}] is an int, got [{value}]")
+                setattr(self, name, type(current)(value) if current is not None else value)
+
+    def weight_profile(self) -> dict:
+        """
+        the scoring weights, used to key the solution cache
+        """
+        return {}
 
-        # print("---")
-        # print(f"Segment start   : {segment_start}")
-        # print(f"Segment length  : {segment_length}")
-        # print(f"Segment         : {segment}")
-        # print(f"Segment length  : {len(segment)}")
-        # print(f"Modified List   : {the_list}")
-        # print(f"Length          : {len(the_list)}")
+    def item_signature(self, item) -> list:
+        """
+        json-friendly description of one list member, used to key the solution cache
+        """
+        return [repr(item)]
 
-        # ensure new segment start isn't the old one, which would just put the segment back where it came from
-        new_segment_start = numpy.random.randint(0, len(the_list) + 1)
+    def solution_key(self) -> tuple:
+        """
+        canonical hash of the item list, weight profile and solver parameters
+        the items are hashed in list order, since the annealing starts from that order, so the same
+        islands read in a different order are a different key
+        :return: (key, the list members in the order the key describes them)
+        """
+        canonical_list = list(self.the_list)
+        profile = {
+            'solver': type(self).__name__,
+            'items': [json.dumps(self.item_signature(item)) for item in canonical_list],
+            'weights': self.weight_profile(),
+            'parameters': self.solver_parameters(),
+        }
+        key = hashlib.sha256(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()
+        return key, canonical_list
+
+    def solve_cached(self, cache) -> list:
+        """
+        look the solution up in a SolutionCache before paying for a solve() call,
+        and remember the solution afterwards
+        only seeded solves repeat exactly, so without a seed this is just solve()
+        :return: optimized list
+        """
+        if self.seed is None:
+            return self.solve()
+
+        key, canonical_list = self.solution_key()
+
+        entry = cache.get(key)
+        if entry is not None:
+            self.the_list = [canonical_list[ndx] for ndx in entry['ordering']]
+
+            # only the cached best solution is known, not the alternatives
+            self.top_solutions = TopSolutions(self.top_k)
+            self.solve_time = 0.0
+            self.solve_trials = 0
+            self.offer_solution(entry['score'], self.the_list[:self.prefix_length(self.the_list)])
+            return self.the_list
+
+        self.solve()
+        position = {id(item): ndx for ndx, item in enumerate(canonical_list)}
+        ordering = [position[id(item)] for item in self.the_list]
+        cache.put(key, ordering, self.score(self.the_list))
+        return self.the_list
 
-        # insert segment back into list in the new position
-        the_list = the_list[:new_segment_start] + segment + the_list[new_segment_start:]
+    def perturb_list(self, the_list: list, prefix_length: int = None) -> list:
+        """
+        Take an existing list, and perturb it using one of the registered moves
+        (see AnnealingMoves), picked according to how often each move has recently been accepted
+        :param the_list: the original list, which may be modified
+        :param prefix_length: number of leading list members which affect the score, computed if not given
+        :return: the perturbed list
+        """
+        if prefix_length is None:
+            prefix_length = self.prefix_length(the_list)
 
-        # print("---")
-        # print(f"New Seg start   : {new_segment_start}")
-        # print(f"Modified List   : {the_list}")
-        # print(f"Length          : {len(the_list)}")
+        self.last_move = self.moves.select(self.rng)
+        return self.moves.moves[self.last_move](the_list, self.rng, prefix_length)
 
-        return the_list
+    def move_statistics(self) -> dict:
+        """
+        per-move counts of attempts, acceptances and improvements for the last solve()
+        :return: dictionary of move name -> dictionary of statistics
+        """
+        if self.search_mode == 'prefix':
+            return self.prefix_moves.statistics()
+        return self.moves.statistics()
 
 ###########################################################################################
 #
@@ -145,9 +714,19 @@ class SimpleArraySolver(SimulatedAnnealingSolver):
     # this one simply defines the score as a weighted sum of the first 3 list values
     # the perfect sorted order be [240, 230, 220, ...the rest doesn't matter]
     def score(self, candidate_list: list) -> float:
-        rv = candidate_list[0] + 0.9 * candidate_list[1] + 0.8 * candidate_list[2]
+        rv = sum(weight * value for weight, value in zip((1.0, 0.9, 0.8), candidate_list))
         return rv
 
+    def prefix_length(self, candidate_list: list) -> int:
+        return min(3, len(candidate_list))
+
+    def uncovered_count(self, candidate_list: list) -> int:
+        return max(0, 3 - len(candidate_list))
+
+    def completion_bound(self, prefix: list, remaining: list) -> float:
+        weights = (1.0, 0.9, 0.8)[len(prefix):]
+        return self.score(prefix) + sum(weights) * max(remaining, default=0)
+
 
 ###########################################################################################
 #
@@ -161,6 +740,22 @@ def main():
     my_list = simple_solver.solve()
     print(f"Final List     [{len(my_list)}]    : {my_list}")
 
+    for name, stats in simple_solver.move_statistics().items():
+        print(f"Move [{name}]: {stats}")
+
+    # same again, annealing only the scored prefix
+    simple_solver = SimpleArraySolver()
+    simple_solver.search_mode = 'prefix'
+    my_list = simple_solver.solve()
+    print(f"Prefix mode    [{len(my_list)}]    : {my_list}")
+
+    # and once more with the instrumentation reporting every 50th temperature step
+    simple_solver = SimpleArraySolver()
+    simple_solver.instrumentation = SolverInstrumentation(
+        callback=lambda step: print_step(step) if step['anneal'] % 50 == 0 else None)
+    simple_solver.solve()
+    print(f"Instrumented   : {simple_solver.instrumentation.summary()}")
+
 
     print("Done")
 
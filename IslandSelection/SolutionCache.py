@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from IslandCache import CACHE_DIR
+import atexit
+import json
+import os
+import sys
+
+# default location of the on-disk backing store
+SOLUTION_CACHE_FILE = os.path.join(CACHE_DIR, 'solutions.json')
+
+
+###########################################################################################
+#
+#
+class SolutionCache:
+    """
+    LRU cache of solver results, with an on-disk json backing store.
+
+    Keys come from SimulatedAnnealingSolver.solution_key(), i.e. a hash of the island list
+    in input order, weight profile, solver parameters and random seed.  Each entry holds the best
+    ordering (as indices into the input island order) and its score.
+
+    put() doesn't rewrite the store every time, it's saved every save_interval new solutions,
+    and whatever is left when save() is called, which the shared instance does at exit.
+    """
+    def __init__(self, filename: str = SOLUTION_CACHE_FILE, max_entries: int = 1024, save_interval: int = 16):
+        self.filename = filename
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+
+        # solutions put() since the last save
+        self.unsaved = 0
+
+        # key -> {'ordering': list of int, 'score': float}, least recently used first
+        self.entries = OrderedDict()
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+
+        if filename:
+            self.load()
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            # corrupt store, start over
+            return
+        for key, entry in data:
+            self.entries[key] = entry
+        self.evict()
+
+    def save(self):
+        """
+        write the store, if anything changed since the last save
+        if it can't be written (e.g. a read-only checkout) the results just stay in memory
+        """
+        if not self.filename or not self.unsaved:
+            return
+        temp_filename = self.filename + f'.{os.getpid()}.tmp'
+        try:
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # write to a temp file and rename, so a crash never leaves a half-written store
+            with open(temp_filename, 'w', encoding='utf-8') as file:
+                json.dump(list(self.entries.items()), file)
+            os.replace(temp_filename, self.filename)
+            self.unsaved = 0
+        except OSError:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    def get(self, key: str):
+        """
+        :return: the entry for this key, or None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, ordering: list, score: float):
+        """
+        remember a solution, keeping the better one if the key is already present
+        """
+        entry = self.entries.get(key)
+        if entry is not None and score <= entry['score']:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = {'ordering': list(ordering), 'score': score}
+        self.entries.move_to_end(key)
+        self.evict()
+        self.unsaved += 1
+        if self.unsaved >= self.save_interval:
+            self.save()
+
+    def evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.unsaved = 0
+        if self.filename and os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+# shared instance, so every solver in one process shares the same entries
+solution_cache = SolutionCache()
+atexit.register(solution_cache.save)
+
+
+def main():
+
+    # command line
+    #       python SolutionCache.py clear
+    if len(sys.argv) != 2 or sys.argv[1] != 'clear':
+        print("Usage:")
+        print("     python SolutionCache.py clear")
+        exit(-1)
+
+    solution_cache.clear()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
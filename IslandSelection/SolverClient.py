@@ -0,0 +1,54 @@
+import json
+import os
+import socket
+
+# client side of SolverService, kept apart from the service so a client doesn't pay for
+# importing asyncio, numpy and the solvers just to send a request
+
+# where the service listens by default, localhost only
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8117
+
+
+def token_filename(port: int) -> str:
+    """
+    the file a TCP service writes its access token to, in the user's home directory, so only
+    processes which can read that user's files can use the service
+    """
+    return os.path.join(os.path.expanduser('~'), f'.island_solver_{port}.token')
+
+
+def read_token(port: int) -> str:
+    """
+    :return: the access token of the service on this port, '' if there is none
+    """
+    try:
+        with open(token_filename(port), 'r', encoding='utf-8') as file:
+            return file.read().strip()
+    except OSError:
+        return ''
+
+
+def request(message: dict, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = '', token: str = None):
+    """
+    send one request to a running service
+    :param token: the service's access token for TCP, read from token_filename(port) if not given
+    :return: generator of the response events, ending after the final result, done, stats or error
+    """
+    if socket_path:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socket_path)
+    else:
+        message = {**message, 'token': token if token is not None else read_token(port)}
+        connection = socket.create_connection((host, port))
+
+    final = 'done' if message.get('op') == 'batch' else 'stats' if message.get('op') == 'stats' else 'result'
+    with connection, connection.makefile('rwb') as stream:
+        stream.write((json.dumps(message) + '\n').encode('utf-8'))
+        stream.flush()
+        for line in stream:
+            event = json.loads(line)
+            yield event
+            if event['event'] == final or (event['event'] == 'error' and 'job' not in event) \
+                    or (message.get('op') == 'shutdown' and event['event'] == 'done'):
+                return
@@ -0,0 +1,152 @@
+import json
+import time
+
+
+###########################################################################################
+#
+#
+class SolverInstrumentation:
+    """
+    Opt-in instrumentation for SimulatedAnnealingSolver.solve()
+
+    Set solver.instrumentation to an instance of this class, and at the end of every
+    temperature step solve() reports a dictionary of
+        anneal              anneal counter
+        temperature         temperature used for this step
+        trials              trials run at this temperature
+        accepted_better     trials accepted because they scored better
+        accepted_worse      trials accepted despite scoring worse
+        rejected            trials rejected
+        current_score       score of the current state
+        best_score          best score seen so far
+        score_time          seconds spent scoring candidates during this step
+        perturb_time        seconds spent perturbing candidates during this step
+        trials_per_second   trial rate for this step
+        elapsed             seconds since solve() started
+    to the callback, and/or as one json line per step to the trace file.
+
+    When solver.instrumentation is None, solve() doesn't time anything, so the cost of
+    having this hook is a few integer increments per trial.
+    """
+    def __init__(self, callback=None, trace_filename: str = ''):
+        # called as callback(step_dictionary)
+        self.callback = callback
+        self.trace_filename = trace_filename
+        self.trace_file = None
+
+        # all the step dictionaries from the last solve()
+        self.steps = []
+
+        # timers, accumulated by the wrappers around the search functions
+        self.score_time = 0.0
+        self.perturb_time = 0.0
+
+        self.start_time = 0.0
+        self.step_start_time = 0.0
+
+    def start(self):
+        """
+        called by solve() before the first trial
+        """
+        self.steps = []
+        self.score_time = 0.0
+        self.perturb_time = 0.0
+        self.start_time = time.perf_counter()
+        self.step_start_time = self.start_time
+        if self.trace_filename:
+            self.trace_file = open(self.trace_filename, 'a', encoding='utf-8')
+
+    def timed_perturb(self, function):
+        """
+        wrap the search propose() function so its time is accumulated
+        """
+        def timed(*args):
+            start = time.perf_counter()
+            rv = function(*args)
+            self.perturb_time += time.perf_counter() - start
+            return rv
+        return timed
+
+    def timed_score(self, function):
+        """
+        wrap the search evaluate() function so its time is accumulated
+        """
+        def timed(*args):
+            start = time.perf_counter()
+            rv = function(*args)
+            self.score_time += time.perf_counter() - start
+            return rv
+        return timed
+
+    def step(self, anneal: int, temperature: float, accepted_better: int, accepted_worse: int, rejected: int,
+             current_score: float, best_score: float):
+        """
+        called by solve() at the end of every temperature step
+        """
+        now = time.perf_counter()
+        trials = accepted_better + accepted_worse + rejected
+        step_time = now - self.step_start_time
+        step = {
+            'anneal': anneal,
+            'temperature': temperature,
+            'trials': trials,
+            'accepted_better': accepted_better,
+            'accepted_worse': accepted_worse,
+            'rejected': rejected,
+            'current_score': current_score,
+            'best_score': best_score,
+            'score_time': self.score_time,
+            'perturb_time': self.perturb_time,
+            'trials_per_second': trials / step_time if step_time > 0 else 0.0,
+            'elapsed': now - self.start_time,
+        }
+        self.steps.append(step)
+
+        if self.callback is not None:
+            self.callback(step)
+        if self.trace_file is not None:
+            self.trace_file.write(json.dumps(step) + '\n')
+            self.trace_file.flush()
+
+        # restart the per-step timers
+        self.score_time = 0.0
+        self.perturb_time = 0.0
+        self.step_start_time = time.perf_counter()
+
+    def finish(self):
+        """
+        called by solve() after the last trial
+        """
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    def summary(self) -> dict:
+        """
+        totals over every step of the last solve()
+        """
+        trials = sum(step['trials'] for step in self.steps)
+        elapsed = self.steps[-1]['elapsed'] if self.steps else 0.0
+        return {
+            'steps': len(self.steps),
+            'trials': trials,
+            'accepted_better': sum(step['accepted_better'] for step in self.steps),
+            'accepted_worse': sum(step['accepted_worse'] for step in self.steps),
+            'rejected': sum(step['rejected'] for step in self.steps),
+            'score_time': sum(step['score_time'] for step in self.steps),
+            'perturb_time': sum(step['perturb_time'] for step in self.steps),
+            'best_score': self.steps[-1]['best_score'] if self.steps else None,
+            'trials_per_second': trials / elapsed if elapsed > 0 else 0.0,
+            'elapsed': elapsed,
+        }
+
+
+def print_step(step: dict):
+    """
+    simple callback, one line per temperature step to stdout
+    """
+    print(f"Anneal [{step['anneal']:4}] T [{step['temperature']:9.3f}] "
+          f"Better/Worse/Rejected [{step['accepted_better']}/{step['accepted_worse']}/{step['rejected']}] "
+          f"Score [{step['current_score']:.0f}] Best [{step['best_score']:.0f}] "
+          f"Score/Perturb time [{step['score_time']:.3f}/{step['perturb_time']:.3f}] "
+          f"Trials/sec [{step['trials_per_second']:.0f}]")
@@ -0,0 +1,134 @@
+import json
+import sys
+
+# Kept free of numpy and the solvers, so anything which only reads or writes results
+# (e.g. a SolverService client) stays quick to start.
+
+
+###########################################################################################
+#
+#
+class SolverResult:
+    """
+    Everything about one solve, built once by RegionSolver.result() so nothing needs scoring again
+    to show it:
+        region, filename, coverage, engine      what was solved, and how
+        islands             names of the solution islands, in settling order
+        steps               one dictionary per solution island, in order
+                                island          island name
+                                island_score    the island's own score, counting only the fertilities it newly covers
+                                marginal        what it adds to the total, after the extra island reduction and penalty
+                                covered         fertilities it newly covers
+                                remaining       fertilities still uncovered after it
+        score               total score, the sum of the marginals
+        alternatives        list of (score, island names), the best distinct solutions seen, best first
+        stats               solver statistics, e.g. trials, moves, presolve counts
+        elapsed             seconds spent in the last solve, 0 if it came from the solution cache or there wasn't one
+    """
+    def __init__(self, region: str = '', filename: str = '', coverage: str = 'all', engine: str = 'anneal',
+                 islands: list = None, steps: list = None, score: float = 0.0, alternatives: list = None,
+                 stats: dict = None, elapsed: float = None):
+        self.region = region
+        self.filename = filename
+        self.coverage = coverage
+        self.engine = engine
+        self.islands = islands if islands is not None else []
+        self.steps = steps if steps is not None else []
+        self.score = score
+        self.alternatives = alternatives if alternatives is not None else []
+        self.stats = stats if stats is not None else {}
+        self.elapsed = elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            'region': self.region,
+            'filename': self.filename,
+            'coverage': self.coverage,
+            'engine': self.engine,
+            'islands': self.islands,
+            'steps': self.steps,
+            'score': self.score,
+            'alternatives': [[score, names] for score, names in self.alternatives],
+            'stats': self.stats,
+            'elapsed': self.elapsed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        inverse of to_dict(), other keys are ignored, e.g. the extra fields of a SolverService result event
+        """
+        fields = {name: data[name] for name in RESULT_FIELDS if name in data}
+        fields['alternatives'] = [(score, names) for score, names in data.get('alternatives', [])]
+        return cls(**fields)
+
+    def text(self) -> str:
+        """
+        the solution, and the alternatives if any, the way the solvers have always printed them
+        """
+        lines = [f"Islands: [{', '.join(self.islands)}] (Score = {self.score:.0f})"]
+        for rank, (score, names) in enumerate(self.alternatives, 1):
+            lines.append(f"{'':17}#{rank}: [{', '.join(names)}] (Score = {score:.0f})")
+        return '\n'.join(lines)
+
+
+# the keys of SolverResult.to_dict()
+RESULT_FIELDS = ('region', 'filename', 'coverage', 'engine', 'islands', 'steps', 'score', 'alternatives',
+                 'stats', 'elapsed')
+
+
+###########################################################################################
+#
+# result writers, each result is written (and flushed) as soon as it is handed over,
+# so a batch run can be read while it's still going
+#
+class TextResultWriter:
+    def __init__(self, file=sys.stdout):
+        self.file = file
+
+    def write(self, result: SolverResult):
+        self.file.write(f"Region map: [{result.filename}]\n{result.text()}\n")
+        self.file.flush()
+
+
+class JsonResultWriter:
+    """
+    one json object per line per result
+    """
+    def __init__(self, file=sys.stdout):
+        self.file = file
+
+    def write(self, result: SolverResult):
+        self.file.write(json.dumps(result.to_dict()) + '\n')
+        self.file.flush()
+
+
+class CsvResultWriter:
+    """
+    one row per solution island, with the result it belongs to repeated on every row
+    """
+    COLUMNS = ['region', 'filename', 'coverage', 'engine', 'score', 'elapsed',
+               'position', 'island', 'island_score', 'marginal', 'covered', 'remaining']
+
+    def __init__(self, file=sys.stdout):
+        # imported here, csv pulls in re, which the other formats don't need
+        import csv
+
+        self.file = file
+        self.writer = csv.writer(file, lineterminator='\n')
+        self.writer.writerow(self.COLUMNS)
+
+    def write(self, result: SolverResult):
+        common = [result.region, result.filename, result.coverage, result.engine, result.score, result.elapsed]
+        self.writer.writerows(common + [position, step['island'], step['island_score'], step['marginal'],
+                                        ' '.join(step['covered']), ' '.join(step['remaining'])]
+                              for position, step in enumerate(result.steps, 1))
+        self.file.flush()
+
+
+# output format -> writer class
+RESULT_WRITERS = {
+    'text': TextResultWriter,
+    'json': JsonResultWriter,
+    'csv': CsvResultWriter,
+}
@@ -0,0 +1,509 @@
+from LatiumSolver import LatiumSolver
+from AlbionSolver import AlbionSolver
+from SolverInstrumentation import SolverInstrumentation
+from SolverClient import DEFAULT_HOST, DEFAULT_PORT, request, token_filename
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import functools
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import sys
+import threading
+
+# solver class for each region name in a job
+SOLVER_CLASSES = {
+    'latium': LatiumSolver,
+    'albion': AlbionSolver,
+}
+
+# the fields of a solve job, and their defaults
+#   region          'latium' or 'albion'
+#   filename        island CSV file, as seen by the service
+#   coverage        coverage group, e.g. 'celtic' or 'roman', 'all' for every fertility
+#   seed            random seed, results are only remembered for seeded jobs
+#   parameters      solver tuning parameters by name, see SimulatedAnnealingSolver.set_parameters()
+#   progress        stream a progress event for every temperature step
+JOB_DEFAULTS = {
+    'region': 'latium',
+    'filename': '',
+    'coverage': 'all',
+    'seed': None,
+    'parameters': {},
+    'progress': False,
+}
+
+
+###########################################################################################
+#
+# worker process side
+#
+# every worker keeps the maps it has parsed, and the island score tables that go with them,
+# so a job on a map the worker has seen before starts annealing straight away
+
+# (region, filename, mtime, size) -> (islands, score tables)
+worker_maps = {}
+
+# max maps each worker keeps
+WORKER_MAX_MAPS = 64
+
+# queue back to the service for progress events, set by worker_init()
+progress_queue = None
+
+
+def worker_init(queue):
+    global progress_queue
+    progress_queue = queue
+
+
+def post_progress(token: int, step: dict):
+    progress_queue.put((token, step))
+
+
+def map_key(region: str, filename: str) -> tuple:
+    """
+    an edited file has a new modification time or size, and so misses every cache
+    """
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    return region, filename, stat.st_mtime_ns, stat.st_size
+
+
+def warm_map(solver_class, key: tuple) -> tuple:
+    entry = worker_maps.get(key)
+    if entry is None:
+        solver = solver_class()
+        solver.set_filename(key[1])
+        entry = (solver.the_list, {})
+        if len(worker_maps) >= WORKER_MAX_MAPS:
+            worker_maps.pop(next(iter(worker_maps)))
+        worker_maps[key] = entry
+    return entry
+
+
+def run_job(token: int, job: dict) -> dict:
+    """
+    solve one job, in a worker process
+    :return: SolverResult, as a dictionary
+    :raise ValueError: for anything that goes wrong, as a plain ValueError with the message, so it always
+        makes it back to the service (an exception which can't be unpickled there breaks the whole pool)
+    """
+    try:
+        return solve_job(token, job)
+    except Exception as e:
+        raise ValueError(str(e)) from None
+
+
+def solve_job(token: int, job: dict) -> dict:
+    solver_class = SOLVER_CLASSES[job['region']]
+    key = map_key(job['region'], job['filename'])
+    islands, score_tables = warm_map(solver_class, key)
+
+    solver = solver_class()
+    solver.filename = key[1]
+    solver.the_list = list(islands)
+
+    # the island scores only depend on the region weights, so every job on this map can share them
+    solver.score_tables = score_tables
+
+    solver.set_coverage(solver.region.coverage(job['coverage']))
+    if job['seed'] is not None:
+        solver.set_seed(job['seed'])
+    solver.set_parameters(job['parameters'])
+    if job['progress']:
+        solver.instrumentation = SolverInstrumentation(callback=functools.partial(post_progress, token))
+
+    solver.solve()
+    return solver.result().to_dict()
+
+
+###########################################################################################
+#
+#
+class SolverService:
+    """
+    Long running solver service, so tools submitting lots of small solves don't pay the
+    interpreter start, imports, CSV parsing and a cold score table for every one of them.
+
+    The protocol is one json object per line in each direction.  Requests carry an 'id',
+    which is copied into every response to that request, and an 'op':
+        solve       one job, with the fields in JOB_DEFAULTS
+        batch       {'jobs': [job, ...]}, each result has a 'job' index, then a 'done' event
+        stats       job and cache counters
+        shutdown    stop the service
+    Responses have an 'event' of 'progress', 'result', 'done', 'stats' or 'error'.
+    A connection can have any number of requests in flight, responses come back as they finish.
+
+    Jobs run on a process pool.  At most max_jobs are queued on the pool at once, identical
+    seeded jobs share one run, and seeded results are remembered, so re-asking is free.
+
+    Trust model: whoever can talk to the service can read any file the service's user can (as
+    an input file) and shut it down.  So a unix socket is created readable and writable by its
+    owner only, and on TCP, which any local user can connect to, every request must carry the
+    'token' the service writes to token_filename(port) in its user's home directory at start up.
+    SolverClient.request() adds it.  The service never listens beyond localhost.
+    """
+    def __init__(self, workers: int = None, max_jobs: int = None, max_results: int = 4096):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs or 2 * self.workers
+        self.max_results = max_results
+
+        # result key -> result, least recently used first
+        self.results = OrderedDict()
+
+        # result key -> future, for jobs running right now
+        self.running = {}
+
+        # progress token -> callback(step), for jobs which asked for progress
+        self.listeners = {}
+        self.next_token = 0
+
+        # statistics
+        self.submitted = 0
+        self.solved = 0
+        self.result_hits = 0
+        self.shared_runs = 0
+        self.failed = 0
+
+        self.restarts = 0
+
+        # access token every TCP request must carry, '' on a unix socket
+        self.token = ''
+
+        # handle_connection() tasks, cancelled at shutdown
+        self.connections = set()
+
+        self.pool = None
+        self.progress_queue = None
+        self.slots = None
+        self.loop = None
+        self.stopped = None
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = ''):
+        """
+        listen on a unix socket if socket_path is given, otherwise on host:port, until a shutdown request
+        see the class notes for who may connect
+        """
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        self.slots = asyncio.Semaphore(self.max_jobs)
+
+        self.start_pool()
+
+        try:
+            if socket_path:
+                # owner only, from the moment the socket exists
+                umask = os.umask(0o177)
+                try:
+                    server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+                finally:
+                    os.umask(umask)
+            else:
+                server = await asyncio.start_server(self.handle_connection, host, port)
+
+                # only once the port is ours, so a service already on it keeps its token
+                self.token = secrets.token_hex(16)
+                self.write_token(token_filename(port))
+        except BaseException:
+            self.stop_pool()
+            raise
+
+        try:
+            async with server:
+                await self.stopped.wait()
+
+                # let the shutdown reply go out, then drop the connections still open
+                for task in list(self.connections):
+                    task.cancel()
+                await asyncio.gather(*self.connections, return_exceptions=True)
+        finally:
+            self.stop_pool()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+            if self.token and os.path.exists(token_filename(port)):
+                os.remove(token_filename(port))
+
+    def write_token(self, filename: str):
+        """
+        write the access token to a file only its owner can read
+        """
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            # the mode above only applies to a new file
+            os.chmod(filename, 0o600)
+            file.write(self.token + '\n')
+
+    def start_pool(self):
+        """
+        start the worker pool, with a new progress queue and the thread reading it
+        """
+        context = multiprocessing.get_context()
+        self.progress_queue = context.Queue()
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=context,
+                                        initializer=worker_init, initargs=(self.progress_queue,))
+        reader = threading.Thread(target=self.read_progress, args=(self.progress_queue,), daemon=True)
+        reader.start()
+
+    def stop_pool(self):
+        self.progress_queue.put(None)
+        self.pool.shutdown(cancel_futures=True)
+
+    def restart_pool(self, broken_pool):
+        """
+        replace a pool whose worker died, unless another job got there first
+        """
+        if self.pool is broken_pool:
+            self.restarts += 1
+            self.stop_pool()
+            self.start_pool()
+
+    def read_progress(self, queue):
+        """
+        hand progress events from the workers over to the event loop, runs in its own thread
+        """
+        while True:
+            try:
+                item = queue.get()
+            except (OSError, EOFError, ValueError, TypeError):
+                # the queue went down with a dead worker, its pool is being replaced
+                return
+            if item is None:
+                return
+            self.loop.call_soon_threadsafe(self.dispatch_progress, *item)
+
+    def dispatch_progress(self, token: int, step: dict):
+        callback = self.listeners.get(token)
+        if callback is not None:
+            callback(step)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.handle_request(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            # the service is shutting down
+            for task in tasks:
+                task.cancel()
+        finally:
+            self.connections.discard(connection)
+            writer.close()
+
+    @staticmethod
+    def send(writer: asyncio.StreamWriter, message: dict):
+        # one write() per line, so responses from concurrent requests never interleave
+        if not writer.is_closing():
+            writer.write((json.dumps(message) + '\n').encode('utf-8'))
+
+    async def handle_request(self, line: bytes, writer: asyncio.StreamWriter):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request should be a json object")
+            request_id = request.get('id')
+            if self.token and not hmac.compare_digest(str(request.get('token', '')).encode('utf-8'),
+                                                      self.token.encode('utf-8')):
+                raise ValueError("Missing or wrong access token, see SolverClient.token_filename()")
+            op = request.get('op')
+            if op == 'solve':
+                await self.handle_solve(request_id, request, writer)
+            elif op == 'batch':
+                await self.handle_batch(request_id, request.get('jobs', []), writer)
+            elif op == 'stats':
+                self.send(writer, {'id': request_id, 'event': 'stats', **self.stats()})
+            elif op == 'shutdown':
+                self.send(writer, {'id': request_id, 'event': 'done'})
+                self.stopped.set()
+            else:
+                raise ValueError(f"Unknown op [{op}]")
+        except Exception as e:
+            self.send(writer, {'id': request_id, 'event': 'error', 'message': str(e)})
+        await writer.drain()
+
+    async def handle_solve(self, request_id, job: dict, writer: asyncio.StreamWriter, job_index: int = None):
+        extra = {} if job_index is None else {'job': job_index}
+
+        def on_step(step: dict):
+            self.send(writer, {'id': request_id, 'event': 'progress', **extra, 'step': step})
+
+        try:
+            result = await self.solve(job, on_step)
+        except Exception as e:
+            self.failed += 1
+            self.send(writer, {'id': request_id, 'event': 'error', **extra, 'message': str(e)})
+        else:
+            self.send(writer, {'id': request_id, 'event': 'result', **extra, **result})
+        await writer.drain()
+
+    async def handle_batch(self, request_id, jobs: list, writer: asyncio.StreamWriter):
+        await asyncio.gather(*(self.handle_solve(request_id, job, writer, ndx) for ndx, job in enumerate(jobs)))
+        self.send(writer, {'id': request_id, 'event': 'done', 'count': len(jobs)})
+
+    @staticmethod
+    def normalize(job: dict) -> dict:
+        """
+        :return: the job with defaults filled in
+        :raise ValueError: for unknown fields or regions
+        """
+        unknown = set(job) - set(JOB_DEFAULTS) - {'id', 'op', 'token'}
+        if unknown:
+            raise ValueError(f"Unknown job fields {sorted(unknown)}")
+        rv = {name: job.get(name, default) for name, default in JOB_DEFAULTS.items()}
+        if rv['region'] not in SOLVER_CLASSES:
+            raise ValueError(f"Unknown region [{rv['region']}], expected one of {list(SOLVER_CLASSES)}")
+        if not rv['filename']:
+            raise ValueError("Job has no filename")
+        groups = SOLVER_CLASSES[rv['region']].island_class.region.coverage_groups
+        if rv['coverage'] != 'all' and rv['coverage'] not in groups:
+            raise ValueError(f"Unknown coverage [{rv['coverage']}], expected one of {['all'] + list(groups)}")
+        return rv
+
+    async def solve(self, job: dict, on_step=None) -> dict:
+        """
+        :return: the result of one job, remembered if seeded, shared with an identical job already running
+        """
+        job = self.normalize(job)
+        self.submitted += 1
+
+        # unseeded jobs are meant to differ run to run, so they are never shared or remembered
+        key = None
+        if job['seed'] is not None:
+            region, filename, mtime, size = map_key(job['region'], job['filename'])
+            key = json.dumps([region, filename, mtime, size, job['coverage'], job['seed'], job['parameters']],
+                             sort_keys=True)
+            result = self.results.get(key)
+            if result is not None:
+                self.result_hits += 1
+                self.results.move_to_end(key)
+                return {**result, 'cached': True}
+            running = self.running.get(key)
+            if running is not None:
+                self.shared_runs += 1
+                return {**await asyncio.shield(running), 'cached': True}
+
+        future = self.loop.create_future()
+        if key is not None:
+            self.running[key] = future
+        try:
+            result = await self.run(job, on_step)
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if key is not None:
+                self.results[key] = result
+                while len(self.results) > self.max_results:
+                    self.results.popitem(last=False)
+        finally:
+            if key is not None:
+                self.running.pop(key, None)
+
+        self.solved += 1
+        return {**result, 'cached': False}
+
+    async def run(self, job: dict, on_step=None) -> dict:
+        async with self.slots:
+            token = self.next_token
+            self.next_token += 1
+            if job['progress'] and on_step is not None:
+                self.listeners[token] = on_step
+            pool = self.pool
+            try:
+                return await self.loop.run_in_executor(pool, run_job, token, job)
+            except BrokenProcessPool:
+                # a worker died (killed, out of memory...), the pool is no use after that, so start a new one
+                self.restart_pool(pool)
+                raise ValueError("The worker process running this job died, the worker pool has been restarted")
+            finally:
+                self.listeners.pop(token, None)
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'max_jobs': self.max_jobs,
+            'submitted': self.submitted,
+            'solved': self.solved,
+            'result_hits': self.result_hits,
+            'shared_runs': self.shared_runs,
+            'failed': self.failed,
+            'restarts': self.restarts,
+            'running': len(self.running),
+            'remembered': len(self.results),
+        }
+
+
+def main():
+
+    # command line
+    #       python SolverService.py serve [--port=N | --socket=path] [--workers=N]
+    #       python SolverService.py solve latium|albion inputfile.csv [coverage] [--seed=N] [--progress] [--port=N | --socket=path]
+    #       python SolverService.py stats|shutdown [--port=N | --socket=path]
+    options = {arg[2:].split('=')[0]: (arg.split('=', 1) + [''])[1] for arg in sys.argv[1:] if arg.startswith('--')}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args or args[0] not in ('serve', 'solve', 'stats', 'shutdown') \
+            or (args[0] == 'solve' and len(args) not in (3, 4)) or (args[0] != 'solve' and len(args) != 1):
+        print("Usage:")
+        print("     python SolverService.py serve [--port=N | --socket=path] [--workers=N]")
+        print("     python SolverService.py solve latium|albion inputfile.csv [coverage] [--seed=N] [--progress] [--port=N | --socket=path]")
+        print("     python SolverService.py stats|shutdown [--port=N | --socket=path]")
+        print("        anyone who can reach the service can have it read any file you can, so it only listens")
+        print("        on localhost, TCP requests need the token it writes to ~/.island_solver_<port>.token,")
+        print("        and a unix socket is only usable by you")
+        exit(-1)
+
+    address = {'port': int(options.get('port') or DEFAULT_PORT), 'socket_path': options.get('socket', '')}
+
+    if args[0] == 'serve':
+        service = SolverService(workers=int(options['workers']) if options.get('workers') else None)
+        where = address['socket_path'] or f"{DEFAULT_HOST}:{address['port']}"
+        print(f"Solver service on [{where}], [{service.workers}] workers")
+        asyncio.run(service.serve(DEFAULT_HOST, address['port'], address['socket_path']))
+        print("Done")
+        return
+
+    if args[0] == 'solve':
+        message = {'id': 1, 'op': 'solve', 'region': args[1], 'filename': os.path.abspath(args[2]),
+                   'coverage': args[3] if len(args) == 4 else 'all', 'progress': 'progress' in options}
+        if options.get('seed'):
+            message['seed'] = int(options['seed'])
+    else:
+        message = {'id': 1, 'op': args[0]}
+
+    for event in request(message, **address):
+        if event['event'] == 'progress':
+            step = event['step']
+            print(f"Anneal [{step['anneal']:4}] Score [{step['current_score']:.0f}] Best [{step['best_score']:.0f}]")
+        elif event['event'] == 'result':
+            names = ', '.join(event['islands'])
+            cached = ', cached' if event['cached'] else ''
+            print(f"Islands: [{names}] (Score = {event['score']:.0f}) [{event['elapsed']:.3f} s{cached}]")
+        elif event['event'] == 'error':
+            print(f"Error: {event['message']}")
+            exit(1)
+        else:
+            fields = {name: value for name, value in event.items() if name not in ('id', 'event')}
+            if fields:
+                print(fields)
+
+
+if __name__ == '__main__':
+    main()
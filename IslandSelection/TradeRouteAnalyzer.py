@@ -0,0 +1,290 @@
+from SavegameReader import *
+import math
+import sys
+
+# child node names tried, in order, for the good and the amount in a Stations/GoodInfos entry
+GOOD_TAGS = ('Good', 'Product', 'GUID', 'guid')
+AMOUNT_TAGS = ('Amount', 'Count', 'Value')
+
+
+###########################################################################################
+#
+#
+class TradeStation:
+    """
+    One stop of a trade route.
+    goods is a dictionary of good GUID -> amount, where by convention a positive amount is
+    loaded onto the ship at this station and a negative amount is unloaded
+    """
+    def __init__(self, area_id: int, station_id: int = 0, goods: dict = None):
+        self.area_id = area_id
+        self.station_id = station_id
+        self.goods = goods if goods is not None else {}
+
+    @classmethod
+    def from_element(cls, element):
+        area_id = hex_to_int(child_text(element, 'AreaID'))
+        station_id = hex_to_int(child_text(element, 'StationID'))
+        goods = {}
+        for good_info in element.iterfind('GoodInfos/None'):
+            good = next((child_text(good_info, tag) for tag in GOOD_TAGS if child_text(good_info, tag)), '')
+            if not good:
+                continue
+            amount = next((child_text(good_info, tag) for tag in AMOUNT_TAGS if child_text(good_info, tag)), '')
+            good_guid = hex_to_int(good)
+            goods[good_guid] = goods.get(good_guid, 0) + hex_to_int(amount)
+        return cls(area_id, station_id, goods)
+
+
+###########################################################################################
+#
+#
+class TradeRoute:
+    """
+    One route from SessionTradeRouteManager/RouteMap
+    """
+    def __init__(self, route_id: int, name: str = '', ships: list = None, stations: list = None):
+        self.route_id = route_id
+        self.name = name
+        self.ships = ships if ships is not None else []
+        self.stations: list[TradeStation] = stations if stations is not None else []
+
+    @classmethod
+    def from_element(cls, element, route_id: int = None):
+        # RouteMap entries carry their own ID, prefer it over the interleaved map key
+        if child_text(element, 'ID'):
+            route_id = hex_to_int(child_text(element, 'ID'))
+        name = hex_to_utf16(child_text(element, 'Name'))
+        ships = hex_to_int_array(child_text(element, 'Ships'), 8)
+        stations = [TradeStation.from_element(station) for station in element.iterfind('Stations/None')]
+        return cls(route_id, name, ships, stations)
+
+    def area_ids(self) -> list:
+        return [station.area_id for station in self.stations]
+
+
+###########################################################################################
+#
+#
+class RouteEdge:
+    """
+    Directed island-to-island leg of the route graph, merged across every route using it
+    """
+    def __init__(self, from_area: int, to_area: int, distance: float = None):
+        self.from_area = from_area
+        self.to_area = to_area
+        self.distance = distance
+        self.route_ids = set()
+
+        # good GUID -> amount carried on board along this leg
+        self.goods = {}
+
+    def total_goods(self) -> int:
+        return sum(self.goods.values())
+
+
+###########################################################################################
+#
+#
+class TradeRouteAnalyzer:
+    """
+    Build a compact island-to-island graph from the savegame trade routes, and report the
+    goods flow per route and per island.
+
+    Everything is indexed once up front (routes by id, by station AreaID and by ship MetaID,
+    edges by (from, to) pair) so queries never re-scan the route list.
+    """
+    def __init__(self):
+        self.routes: dict[int, TradeRoute] = {}
+        self.positions: dict[int, tuple] = {}
+        self.ship_names: dict[int, str] = {}
+
+        # indices
+        self.routes_by_area: dict[int, set] = {}
+        self.routes_by_ship: dict[int, set] = {}
+        self.edges: dict[tuple, RouteEdge] = {}
+
+        # per island goods flow, area_id -> {good GUID -> amount}
+        self.island_loaded: dict[int, dict] = {}
+        self.island_unloaded: dict[int, dict] = {}
+
+        # per island passive trade history entry counts, area_id -> count
+        self.history_counts: dict[int, int] = {}
+
+    def load_savegame(self, savegame: Savegame):
+        """
+        read the routes, island positions, ship names and trade history out of a savegame
+        """
+        for game_session in savegame.sessions():
+            self.positions.update(game_session.island_positions())
+            self.ship_names.update(game_session.ship_names())
+            for area_id, area_info in game_session.area_infos():
+                entries = area_info.find('PassiveTrade/History/TradeRouteEntries')
+                if entries is not None:
+                    self.history_counts[area_id] = self.history_counts.get(area_id, 0) + len(entries)
+
+        route_map = savegame.trade_route_map()
+        if route_map is not None:
+            for route_id, element in interleaved_pairs(route_map):
+                self.add_route(TradeRoute.from_element(element, route_id))
+
+    def set_positions(self, positions: dict):
+        """
+        override island positions, area_id -> (x, y)
+        """
+        self.positions = dict(positions)
+        for edge in self.edges.values():
+            edge.distance = self.distance(edge.from_area, edge.to_area)
+
+    def distance(self, from_area: int, to_area: int):
+        """
+        straight line distance between two islands, or None if either position is unknown
+        """
+        a = self.positions.get(from_area)
+        b = self.positions.get(to_area)
+        if a is None or b is None:
+            return None
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+    def add_route(self, route: TradeRoute):
+        """
+        add one route to the graph and update all the indices
+        """
+        self.routes[route.route_id] = route
+
+        for ship in route.ships:
+            self.routes_by_ship.setdefault(ship, set()).add(route.route_id)
+
+        # routes are cyclic, so the last station connects back to the first
+        # run one warm-up lap first, so goods loaded late in the route are already on board
+        # for the legs back around to the start
+        on_board = {}
+        for station in route.stations:
+            for good, amount in station.goods.items():
+                on_board[good] = max(0, on_board.get(good, 0) + amount)
+
+        count = len(route.stations)
+        for ndx, station in enumerate(route.stations):
+            self.routes_by_area.setdefault(station.area_id, set()).add(route.route_id)
+
+            # per island flow
+            for good, amount in station.goods.items():
+                if amount > 0:
+                    loaded = self.island_loaded.setdefault(station.area_id, {})
+                    loaded[good] = loaded.get(good, 0) + amount
+                elif amount < 0:
+                    unloaded = self.island_unloaded.setdefault(station.area_id, {})
+                    unloaded[good] = unloaded.get(good, 0) - amount
+
+            # update the cargo for this stop, then add it to the leg towards the next stop
+            for good, amount in station.goods.items():
+                on_board[good] = max(0, on_board.get(good, 0) + amount)
+
+            if count < 2:
+                continue
+            next_station = route.stations[(ndx + 1) % count]
+            if next_station.area_id == station.area_id:
+                continue
+            key = (station.area_id, next_station.area_id)
+            edge = self.edges.get(key)
+            if edge is None:
+                edge = RouteEdge(station.area_id, next_station.area_id,
+                                 self.distance(station.area_id, next_station.area_id))
+                self.edges[key] = edge
+            edge.route_ids.add(route.route_id)
+            for good, amount in on_board.items():
+                if amount > 0:
+                    edge.goods[good] = edge.goods.get(good, 0) + amount
+
+    def routes_for_island(self, area_id: int) -> list:
+        return [self.routes[route_id] for route_id in sorted(self.routes_by_area.get(area_id, ()))]
+
+    def routes_for_ship(self, meta_id: int) -> list:
+        return [self.routes[route_id] for route_id in sorted(self.routes_by_ship.get(meta_id, ()))]
+
+    def route_length(self, route: TradeRoute):
+        """
+        total length of one lap of the route, or None if any island position is unknown
+        """
+        count = len(route.stations)
+        if count < 2:
+            return 0.0
+        rv = 0.0
+        for ndx, station in enumerate(route.stations):
+            leg = self.distance(station.area_id, route.stations[(ndx + 1) % count].area_id)
+            if leg is None:
+                return None
+            rv += leg
+        return rv
+
+    def route_flow(self, route: TradeRoute) -> dict:
+        """
+        :return: dictionary of good GUID -> total amount loaded per lap of this route
+        """
+        rv = {}
+        for station in route.stations:
+            for good, amount in station.goods.items():
+                if amount > 0:
+                    rv[good] = rv.get(good, 0) + amount
+        return rv
+
+    def throughput(self, route: TradeRoute):
+        """
+        goods moved per lap divided by the number of ships and the lap length, i.e. a rough
+        measure of how hard each ship on the route is working.  None if the length is unknown
+        """
+        length = self.route_length(route)
+        if not length:
+            return None
+        ships = max(1, len(route.ships))
+        return sum(self.route_flow(route).values()) / (length * ships)
+
+    def report(self):
+        """
+        write the route graph and goods flow to stdout
+        """
+        print(f"Trade routes: [{len(self.routes)}]")
+        for route_id in sorted(self.routes):
+            route = self.routes[route_id]
+            length = self.route_length(route)
+            length_text = f"{length:.0f}" if length is not None else '?'
+            throughput = self.throughput(route)
+            throughput_text = f"{throughput:.3f}" if throughput is not None else '?'
+            ships = [self.ship_names.get(ship) or str(ship) for ship in route.ships]
+            print(f"    Route [{route_id}] [{route.name}] Ships: {ships} Stops: {route.area_ids()}")
+            print(f"        Length: [{length_text}] Goods per lap: {self.route_flow(route)} Throughput: [{throughput_text}]")
+
+        print(f"Island graph: [{len(self.edges)}] legs")
+        for key in sorted(self.edges):
+            edge = self.edges[key]
+            distance_text = f"{edge.distance:.0f}" if edge.distance is not None else '?'
+            print(f"    [{edge.from_area}] -> [{edge.to_area}] Distance: [{distance_text}] "
+                  f"Routes: {sorted(edge.route_ids)} Goods: {edge.goods}")
+
+        print("Islands:")
+        islands = set(self.routes_by_area) | set(self.history_counts)
+        for area_id in sorted(islands):
+            print(f"    Island [{area_id}] Routes: {sorted(self.routes_by_area.get(area_id, ()))} "
+                  f"Exports: {self.island_loaded.get(area_id, {})} "
+                  f"Imports: {self.island_unloaded.get(area_id, {})} "
+                  f"History entries: [{self.history_counts.get(area_id, 0)}]")
+
+
+def main():
+
+    # command line
+    #       python TradeRouteAnalyzer.py savegame.xml
+    if len(sys.argv) != 2:
+        print("Usage:")
+        print("     python TradeRouteAnalyzer.py savegame.xml")
+        exit(-1)
+
+    analyzer = TradeRouteAnalyzer()
+    analyzer.load_savegame(Savegame(sys.argv[1]))
+    analyzer.report()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+from Region import *
+import numpy
+import sys
+
+# default sweep settings
+#   FACTORS         one-at-a-time multipliers, every weight is set to each of these in turn
+#   SAMPLES         random profiles, every weight multiplied by its own uniform(1 - SPREAD, 1 + SPREAD)
+#   SEEDS, TOP_K    annealing runs per map, and distinct solutions kept from each, to make the candidate plans
+FACTORS = (0.5, 0.8, 1.25, 1.5)
+SAMPLES = 1000
+SPREAD = 0.25
+SEEDS = 4
+TOP_K = 25
+
+
+def feature_names(region: Region) -> list:
+    """
+    the weights a plan's score is linear in, in feature column order:
+    each fertility, the river/marsh slot and mountain slot weights, each island size, and the extra island penalty
+    """
+    return [f.name for f in region.fertility_class] + [region.slot_kind, 'mountain'] \
+        + [size.name for size in IslandSize] + ['penalty']
+
+
+def base_weights(solver) -> numpy.ndarray:
+    """
+    :return: the solver's weights, as a vector in feature column order
+    """
+    region = solver.region
+    return numpy.concatenate([region.weights, [region.slot_weight, region.mountain_weight],
+                              [region.size_weights.get(size, 0.0) for size in IslandSize],
+                              [solver.extra_island_penalty]])
+
+
+def plan_features(solver, plans: list) -> numpy.ndarray:
+    """
+    Encode plans as a feature matrix, so a plan's score under any weights is a dot product.
+
+    The walk down a plan (which fertilities each island newly covers, and where the walk stops)
+    doesn't depend on the weights, only the points do, so every score term is a weight times a
+    number fixed by the plan:
+        fertility f         sum over islands newly covering f of reduction_rate ** position x slot scaling
+        slots, mountains    sum over islands of reduction_rate ** position x slot count
+        size s              sum over islands of size s of reduction_rate ** position
+        penalty             minus the sum of the positions
+    The extra island reduction rate is the one thing the score isn't linear in, so it stays fixed.
+    :param plans: list of island lists, each covering the solver's targeted fertilities
+    :return: (plans, features) array
+    """
+    region = solver.region
+    fertility_count = len(region.bits)
+    size_columns = {size: fertility_count + 2 + ndx for ndx, size in enumerate(IslandSize)}
+    slot_column = fertility_count
+    mountain_column = fertility_count + 1
+    penalty_column = fertility_count + 2 + len(IslandSize)
+
+    slot_scaled = region.scaling == SLOT_SCALING
+    mountain_scaled = region.scaling == MOUNTAIN_SCALING
+
+    rv = numpy.zeros((len(plans), penalty_column + 1))
+    for ndx, plan in enumerate(plans):
+        uncovered = int(solver.starting_fertilities)
+        for position, island in enumerate(plan):
+            discount = solver.extra_island_reduction_rate ** position
+
+            # fertility scaling, as in Region.island_score()
+            present = (int(island.fertilities) & uncovered & region.bits) != 0
+            scale = numpy.where(slot_scaled, island.slots / 10.0,
+                                numpy.where(mountain_scaled, island.mountain_slots / 10.0, 1.0))
+            rv[ndx, :fertility_count] += discount * present * scale
+            rv[ndx, slot_column] += discount * island.slots
+            rv[ndx, mountain_column] += discount * island.mountain_slots
+            rv[ndx, size_columns[island.island_size]] += discount
+            rv[ndx, penalty_column] -= position
+
+            uncovered &= ~int(island.fertilities)
+            if position == 0:
+                uncovered |= region.readd_after_first
+            if uncovered == 0:
+                break
+    return rv
+
+
+def one_at_a_time_profiles(names: list, factors: tuple = FACTORS) -> tuple:
+    """
+    :return: (labels, multipliers) where multipliers is a (features, profiles) array, the first
+        profile is the unchanged weights, then every weight times every factor in turn
+    """
+    labels = ['base']
+    columns = [numpy.ones(len(names))]
+    for ndx, name in enumerate(names):
+        for factor in factors:
+            column = numpy.ones(len(names))
+            column[ndx] = factor
+            labels.append(f"{name} x{factor:g}")
+            columns.append(column)
+    return labels, numpy.stack(columns, axis=1)
+
+
+def random_profiles(names: list, count: int = SAMPLES, spread: float = SPREAD, seed=None) -> tuple:
+    """
+    :return: (labels, multipliers), every weight multiplied by its own uniform(1 - spread, 1 + spread)
+    """
+    rng = numpy.random.default_rng(seed)
+    return [f"random #{ndx + 1}" for ndx in range(count)], rng.uniform(1.0 - spread, 1.0 + spread, (len(names), count))
+
+
+def candidate_plans(solver, seeds: int = SEEDS, top_k: int = TOP_K) -> list:
+    """
+    the distinct covering solutions seen by a few seeded annealing runs, best first
+    """
+    islands = list(solver.the_list)
+    best = dict()
+    solver.top_k = top_k
+    for seed in range(1, seeds + 1):
+        solver.the_list = list(islands)
+        solver.set_seed(seed)
+        solver.solve()
+        for score, prefix in solver.best_solutions():
+            key = tuple(id(island) for island in prefix)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, prefix)
+    solver.the_list = islands
+    return [prefix for score, prefix in sorted(best.values(), key=lambda entry: -entry[0])]
+
+
+def sweep(features: numpy.ndarray, weights: numpy.ndarray, multipliers: numpy.ndarray) -> tuple:
+    """
+    re-score every plan under every profile, as one matrix product
+    :param features: (plans, features) from plan_features()
+    :param weights: (features,) base weights
+    :param multipliers: (features, profiles)
+    :return: (scores (plans, profiles), index of the best plan under each profile)
+    """
+    scores = features @ (weights[:, None] * multipliers)
+    return scores, numpy.argmax(scores, axis=0)
+
+
+def print_sweep(solver, plans: list, factors: tuple = FACTORS, samples: int = SAMPLES, spread: float = SPREAD):
+    names = feature_names(solver.region)
+    weights = base_weights(solver)
+    features = plan_features(solver, plans)
+
+    oat_labels, oat = one_at_a_time_profiles(names, factors)
+    random_labels, sampled = random_profiles(names, samples, spread, seed=1)
+    _, oat_best = sweep(features, weights, oat)
+    _, random_best = sweep(features, weights, sampled)
+
+    def plan_names(ndx: int) -> str:
+        return ', '.join(island.island_name for island in plans[ndx])
+
+    base_best = oat_best[0]
+    print(f"Plans: [{len(plans)}]  Profiles: [{len(oat_labels) + len(random_labels)}]")
+    print(f"Best plan with the current weights: [{plan_names(base_best)}] (Score = {features[base_best] @ weights:.0f})")
+
+    # which single weight changes pick a different plan
+    flips = [(oat_labels[ndx], best) for ndx, best in enumerate(oat_best) if best != base_best]
+    if flips:
+        print("Single weight changes which pick a different plan:")
+        for label, best in flips:
+            print(f"    {label:24} [{plan_names(best)}]")
+    else:
+        print(f"No single weight change by {list(factors)} picks a different plan")
+
+    # how often each plan wins when every weight moves at once
+    plan_ids, wins = numpy.unique(random_best, return_counts=True)
+    print(f"Best plans with every weight randomly within +/-{spread:.0%}:")
+    for ndx in numpy.argsort(-wins):
+        print(f"    {wins[ndx] / samples:6.1%}  [{plan_names(plan_ids[ndx])}]")
+
+
+def main():
+
+    # command line
+    #       python WeightSweep.py latium|albion inputfile.csv ... [--coverage=name] [--samples=N] [--spread=X] [--seeds=N]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) < 2 or args[0] not in ('latium', 'albion'):
+        print("Usage:")
+        print("     python WeightSweep.py latium|albion inputfile.csv ... [--coverage=name] [--samples=N] [--spread=X] [--seeds=N]")
+        exit(-1)
+
+    if args[0] == 'latium':
+        from LatiumSolver import LatiumSolver as solver_class
+    else:
+        from AlbionSolver import AlbionSolver as solver_class
+
+    for filename in args[1:]:
+        solver = solver_class()
+        try:
+            solver.set_filename(filename)
+            solver.set_coverage(solver.region.coverage(options.get('coverage') or 'all'))
+            plans = candidate_plans(solver, int(options.get('seeds') or SEEDS))
+        except KeyError as e:
+            print(f"Unknown coverage {e}")
+            exit(1)
+        except (OSError, ValueError) as e:
+            print(e)
+            exit(1)
+
+        print('')
+        print(f"Region map: [{solver.filename}]")
+        print_sweep(solver, plans, samples=int(options.get('samples') or SAMPLES),
+                    spread=float(options.get('spread') or SPREAD))
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
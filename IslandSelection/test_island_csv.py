@@ -0,0 +1,37 @@
+from IslandCsv import IslandCsvError, read_island_csv
+from LatiumIsland import *
+import os
+import pytest
+
+# Run with:  python -m pytest test_island_csv.py
+
+MAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corners_seed4428_latium.csv')
+
+
+def read_names(filename) -> list:
+    return list(read_island_csv(str(filename), LATIUM).names)
+
+
+def test_comment_before_header(tmp_path):
+    with open(MAP_FILE, 'r', encoding='utf-8') as file:
+        text = file.read()
+    commented = tmp_path / 'commented.csv'
+    commented.write_text('# my notes\n#  more notes, with a comma\n' + text, encoding='utf-8')
+    assert read_names(commented) == read_names(MAP_FILE)
+
+
+def test_comment_without_header_uses_standard_layout(tmp_path):
+    with open(MAP_FILE, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    headerless = tmp_path / 'headerless.csv'
+    headerless.write_text('# my notes\n' + '\n'.join(lines[1:]) + '\n', encoding='utf-8')
+    assert read_names(headerless) == read_names(MAP_FILE)
+
+
+def test_header_missing_columns(tmp_path):
+    broken = tmp_path / 'broken.csv'
+    broken.write_text('# my notes\n#Name,Mackerel,Size\nW,1,XL\n', encoding='utf-8')
+    with pytest.raises(IslandCsvError) as e:
+        read_island_csv(str(broken), LATIUM)
+    assert e.value.errors[0][0] == 2
+    assert 'header is missing columns' in e.value.errors[0][1]
@@ -0,0 +1,52 @@
+from AlbionSolver import AlbionSolver
+from AlbionIsland import *
+from ExactSolver import ExactSolver
+from Presolve import presolve
+
+# Run with:  python -m pytest test_presolve.py
+
+
+def filler_map():
+    """
+    B has every Celtic fertility but tin, A only barley, so A is dominated by B, but A is an
+    XL island with lots of slots, and is worth having between B and C as filler
+    """
+    solver = AlbionSolver()
+    solver.set_coverage(AlbionFertility.celtic())
+    b = AlbionIsland('B', AlbionFertility.celtic() & ~AlbionFertility.TIN, 10, 10, IslandSize.EXTRALARGE)
+    a = AlbionIsland('A', AlbionFertility.BARLEY, 10, 10, IslandSize.EXTRALARGE)
+    c = AlbionIsland('C', AlbionFertility.TIN, 0, 0, IslandSize.SMALL)
+    solver.the_list = [b, a, c]
+    return solver
+
+
+def optimum(solver) -> tuple:
+    exact = ExactSolver(solver)
+    score = exact.solve()
+    return score, [island.island_name for island in exact.best_prefix]
+
+
+def test_dominated_filler_is_kept():
+    solver = filler_map()
+    assert optimum(solver) == (1756.5, ['B', 'A', 'C'])
+
+    solver.presolve_pruning = True
+    assert [island.island_name for island in presolve(solver, True).kept] == ['B', 'A', 'C']
+    assert optimum(solver) == (1756.5, ['B', 'A', 'C'])
+
+    solver.presolve_enabled = False
+    assert optimum(solver) == (1756.5, ['B', 'A', 'C'])
+
+
+def test_dominated_island_without_filler_value_is_pruned():
+    solver = filler_map()
+    solver.extra_island_penalty = 10000
+    result = presolve(solver, True)
+    assert [island.island_name for island in result.pruned] == ['A']
+    assert result.dominated == 1
+
+
+def test_presolve_only_checks_coverage_by_default():
+    solver = filler_map()
+    result = presolve(solver)
+    assert len(result.kept) == 3 and not result.pruned
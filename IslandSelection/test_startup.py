@@ -0,0 +1,30 @@
+from Benchmark import Benchmark, MAP_DIR, STARTUP_COMMANDS
+import subprocess
+import sys
+
+# Run with:  python -m pytest test_startup.py
+
+# start up time the usage message may take beyond a bare interpreter, in seconds
+# it's about 20ms here, importing numpy alone is over 100ms
+STARTUP_LIMIT = 0.075
+
+# modules the usage message must not import
+HEAVY_MODULES = ('numpy', 'asyncio', 'multiprocessing', 'xml.etree.ElementTree', 'LatiumSolver', 'AlbionSolver')
+
+
+def test_usage_start_up_time():
+    benchmark = Benchmark(startup_runs=5)
+    bare = benchmark.measure_startup(['-c', 'pass'])
+    usage = benchmark.measure_startup(STARTUP_COMMANDS['usage'])
+    assert usage - bare < STARTUP_LIMIT, f"usage took [{usage:.3f}s], a bare interpreter [{bare:.3f}s]"
+
+
+def test_usage_imports_nothing_heavy():
+    script = ("import runpy, sys\n"
+              "try:\n"
+              "    runpy.run_path('IslandSelect.py', run_name='__main__')\n"
+              "except SystemExit:\n"
+              "    pass\n"
+              f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules), file=sys.stderr)\n")
+    result = subprocess.run([sys.executable, '-c', script], cwd=MAP_DIR, capture_output=True, text=True)
+    assert result.stderr.strip() == ''
@@ -0,0 +1,150 @@
+"""
+Anno colour values are 32 bit ARGB integers, written to the xml as signed ints,
+e.g. opaque red #FF0000 is 0xFFFF0000, which the xml wants as -65536.
+"""
+import sys
+
+# range of the colour values parse_anno() accepts, signed or unsigned 32 bit, i.e. from the smallest
+# signed value up to the largest unsigned one
+ANNO_MIN = -0x80000000
+ANNO_MAX = 0xFFFFFFFF
+
+# in-game colours (sails, ship accents, selection circles) are by default the UI colour darkened to this
+IN_GAME_SCALE = 0.8
+
+
+def hex_to_anno(hex_colour: str) -> int:
+    """
+    :param hex_colour: '#RRGGBB', or '#AARRGGBB', the '#' is optional since this only takes hex,
+                       unlike to_anno(), where '112233' is an Anno int
+    :return: signed ARGB int, alpha 255 unless given
+    :raise ValueError: if it isn't a hex colour
+    """
+    if not is_hex(hex_colour):
+        raise ValueError(f"Expected a #RRGGBB or #AARRGGBB colour, got [{hex_colour}]")
+    digits = hex_colour.strip().lstrip('#')
+    if len(digits) == 6:
+        digits = 'FF' + digits
+    return signed(int(digits, 16))
+
+
+def is_hex(value: str) -> bool:
+    digits = value.strip()
+    digits = digits[1:] if digits.startswith('#') else digits
+    return len(digits) in (6, 8) and all(c in '0123456789abcdefABCDEF' for c in digits)
+
+
+def parse_anno(value) -> int:
+    """
+    :param value: an Anno colour int, or its text, e.g. from the picker or a palette file, signed or unsigned
+    :return: the signed int
+    :raise ValueError: if it isn't one
+    """
+    number = int(str(value).strip())
+    if not ANNO_MIN <= number <= ANNO_MAX:
+        raise ValueError(f"[{value}] is out of range for a 32 bit colour")
+    return signed(number)
+
+
+def to_anno(value: str) -> int:
+    """
+    :param value: '#RRGGBB' / '#AARRGGBB' hex, or an Anno int, hex needs the '#' since e.g. 112233 is both
+    :raise ValueError: if it isn't either, e.g. hex without the '#'
+    """
+    value = value.strip()
+    if value.startswith('#'):
+        return hex_to_anno(value)
+    if not value.lstrip('-').isdigit():
+        hint = f", did you mean #{value}?" if is_hex(value) else ''
+        raise ValueError(f"Expected a #RRGGBB or #AARRGGBB colour or an Anno int, got [{value}]{hint}")
+    return parse_anno(value)
+
+
+def anno_to_hex(value: int, alpha: bool = False) -> str:
+    """
+    :param value: signed (or unsigned) ARGB int
+    :param alpha: include the alpha, i.e. '#AARRGGBB' instead of '#RRGGBB'
+    """
+    unsigned = value & 0xFFFFFFFF
+    return f"#{unsigned:08X}" if alpha else f"#{unsigned & 0xFFFFFF:06X}"
+
+
+def signed(argb: int) -> int:
+    """
+    unsigned 32 bit ARGB -> the signed int the xml wants
+    """
+    argb &= 0xFFFFFFFF
+    return argb - 0x100000000 if argb > 0x7FFFFFFF else argb
+
+
+def scaled(value: int, scale: float = IN_GAME_SCALE) -> int:
+    """
+    :return: the colour with its red, green and blue multiplied by scale, alpha unchanged
+    """
+    unsigned = value & 0xFFFFFFFF
+    rv = unsigned & 0xFF000000
+    for shift in (16, 8, 0):
+        channel = (unsigned >> shift) & 0xFF
+        rv |= min(255, round(channel * scale)) << shift
+    return signed(rv)
+
+
+def convert_lines(lines, source: str = '') -> tuple:
+    """
+    Generator converting lines of colours, either just a colour, or 'name, colour', where a colour is hex or
+    an Anno int, comments (#) and [section] lines are skipped.
+    :return: per colour (name, '#RRGGBB', signed ARGB int)
+    :raise ValueError: at the first bad line
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('[') or (line.startswith('#') and not is_hex(line)):
+            continue
+
+        # a palette line may have its own in-game colour as well, it's the UI colour that's converted
+        fields = [field.strip() for field in line.split(',')]
+        name, value = ('', fields[0]) if len(fields) == 1 else fields[:2]
+        try:
+            if len(fields) > 3:
+                raise ValueError("expected a colour, or name, colour")
+            anno = to_anno(value)
+        except ValueError as e:
+            raise ValueError(f"{source}line {line_number}: {e}")
+        yield name, anno_to_hex(anno), anno
+
+
+def write_rows(rows):
+    sys.stdout.writelines(f"{name},{hex_colour},{anno}\n" for name, hex_colour, anno in rows)
+
+
+def main():
+
+    # command line
+    #       python anno_colour.py #RRGGBB|int ...
+    #       python anno_colour.py --file=palette.txt ...
+    files = [arg[len('--file='):] for arg in sys.argv[1:] if arg.startswith('--file=')]
+    values = [arg for arg in sys.argv[1:] if not arg.startswith('--file=')]
+    if not files and not values:
+        print("Usage:")
+        print("     python anno_colour.py #RRGGBB|int ...")
+        print("     python anno_colour.py --file=palette.txt ...")
+        print("        prints name,#RRGGBB,int for every colour, hex colours are converted to Anno ints and vice versa,")
+        print("        a file has a colour or 'name, colour' per line, '-' reads stdin")
+        exit(-1)
+
+    try:
+        write_rows(convert_lines(values))
+        for filename in files:
+            # written as converted, so a big palette streams through
+            if filename == '-':
+                write_rows(convert_lines(sys.stdin, 'stdin, '))
+            else:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    write_rows(convert_lines(f, f"{filename}, "))
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import sys
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+
+from generate_palette import MODES, read_palette
+
+#
+# Colour blindness simulation and perceptual colour distances, to check that player colours can be told apart
+# in every colour vision mode the game has, and to pick substitutes for the ones that can't.
+#
+# Colours are numpy arrays of sRGB in 0..1, shape (n, 3), distances are CIEDE2000 in CIELAB (D65).
+#
+
+# Machado, Oliveira & Fernandes (2009) full severity simulation matrices, applied to linear RGB
+SIMULATION = {
+    'Deuteranopia': numpy.array([[0.367322, 0.860646, -0.227968],
+                                 [0.280085, 0.672501, 0.047413],
+                                 [-0.011820, 0.042940, 0.968881]]),
+    'Protanopia': numpy.array([[0.152286, 1.052583, -0.204868],
+                               [0.114503, 0.786281, 0.099216],
+                               [-0.003882, -0.048116, 1.051998]]),
+    'Tritanopia': numpy.array([[1.255528, -0.076749, -0.178779],
+                               [-0.078411, 0.930809, 0.147602],
+                               [0.004733, 0.691367, 0.303900]]),
+    'None': numpy.identity(3),
+}
+
+# linear sRGB -> XYZ, and the D65 white point
+SRGB_TO_XYZ = numpy.array([[0.4124564, 0.3575761, 0.1804375],
+                           [0.2126729, 0.7151522, 0.0721750],
+                           [0.0193339, 0.1191920, 0.9503041]])
+WHITE = numpy.array([0.95047, 1.0, 1.08883])
+
+# CIEDE2000 below this counts as too close to tell apart at a glance, e.g. banners on the minimap
+THRESHOLD = 10.0
+
+# substitutes are picked from a grid with this many levels per channel
+GRID_LEVELS = 16
+
+# rows of the pairwise distance matrix worked out at once, bounds the temporary arrays to BLOCK x n
+BLOCK = 256
+
+
+def anno_to_rgb(values) -> numpy.ndarray:
+    """
+    :param values: signed (or unsigned) ARGB ints
+    :return: (n, 3) sRGB in 0..1, the alpha is ignored
+    """
+    unsigned = numpy.asarray(values, dtype=numpy.int64) & 0xFFFFFFFF
+    return numpy.stack([(unsigned >> 16) & 0xFF, (unsigned >> 8) & 0xFF, unsigned & 0xFF], axis=-1) / 255.0
+
+
+def rgb_to_anno(rgb: numpy.ndarray) -> list:
+    """
+    :return: opaque signed ARGB ints, as written to assets.xml
+    """
+    channels = numpy.rint(numpy.clip(rgb, 0.0, 1.0) * 255).astype(numpy.int64)
+    unsigned = 0xFF000000 | (channels[..., 0] << 16) | (channels[..., 1] << 8) | channels[..., 2]
+    return [int(value) - 0x100000000 for value in numpy.atleast_1d(unsigned)]
+
+
+def srgb_to_linear(rgb: numpy.ndarray) -> numpy.ndarray:
+    return numpy.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear: numpy.ndarray) -> numpy.ndarray:
+    linear = numpy.clip(linear, 0.0, 1.0)
+    return numpy.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+def simulate(rgb: numpy.ndarray, mode: str) -> numpy.ndarray:
+    """
+    :return: the colours as seen with the given colour vision mode, sRGB in 0..1
+    """
+    if mode == 'None':
+        return rgb
+    return linear_to_srgb(srgb_to_linear(rgb) @ SIMULATION[mode].T)
+
+
+def rgb_to_lab(rgb: numpy.ndarray) -> numpy.ndarray:
+    xyz = (srgb_to_linear(rgb) @ SRGB_TO_XYZ.T) / WHITE
+    delta = 6.0 / 29.0
+    f = numpy.where(xyz > delta ** 3, numpy.cbrt(xyz), xyz / (3 * delta ** 2) + 4.0 / 29.0)
+    return numpy.stack([116.0 * f[..., 1] - 16.0,
+                        500.0 * (f[..., 0] - f[..., 1]),
+                        200.0 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def ciede2000(lab1: numpy.ndarray, lab2: numpy.ndarray) -> numpy.ndarray:
+    """
+    CIEDE2000 colour difference, following Sharma, Wu & Dalal (2005), broadcasting over the leading axes,
+    e.g. lab1[:, None] and lab2[None, :] give the whole distance matrix.
+    """
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    C_bar = (numpy.hypot(a1, b1) + numpy.hypot(a2, b2)) / 2.0
+    G = 0.5 * (1.0 - numpy.sqrt(C_bar ** 7 / (C_bar ** 7 + 25.0 ** 7)))
+    a1p = (1.0 + G) * a1
+    a2p = (1.0 + G) * a2
+    C1p = numpy.hypot(a1p, b1)
+    C2p = numpy.hypot(a2p, b2)
+    h1p = numpy.degrees(numpy.arctan2(b1, a1p)) % 360.0
+    h2p = numpy.degrees(numpy.arctan2(b2, a2p)) % 360.0
+    chroma = C1p * C2p != 0.0
+
+    # hue difference, the short way round the circle, and 0 if either colour has no hue
+    dhp = h2p - h1p
+    dhp = numpy.where(dhp > 180.0, dhp - 360.0, numpy.where(dhp < -180.0, dhp + 360.0, dhp))
+    dhp = numpy.where(chroma, dhp, 0.0)
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dHp = 2.0 * numpy.sqrt(C1p * C2p) * numpy.sin(numpy.radians(dhp) / 2.0)
+
+    # mean hue, also the short way round
+    h_sum = h1p + h2p
+    h_bar = numpy.where(numpy.abs(h1p - h2p) <= 180.0, h_sum / 2.0,
+                        numpy.where(h_sum < 360.0, (h_sum + 360.0) / 2.0, (h_sum - 360.0) / 2.0))
+    h_bar = numpy.where(chroma, h_bar, h_sum)
+
+    L_bar = (L1 + L2) / 2.0
+    Cp_bar = (C1p + C2p) / 2.0
+    T = (1.0 - 0.17 * numpy.cos(numpy.radians(h_bar - 30.0)) + 0.24 * numpy.cos(numpy.radians(2.0 * h_bar))
+         + 0.32 * numpy.cos(numpy.radians(3.0 * h_bar + 6.0)) - 0.20 * numpy.cos(numpy.radians(4.0 * h_bar - 63.0)))
+    d_theta = 30.0 * numpy.exp(-((h_bar - 275.0) / 25.0) ** 2)
+    R_C = 2.0 * numpy.sqrt(Cp_bar ** 7 / (Cp_bar ** 7 + 25.0 ** 7))
+    S_L = 1.0 + 0.015 * (L_bar - 50.0) ** 2 / numpy.sqrt(20.0 + (L_bar - 50.0) ** 2)
+    S_C = 1.0 + 0.045 * Cp_bar
+    S_H = 1.0 + 0.015 * Cp_bar * T
+    R_T = -numpy.sin(numpy.radians(2.0 * d_theta)) * R_C
+
+    lightness = dLp / S_L
+    chroma_term = dCp / S_C
+    hue = dHp / S_H
+    return numpy.sqrt(lightness ** 2 + chroma_term ** 2 + hue ** 2 + R_T * chroma_term * hue)
+
+
+def pairwise_distances(lab: numpy.ndarray, block: int = BLOCK) -> numpy.ndarray:
+    """
+    :return: (n, n) CIEDE2000 matrix, worked out a block of rows at a time so big palettes don't need
+        n x n of every temporary.  It's symmetric, so each block only works out the columns from its
+        first row on, and is mirrored into the rows below.
+    """
+    rv = numpy.empty((len(lab), len(lab)))
+    for start in range(0, len(lab), block):
+        end = start + block
+        rv[start:end, start:] = ciede2000(lab[start:end, None, :], lab[None, start:, :])
+        rv[end:, start:end] = rv[start:end, end:].T
+    return rv
+
+
+def close_pairs(names: list, rgb: numpy.ndarray, mode: str = 'None', threshold: float = THRESHOLD,
+                first: int = 0) -> list:
+    """
+    :param first: only pairs with at least one colour from this index on, e.g. to skip base game vs base game
+    :return: list of (distance, name, name) closer than threshold as seen in the mode, closest first
+    """
+    distances = pairwise_distances(rgb_to_lab(simulate(rgb, mode)))
+    rows, columns = numpy.nonzero(numpy.triu(distances < threshold, k=1))
+    keep = columns >= first
+    pairs = sorted(zip(distances[rows[keep], columns[keep]], rows[keep], columns[keep]))
+    return [(float(distance), names[row], names[column]) for distance, row, column in pairs]
+
+
+def candidate_grid(levels: int = GRID_LEVELS) -> numpy.ndarray:
+    steps = numpy.linspace(0.0, 1.0, levels)
+    return numpy.stack(numpy.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def substitutes(rgb: numpy.ndarray, mode: str, fixed: numpy.ndarray = None, threshold: float = THRESHOLD,
+                candidates: numpy.ndarray = None) -> numpy.ndarray:
+    """
+    Replace the colours which look too close to another as seen in the mode, worst first.  Each is swapped
+    for the candidate colour that, as seen in the mode, is at least threshold from every other colour and
+    looks most like the original did; or if there isn't one, whichever is furthest from its nearest colour,
+    if that's an improvement.
+    :param rgb: (n, 3) palette
+    :param fixed: (m, 3) colours which are also in the game but can't be changed, e.g. the base game ones
+    :return: (n, 3) palette for the mode, unchanged colours are the same
+    """
+    if candidates is None:
+        candidates = candidate_grid()
+    if fixed is None:
+        fixed = numpy.zeros((0, 3))
+
+    rv = rgb.copy()
+    count = len(rgb)
+    lab = rgb_to_lab(simulate(numpy.concatenate([rgb, fixed]), mode))
+    original = lab[:count].copy()
+    candidate_lab = rgb_to_lab(simulate(candidates, mode))
+
+    distances = pairwise_distances(lab)
+    numpy.fill_diagonal(distances, numpy.inf)
+    for ndx in numpy.argsort(distances[:count].min(axis=1)):
+        nearest = distances[ndx].min()
+        if nearest >= threshold:
+            continue
+
+        others = numpy.delete(lab, ndx, axis=0)
+        candidate_nearest = numpy.full(len(candidates), numpy.inf)
+        for start in range(0, len(others), BLOCK):
+            block = ciede2000(candidate_lab[:, None, :], others[None, start:start + BLOCK, :])
+            candidate_nearest = numpy.minimum(candidate_nearest, block.min(axis=1))
+
+        good = candidate_nearest >= threshold
+        if good.any():
+            likeness = numpy.where(good, ciede2000(candidate_lab, original[ndx]), numpy.inf)
+            best = int(numpy.argmin(likeness))
+        else:
+            best = int(numpy.argmax(candidate_nearest))
+            if candidate_nearest[best] <= nearest:
+                continue
+
+        rv[ndx] = candidates[best]
+        lab[ndx] = candidate_lab[best]
+        distances[ndx] = distances[:, ndx] = ciede2000(lab, lab[ndx])
+        distances[ndx, ndx] = numpy.inf
+    return rv
+
+
+def colourblind_variants(names: list, ui: list, fixed_ui: list = (), threshold: float = THRESHOLD) -> dict:
+    """
+    :param names, ui: the palette, names and UI colours as signed ARGB ints
+    :param fixed_ui: UI colours which are also in the game, as signed ARGB ints
+    :return: name -> {mode: UI colour} for the colours which need a substitute in at least one mode
+    """
+    rgb = anno_to_rgb(ui)
+    fixed = anno_to_rgb(fixed_ui).reshape(-1, 3)
+    rv = dict()
+    for mode in MODES:
+        if mode == 'None':
+            continue
+        changed = substitutes(rgb, mode, fixed, threshold)
+        for ndx in numpy.flatnonzero((changed != rgb).any(axis=1)):
+            rv.setdefault(names[ndx], {m: ui[ndx] for m in MODES})[mode] = rgb_to_anno(changed[ndx])[0]
+    return rv
+
+
+def read_asset_colours(filename: str) -> tuple:
+    """
+    the ParticipantColor assets in an assets.xml, e.g. the base game's or this mod's, read as a stream so
+    the whole base game assets.xml doesn't have to fit in memory
+    :return: (names, UI colours as seen with normal colour vision)
+    """
+    names = []
+    colours = []
+    for event, element in ElementTree.iterparse(filename, events=('end',)):
+        if element.tag != 'Asset':
+            continue
+        if element.findtext('Template') == 'ParticipantColor':
+            value = element.findtext('Values/ParticipantColor/ParticipantUIColor/None')
+            if value is not None and value.strip():
+                names.append(element.findtext('Values/Standard/Name') or element.findtext('Values/Standard/GUID'))
+                colours.append(int(value))
+        element.clear()
+    return names, colours
+
+
+def read_colours(filename: str) -> tuple:
+    """
+    :return: (names, UI colours) from an assets.xml or a palette file
+    """
+    if filename.lower().endswith('.xml'):
+        return read_asset_colours(filename)
+
+    colours = list(read_palette(filename))
+    return [colour.name for colour in colours], [colour.ui for colour in colours]
+
+
+def main():
+
+    # command line
+    #       python colour_vision.py palette.txt|assets.xml ... [--base=assets.xml ...] [--threshold=10] [--substitutes]
+    options = [arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--')]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args or not {name for name, value in options} <= {'base', 'threshold', 'substitutes'}:
+        print("Usage:")
+        print("     python colour_vision.py palette.txt|assets.xml ... [--base=assets.xml ...] [--threshold=10] [--substitutes]")
+        print("        lists the colours too close together to tell apart, in every colour vision mode")
+        print("        --base         colours which are also in the game, e.g. the base game assets.xml")
+        print("        --substitutes  also suggest colourblind substitutes for them")
+        exit(-1)
+
+    threshold = THRESHOLD
+    names, ui, base_names, base_ui = [], [], [], []
+    try:
+        for name, value in options:
+            if name == 'threshold':
+                threshold = float(value)
+            elif name == 'base':
+                more_names, more_ui = read_colours(value)
+                base_names += more_names
+                base_ui += more_ui
+        for filename in args:
+            more_names, more_ui = read_colours(filename)
+            names += more_names
+            ui += more_ui
+    except (OSError, ValueError, ElementTree.ParseError) as e:
+        print(e)
+        exit(1)
+
+    # base game colours first, so pairs of just base game colours can be skipped
+    all_names = base_names + names
+    rgb = anno_to_rgb(base_ui + ui).reshape(-1, 3)
+    print(f"Colours: [{len(names)}]  Base game colours: [{len(base_names)}]  Threshold: [{threshold:g}]")
+    for mode in MODES:
+        pairs = close_pairs(all_names, rgb, mode, threshold, first=len(base_names))
+        print(f"{mode}: [{len(pairs)}] pairs too close")
+        for distance, first, second in pairs:
+            print(f"    {distance:5.1f}  [{first}] [{second}]")
+
+    if any(name == 'substitutes' for name, value in options):
+        from anno_colour import anno_to_hex
+        variants = colourblind_variants(names, ui, base_ui, threshold)
+        print(f"Substitutes: [{len(variants)}] colours")
+        for name, modes in variants.items():
+            substituted = ', '.join(f"{mode} {anno_to_hex(value)}" for mode, value in modes.items()
+                                    if value != modes['None'])
+            print(f"    [{name}] {anno_to_hex(modes['None'])} -> {substituted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,129 @@
 import sys
 import json
 import os
-import webview
+import tempfile
+import threading
+
+from anno_colour import anno_to_hex, parse_anno, to_anno
 
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
 else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-MODINFO_PATH = os.path.join(os.path.dirname(sys.executable if sys.frozen else __file__), "modinfo.json")
+MODINFO_PATH = os.path.join(os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__)),
+                            "modinfo.json")
 COLORPICKER_PATH = os.path.join(BASE_DIR, "colorpicker.html")
 
+# clicks within this many seconds of each other are saved as one write, of the last colour
+SAVE_DELAY = 0.5
+
+
+def write_modinfo_color(int_color: int, path: str = MODINFO_PATH):
+    """
+    Set the custom colour option in modinfo.json.  Written to a uniquely named temp file next to it and
+    renamed over it, so the file is never left half written, even with two pickers open.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    data["Options"]["customcolour"]["default"] = str(int_color)
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix="modinfo.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        # mkstemp files are private, keep modinfo.json's own permissions
+        os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
 class Api:
+    """
+    Called from the picker's JavaScript.  Saves are coalesced: each click just records the colour and
+    (re)starts a short timer, and only the last colour is written once the clicks stop, one write at a time.
+    A click only gets a 'Saving...' status back, the real outcome is pushed to the window once written.
+    """
+    def __init__(self, path: str = MODINFO_PATH, delay: float = SAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.pending = None
+        self.timer = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.last_error = None
+        self.last_result = None
+
+        # the picker window, to report save results to, None once it's closed
+        self.window = None
+
     def save_color(self, int_color):
         """
         Called from JavaScript.
-        Saves the Int Color into modinfo.json
+        Queues the Int Color to be saved into modinfo.json
+        :return: a pending status, or an error if it isn't a colour
         """
         try:
-            with open(MODINFO_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            data["Options"]["customcolour"]["default"] = str(int_color)
+            value = parse_anno(int_color)
+        except ValueError as e:
+            return f"Error: {e}"
 
-            with open(MODINFO_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        with self.lock:
+            self.pending = value
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
 
-            return f"Saved Int Color {int_color} to modinfo.json"
+        return f"Saving Int Color {value} to modinfo.json..."
 
-        except Exception as e:
-            return f"Error: {e}"
+    def flush(self):
+        """
+        write the pending colour, if any, e.g. when the window closes before the timer fires
+        """
+        with self.lock:
+            value = self.pending
+            self.pending = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if value is None:
+            return
+
+        with self.write_lock:
+            try:
+                write_modinfo_color(value, self.path)
+                self.last_error = None
+                self.last_result = f"Saved Int Color {value} to modinfo.json"
+            except KeyError as e:
+                self.last_error = f"modinfo.json has no {e} option"
+            except (OSError, ValueError, TypeError) as e:
+                self.last_error = str(e)
+            if self.last_error:
+                self.last_result = f"Error: {self.last_error}"
+            self.report(self.last_result)
+
+    def report(self, message: str):
+        """
+        show a save result in the picker window, if it's still open
+        """
+        window = self.window
+        if window is None:
+            return
+        try:
+            window.evaluate_js(f"window.annoSaveResult({json.dumps(message)})")
+        except Exception:
+            # the window went away mid save, the file was still written (or not) as reported by last_result
+            pass
 
 
 def inject_js(window):
     """
-    Injects a Save button and hooks into the existing Int Color field
+    Injects a Save button and a save status next to it, and hooks into the existing Int Color field
     """
     js = """
         (function () {
@@ -44,6 +133,15 @@ def inject_js(window):
             btn.style.marginLeft = '6.5em';
             btn.style.marginTop = '1em';
 
+            const status = document.createElement('span');
+            status.style.marginLeft = '1em';
+
+            // called from Python once the save is really written, or has failed
+            window.annoSaveResult = msg => {
+                status.textContent = msg;
+                alert(msg);
+            };
+
             btn.onclick = () => {
                 const value = document.getElementById('intcolor').value;
                 if (!value) {
@@ -52,17 +150,28 @@ def inject_js(window):
                 }
 
                 window.pywebview.api.save_color(value).then(msg => {
-                    alert(msg);
+                    status.textContent = msg;
+                    if (msg.startsWith('Error')) {
+                        alert(msg);
+                    }
                 });
             };
 
             section.appendChild(btn);
+            section.appendChild(status);
         })();
     """
     window.evaluate_js(js)
 
 
-if __name__ == "__main__":
+def run_gui():
+    # only the window needs webview, the rest works without it installed
+    try:
+        import webview
+    except ImportError:
+        print("The colour picker window needs pywebview (pip install pywebview), or use --set=colour")
+        exit(1)
+
     api = Api()
 
     window = webview.create_window(
@@ -73,4 +182,41 @@ if __name__ == "__main__":
         height=600,
     )
 
-    webview.start(inject_js, window)
\ No newline at end of file
+    api.window = window
+    webview.start(inject_js, window)
+
+    # the window is gone, so a save still pending is only reported here
+    api.window = None
+    api.flush()
+    if api.last_error:
+        print(f"Error: {api.last_error}")
+
+
+def main():
+
+    # command line
+    #       python custom_colour_picker.py                      opens the picker window
+    #       python custom_colour_picker.py --set=#RRGGBB|int    sets the colour without it
+    args = sys.argv[1:]
+    if not args:
+        run_gui()
+    elif len(args) == 1 and args[0].startswith("--set="):
+        try:
+            value = to_anno(args[0][len("--set="):])
+            write_modinfo_color(value)
+        except KeyError as e:
+            print(f"Error: modinfo.json has no {e} option")
+            exit(1)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            exit(1)
+        print(f"Saved Int Color {value} ({anno_to_hex(value)}) to modinfo.json")
+    else:
+        print("Usage:")
+        print("     python custom_colour_picker.py                      opens the picker window")
+        print("     python custom_colour_picker.py --set=#RRGGBB|int    sets the colour without it")
+        exit(-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import os
+import re
+import sys
+import tempfile
+from xml.sax.saxutils import escape
+
+from anno_colour import IN_GAME_SCALE, hex_to_anno, scaled
+
+#
+# Generate the mod's assets.xml and texts_english.xml from a palette file, instead of hand editing the xml.
+#
+# Palette file, one colour per line, the in-game colour is optional and defaults to the UI colour darkened:
+#
+#       # comment
+#       [custom colors from ewjax]
+#       Bright Red, #FF0000
+#       Jet Black, #000000, #000000
+#
+# A [section] line starts a new group of colours, which gets START / END comments in both files.
+#
+# Every colour needs a GUID, and since savegames remember colours by GUID, a colour keeps the GUID it was
+# first given: the allocations are kept in a name,guid file next to the output, and new colours get the next
+# GUID which isn't allocated or reserved.
+#
+
+# the base game asset the colours are registered with and added after
+PARTICIPANT_COLORS_GUID = 2002447
+
+# first GUID handed out, past the block used by the hand written assets.xml
+FIRST_GUID = 2000101200
+LAST_GUID = 0x7FFFFFFF
+
+# every colour is written once per colour vision mode
+MODES = ('Deuteranopia', 'Protanopia', 'Tritanopia', 'None')
+
+ASSETS_PATH = os.path.join('data', 'base', 'config', 'export', 'assets.xml')
+TEXTS_PATH = os.path.join('data', 'base', 'config', 'gui', 'texts_english.xml')
+GUIDS_FILENAME = 'guids.csv'
+
+GUID_PATTERN = re.compile(r'<GUID>\s*(\d+)\s*</GUID>')
+
+
+class PaletteColour:
+    def __init__(self, name: str, ui: int, in_game: int, section: str, line: int):
+        self.name = name
+        self.ui = ui
+        self.in_game = in_game
+        self.section = section
+        self.line = line
+
+    def asset_name(self) -> str:
+        """
+        e.g. 'Bright Red' -> 'ParticipantColorCustomBrightRed'
+        """
+        return 'ParticipantColorCustom' + ''.join(word[:1].upper() + word[1:] for word in words(self.name))
+
+    def asset_id(self) -> str:
+        """
+        e.g. 'Bright Red' -> 'PARTICIPANT_CUSTOM_COLOR_BRIGHT_RED'
+        """
+        return 'PARTICIPANT_CUSTOM_COLOR_' + '_'.join(word.upper() for word in words(self.name))
+
+
+def words(name: str) -> list:
+    return re.findall(r'[^\W_]+', name)
+
+
+def read_palette(filename: str, scale: float = IN_GAME_SCALE):
+    """
+    Generator of PaletteColour, one per palette line, read as it goes.
+    :raise ValueError: listing every malformed line, once the whole file has been read
+    """
+    errors = []
+    section = ''
+    seen = dict()
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1].strip()
+                continue
+
+            fields = [field.strip() for field in line.split(',')]
+            try:
+                if len(fields) not in (2, 3) or not fields[0] or not words(fields[0]):
+                    raise ValueError("expected name, #RRGGBB [, #RRGGBB]")
+                ui = hex_to_anno(fields[1])
+                in_game = hex_to_anno(fields[2]) if len(fields) == 3 and fields[2] else scaled(ui, scale)
+                colour = PaletteColour(fields[0], ui, in_game, section, line_number)
+                if colour.asset_id() in seen:
+                    raise ValueError(f"[{colour.name}] has the same asset ID as line {seen[colour.asset_id()]}")
+                seen[colour.asset_id()] = line_number
+            except ValueError as e:
+                errors.append(f"{filename}, line {line_number}: {e}")
+                continue
+
+            if not errors:
+                yield colour
+
+    if errors:
+        raise ValueError('\n'.join(errors))
+
+
+class GuidAllocator:
+    """
+    Hands out GUIDs by colour name, remembering the ones already given out in a name,guid file.
+    """
+    def __init__(self, filename: str, first_guid: int = FIRST_GUID, reserved: set = None):
+        self.filename = filename
+        self.first_guid = first_guid
+        self.next_guid = first_guid
+        self.guids = dict()
+        self.reserved = set(reserved) if reserved else set()
+        self.added = 0
+
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    name, _, guid = line.strip().rpartition(',')
+                    if name and guid.isdigit():
+                        self.guids[name] = int(guid)
+        self.used = set(self.guids.values()) | self.reserved
+
+    def guid(self, name: str) -> int:
+        if name not in self.guids:
+            while self.next_guid in self.used:
+                self.next_guid += 1
+            if self.next_guid > LAST_GUID:
+                raise ValueError(f"Out of GUIDs after [{self.first_guid}]")
+            self.guids[name] = self.next_guid
+            self.used.add(self.next_guid)
+            self.added += 1
+        return self.guids[name]
+
+    def save(self):
+        write_atomic(self.filename, ''.join(f"{name},{guid}\n" for name, guid in self.guids.items()))
+
+
+def reserved_guids(filenames: list) -> set:
+    """
+    every <GUID> in the given xml files, e.g. a hand written assets.xml whose colours must not be clobbered
+    """
+    rv = set()
+    for filename in filenames:
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                rv.update(int(guid) for guid in GUID_PATTERN.findall(line))
+    return rv
+
+
+def open_temp(filename: str) -> tuple:
+    """
+    a new uniquely named temp file next to filename, to be renamed over it once written, so two runs
+    at once never write the same temp file
+    :return: (open text file, its name)
+    """
+    fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                         prefix=os.path.basename(filename) + '.', suffix='.tmp')
+    # mkstemp files are private, keep the usual permissions of the file it replaces
+    os.chmod(temp_filename, os.stat(filename).st_mode & 0o777 if os.path.exists(filename) else 0o644)
+    return os.fdopen(fd, 'w', encoding='utf-8'), temp_filename
+
+
+def write_atomic(filename: str, text: str):
+    f, temp_filename = open_temp(filename)
+    try:
+        with f:
+            f.write(text)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def mode_values(value) -> dict:
+    """
+    :param value: one colour for every mode, or a dictionary of mode -> colour
+    """
+    return value if isinstance(value, dict) else {mode: value for mode in MODES}
+
+
+def asset_xml(guid: int, colour: PaletteColour, ui=None, in_game=None) -> str:
+    """
+    :param ui, in_game: per mode colours, see mode_values(), default the palette colours in every mode
+    """
+    ui = mode_values(colour.ui if ui is None else ui)
+    in_game = mode_values(colour.in_game if in_game is None else in_game)
+    ui_lines = ''.join(f"                        <{mode}>{ui[mode]}</{mode}>\n" for mode in MODES)
+    in_game_lines = ''.join(f"                        <{mode}>{in_game[mode]}</{mode}>\n" for mode in MODES)
+    return (f"        <!-- Custom color {escape(colour.name)} -->\n"
+            f"        <Asset>\n"
+            f"            <Template>ParticipantColor</Template>\n"
+            f"            <Values>\n"
+            f"                <Standard>\n"
+            f"                    <GUID>{guid}</GUID>\n"
+            f"                    <Name>{colour.asset_name()}</Name>\n"
+            f"                    <ID>{colour.asset_id()}</ID>\n"
+            f"                </Standard>\n"
+            f"                <ParticipantColor>\n"
+            f"                    <!-- colors for Diplomacy screen, province and minimap symbols, etc -->\n"
+            f"                    <ParticipantUIColor>\n"
+            f"{ui_lines}"
+            f"                    </ParticipantUIColor>\n"
+            f"                    <!-- colors for ship accent colors, sail colors, ship selection circles, etc -->\n"
+            f"                    <ParticipantInGameColor>\n"
+            f"{in_game_lines}"
+            f"                    </ParticipantInGameColor>\n"
+            f"                    <IsPlayerColor>1</IsPlayerColor>\n"
+            f"                </ParticipantColor>\n"
+            f"                <Locked>\n"
+            f"                    <DefaultLockedState>0</DefaultLockedState>\n"
+            f"                    <Scope>Account</Scope>\n"
+            f"                    <VisibleWhenLocked>1</VisibleWhenLocked>\n"
+            f"                </Locked>\n"
+            f"                <Text>\n"
+            f"                    <OasisId>{guid}</OasisId>\n"
+            f"                </Text>\n"
+            f"            </Values>\n"
+            f"        </Asset>\n\n")
+
+
+def text_xml(guid: int, colour: PaletteColour) -> str:
+    return (f"        <Text>\n"
+            f"            <LineId>{guid}</LineId>\n"
+            f"            <Text>{escape(colour.name)}</Text>\n"
+            f"        </Text>\n")
+
+
+def section_comment(marker: str, section: str) -> str:
+    return f"        <!-- {marker}: =================== {escape(section)} =================== -->\n"
+
+
+def generate(palette_filename: str, output_dir: str, first_guid: int = FIRST_GUID, reserve: list = (),
+             scale: float = IN_GAME_SCALE, variants=None) -> int:
+    """
+    Read the palette and write assets.xml and texts_english.xml under output_dir in one pass, each colour
+    is written out as soon as it's read, so only the GUIDs are held on to, for the ParticipantColors list
+    at the end.  Nothing is replaced unless the whole palette is good.
+    :param variants: optional function(PaletteColour) -> (ui, in_game) per mode colours, see mode_values()
+    :return: number of colours written
+    """
+    assets_filename = os.path.join(output_dir, ASSETS_PATH)
+    texts_filename = os.path.join(output_dir, TEXTS_PATH)
+    allocator = GuidAllocator(os.path.join(output_dir, GUIDS_FILENAME), first_guid, reserved_guids(reserve))
+    for filename in (assets_filename, texts_filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    assets, assets_temp = open_temp(assets_filename)
+    texts, texts_temp = None, None
+    guids = []
+    try:
+        texts, texts_temp = open_temp(texts_filename)
+        with assets, texts:
+            assets.write(f"<ModOps>\n\n"
+                         f"    <!-- generated from {escape(os.path.basename(palette_filename))}, "
+                         f"edit the palette rather than this file -->\n"
+                         f"    <ModOp GUID=\"{PARTICIPANT_COLORS_GUID}\" Type=\"addNextSibling\">\n\n")
+            texts.write("<ModOps>\n    <ModOp Add=\"//TextExport/Texts\">\n\n")
+
+            section = ''
+            for colour in read_palette(palette_filename, scale):
+                if colour.section != section:
+                    if section:
+                        assets.write(section_comment('END', section) + '\n')
+                        texts.write(section_comment('END', section) + '\n')
+                    section = colour.section
+                    assets.write(section_comment('START', section))
+                    texts.write(section_comment('START', section))
+
+                guid = allocator.guid(colour.name)
+                ui, in_game = variants(colour) if variants else (None, None)
+                assets.write(asset_xml(guid, colour, ui, in_game))
+                texts.write(text_xml(guid, colour))
+                guids.append(guid)
+
+            if section:
+                assets.write(section_comment('END', section) + '\n')
+                texts.write(section_comment('END', section) + '\n')
+
+            # register them all with the base game colour list
+            assets.write(f"    </ModOp>\n\n"
+                         f"    <ModOp Type=\"add\" GUID=\"{PARTICIPANT_COLORS_GUID}\"\n"
+                         f"        Path=\"/Values/ParticipantRepresentationFeature/ParticipantColors\">\n")
+            assets.writelines(f"        <Item>\n            <Color>{guid}</Color>\n        </Item>\n" for guid in guids)
+            assets.write("    </ModOp>\n\n</ModOps>\n")
+            texts.write("    </ModOp>\n</ModOps>\n")
+
+    except BaseException:
+        assets.close()
+        for filename in (assets_temp, texts_temp):
+            if filename and os.path.exists(filename):
+                os.remove(filename)
+        raise
+
+    os.replace(assets_temp, assets_filename)
+    os.replace(texts_temp, texts_filename)
+    allocator.save()
+    return len(guids)
+
+
+def colourblind_variants(palette_filename: str, base: list = (), threshold: float = None,
+                         scale: float = IN_GAME_SCALE):
+    """
+    Read the palette ahead of the generating pass and work out colourblind substitutes for the colours which
+    are too close to another in any colour vision mode, see colour_vision.colourblind_variants().
+    A substituted UI colour's in-game colour is the substitute darkened by scale.
+    :param base: assets.xml or palette files with the other colours in the game, to keep clear of
+    :return: the variants function for generate()
+    """
+    from colour_vision import THRESHOLD, colourblind_variants as substitutes, read_colours
+
+    colours = list(read_palette(palette_filename, scale))
+    base_ui = []
+    for filename in base:
+        base_ui += read_colours(filename)[1]
+    modes = substitutes([colour.name for colour in colours], [colour.ui for colour in colours], base_ui,
+                        THRESHOLD if threshold is None else threshold)
+
+    def variants(colour: PaletteColour) -> tuple:
+        if colour.name not in modes:
+            return None, None
+        ui = modes[colour.name]
+        return ui, {mode: colour.in_game if ui[mode] == colour.ui else scaled(ui[mode], scale) for mode in MODES}
+    return variants
+
+
+def main():
+
+    # command line
+    #       python generate_palette.py palette.txt output_dir [--first-guid=N] [--reserve=assets.xml ...] [--scale=0.8]
+    #                                      [--colourblind[=threshold] [--base=assets.xml ...]]
+    options = [arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--')]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    names = {name for name, value in options}
+    if len(args) != 2 or not names <= {'first-guid', 'reserve', 'scale', 'colourblind', 'base'}:
+        print("Usage:")
+        print("     python generate_palette.py palette.txt output_dir [--first-guid=N] [--reserve=assets.xml ...] [--scale=0.8]")
+        print("                                       [--colourblind[=threshold] [--base=assets.xml ...]]")
+        print("        writes output_dir/" + ASSETS_PATH.replace(os.sep, '/') + " and "
+              + TEXTS_PATH.replace(os.sep, '/') + ",")
+        print("        and the GUIDs given out in output_dir/" + GUIDS_FILENAME)
+        print("        --reserve  never hand out the GUIDs used in these xml files")
+        print("        --scale    in-game colour = UI colour x scale, for colours without their own in-game colour")
+        print("        --colourblind  substitute colours which are too close to another in a colourblind mode")
+        print("        --base         other colours in the game to keep clear of, e.g. the base game assets.xml")
+        exit(-1)
+
+    first_guid = FIRST_GUID
+    scale = IN_GAME_SCALE
+    threshold = None
+    reserve = []
+    base = []
+    for name, value in options:
+        if name == 'first-guid':
+            first_guid = int(value)
+        elif name == 'scale':
+            scale = float(value)
+        elif name == 'colourblind':
+            threshold = float(value) if value else 0.0
+        elif name == 'base':
+            base.append(value)
+        else:
+            reserve.append(value)
+
+    try:
+        variants = None
+        if threshold is not None:
+            variants = colourblind_variants(args[0], base, threshold or None, scale)
+        count = generate(args[0], args[1], first_guid, reserve, scale, variants)
+    except (OSError, ValueError, SyntaxError) as e:
+        print(e)
+        exit(1)
+    print(f"Wrote [{count}] colours to [{args[1]}]")
+
+
+if __name__ == "__main__":
+    main()